@@ -0,0 +1,254 @@
+# app/core/admission.py - per-route-class admission control and load shedding
+import asyncio
+import re
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import jwt
+
+from app.core.config import JWT_SECRET, JWT_ALG
+from app.core.responses import dump_json
+
+# (methods or None for any, path regex, route class); first match wins, unmatched routes
+# (/auth/me, /healthz, job polling, ...) are never queued or rate limited
+ROUTE_RULES: List[Tuple[Optional[set], re.Pattern, str]] = [
+    ({"POST"}, re.compile(r"^/auth/(login|register)$"), "auth"),
+    # POST .../query reads rows, so it must match before the table write rule below
+    ({"POST"}, re.compile(r"^/(db/tables|tables)/[^/]+/query$"), "bulk_read"),
+    ({"GET"}, re.compile(r"^/(db/tables|tables)/[^/]+(/query)?$"), "bulk_read"),
+    ({"POST", "PUT", "PATCH", "DELETE"}, re.compile(r"^/(db/tables|tables)/"), "write"),
+    ({"POST"}, re.compile(r"^/(accessibility/(closures|reset)|jobs(/pipelines)?$|summary/orders/rebuild)"), "write"),
+    ({"GET"}, re.compile(r"^/(geo|map|accessibility)(/|$)"), "geo"),
+]
+
+# route class -> limits. concurrency: requests in service at once; queue: waiters beyond
+# that; max_wait_ms: longest a request may queue; rate/burst: token bucket per JWT subject
+# (or client address) in requests per second
+ROUTE_CLASSES: Dict[str, Dict[str, float]] = {
+    "auth":      {"concurrency": 4,  "queue": 16, "max_wait_ms": 2000, "rate": 1.0,  "burst": 5},
+    "bulk_read": {"concurrency": 4,  "queue": 32, "max_wait_ms": 5000, "rate": 2.0,  "burst": 10},
+    "write":     {"concurrency": 8,  "queue": 64, "max_wait_ms": 3000, "rate": 10.0, "burst": 30},
+    "geo":       {"concurrency": 16, "queue": 64, "max_wait_ms": 2000, "rate": 20.0, "burst": 60},
+}
+
+SAMPLE_SIZE = 1024          # recent queue / service times kept per class for percentiles
+BUCKET_IDLE_S = 600         # token buckets unused this long are dropped
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    for methods, pattern, name in ROUTE_RULES:
+        if (methods is None or method in methods) and pattern.match(path):
+            return name
+    return None
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, retry_after: float):
+        self.status, self.reason, self.retry_after = status, reason, retry_after
+
+
+class TokenBuckets:
+    """One token bucket per caller key, refilled lazily on access"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate, self.burst = rate, burst
+        self.buckets: Dict[str, List[float]] = {}   # key -> [tokens, last refill]
+        self.last_sweep = time.monotonic()
+
+    def take(self, key: str) -> float:
+        """0 when a token was taken, else seconds until the next one is available"""
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [self.burst, now]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            wait = 0.0
+        else:
+            bucket[0] = tokens
+            wait = (1 - tokens) / self.rate
+        if now - self.last_sweep > BUCKET_IDLE_S:
+            self.buckets = {k: b for k, b in self.buckets.items() if now - b[1] < BUCKET_IDLE_S}
+            self.last_sweep = now
+        return wait
+
+
+class AdmissionClass:
+    """Concurrency limit with a bounded FIFO wait queue.
+
+    A request that cannot start now joins the queue unless it is full, or unless
+    the expected wait (queue position x mean service time / concurrency) already
+    exceeds its deadline; both cases are rejected at once instead of letting the
+    request time out after holding a slot in line.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int, max_wait_ms: float, rate: float, burst: float):
+        self.name = name
+        self.concurrency = int(concurrency)
+        self.queue_size = int(queue)
+        self.max_wait = max_wait_ms / 1000
+        self.buckets = TokenBuckets(rate, burst)
+        self.in_service = 0
+        self.waiters: deque = deque()
+        self.mean_service = 0.05          # EWMA seconds, seeded at 50 ms
+        self.queue_ms: deque = deque(maxlen=SAMPLE_SIZE)
+        self.service_ms: deque = deque(maxlen=SAMPLE_SIZE)
+        self.counts = {"admitted": 0, "queue_full": 0, "deadline": 0, "timed_out": 0, "rate_limited": 0}
+
+    def expected_wait(self) -> float:
+        return (len(self.waiters) + 1) * self.mean_service / self.concurrency
+
+    async def acquire(self, key: str, deadline: float) -> float:
+        """Wait for a slot; returns seconds spent queued or raises Rejected"""
+        retry = self.buckets.take(key)
+        if retry:
+            self.counts["rate_limited"] += 1
+            raise Rejected(429, "rate_limited", retry)
+
+        if self.in_service < self.concurrency and not self.waiters:
+            self.in_service += 1
+            self.counts["admitted"] += 1
+            self.queue_ms.append(0.0)
+            return 0.0
+        if len(self.waiters) >= self.queue_size:
+            self.counts["queue_full"] += 1
+            raise Rejected(503, "queue_full", self.expected_wait())
+        budget = deadline - time.monotonic()
+        if self.expected_wait() > budget:
+            self.counts["deadline"] += 1
+            raise Rejected(503, "deadline", self.expected_wait())
+
+        t0 = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=budget)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # the slot was handed over just as we timed out; give it back
+                self.release(0.0, record=False)
+            else:
+                waiter.cancel()
+            self.counts["timed_out"] += 1
+            raise Rejected(503, "timed_out", self.expected_wait())
+        except asyncio.CancelledError:
+            # client went away; a slot already handed to us must not leak
+            if waiter.done() and not waiter.cancelled():
+                self.release(0.0, record=False)
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        queued = time.monotonic() - t0
+        self.counts["admitted"] += 1
+        self.queue_ms.append(queued * 1000)
+        return queued
+
+    def release(self, service_s: float, record: bool = True):
+        if record:
+            self.service_ms.append(service_s * 1000)
+            self.mean_service += 0.1 * (service_s - self.mean_service)
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)   # slot passes straight to the next waiter
+                return
+        self.in_service -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "in_service": self.in_service,
+            "queued": len(self.waiters),
+            "queue_size": self.queue_size,
+            **self.counts,
+            "queue_ms": {"p50": _percentile(self.queue_ms, 0.5), "p99": _percentile(self.queue_ms, 0.99)},
+            "service_ms": {"p50": _percentile(self.service_ms, 0.5), "p99": _percentile(self.service_ms, 0.99)},
+        }
+
+
+def caller_key(scope) -> str:
+    """JWT subject when a valid bearer token is present, else the client address"""
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            value = value.decode("latin-1")
+            if value.lower().startswith("bearer "):
+                try:
+                    sub = jwt.decode(value[7:].strip(), JWT_SECRET, algorithms=[JWT_ALG]).get("sub")
+                    if sub:
+                        return f"sub:{sub}"
+                except jwt.PyJWTError:
+                    pass
+            break
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "anonymous"
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying ROUTE_CLASSES limits before the app sees a request"""
+
+    def __init__(self, app, classes: Optional[Dict[str, Dict[str, float]]] = None):
+        self.app = app
+        self.classes = {name: AdmissionClass(name, **limits) for name, limits in (classes or ROUTE_CLASSES).items()}
+        admission_state["classes"] = self.classes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        name = classify(scope["method"], scope["path"])
+        if name is None:
+            return await self.app(scope, receive, send)
+
+        cls = self.classes[name]
+        try:
+            queued = await cls.acquire(caller_key(scope), time.monotonic() + cls.max_wait)
+        except Rejected as e:
+            return await self._reject(send, name, e)
+
+        t0 = time.monotonic()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-admission", f"{name}; queue={queued * 1000:.1f}ms".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            cls.release(time.monotonic() - t0)
+
+    @staticmethod
+    async def _reject(send, name: str, e: Rejected):
+        body = dump_json({"detail": e.reason, "route_class": name})
+        await send({
+            "type": "http.response.start",
+            "status": e.status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, int(e.retry_after + 0.999))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# filled in by the middleware instance so the metrics route can read it
+admission_state: Dict[str, Dict[str, AdmissionClass]] = {"classes": {}}
+
+
+def admission_metrics() -> Dict[str, Any]:
+    return {name: cls.snapshot() for name, cls in admission_state["classes"].items()}
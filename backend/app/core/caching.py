@@ -0,0 +1,147 @@
+# app/core/caching.py - weak ETags, conditional GET and per-route Cache-Control policies
+import gzip
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core.config import TABLE_ETAG_WINDOW
+from app.core.responses import GZIP_LEVEL, negotiate_encoding
+
+# route class -> Cache-Control; "no-cache" still lets the browser store the body,
+# it just has to revalidate (cheap 304) before reusing it
+CACHE_POLICIES = {
+    "table": "private, no-cache",
+    "record": "private, no-cache",
+    "geo": "public, max-age=300, must-revalidate",
+    "static": "public, max-age=600, must-revalidate",
+}
+
+# changes on every process start so validators never survive a restart
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against every entity tag in If-None-Match"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in header.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+
+def stamps_etag(kind: str, paths: Iterable[str], *parts: Any) -> str:
+    """Validator from the (mtime, size) of every file a response is read from.
+
+    For derived artifacts whose small meta file can stay byte-identical across
+    rebuilds (same parameters, new data): any rewrite of a data file changes it.
+    """
+    stamps = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamps.append((os.path.basename(path), st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamps.append((os.path.basename(path), None))
+    return weak_etag(kind, stamps, *parts)
+
+
+def cache_headers(etag: str, policy: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_POLICIES[policy]}
+
+
+def not_modified(request: Request, etag: str, policy: str) -> Optional[Response]:
+    """A 304 when the client already holds this representation, else None"""
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={**cache_headers(etag, policy), "Vary": "Accept, Accept-Encoding"})
+    return None
+
+
+class TableVersions:
+    """Per-table write counters, bumped by DatabaseService write listeners.
+
+    Writes that bypass the API (SQL editor, other services) never bump the
+    counter, so the validator also rolls over every TABLE_ETAG_WINDOW seconds;
+    that bounds how long such a change can be answered with a 304.
+    """
+
+    def __init__(self, window: float = TABLE_ETAG_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.versions: Dict[str, int] = {}
+
+    def bump(self, table_name: str, op: Optional[str] = None, record: Optional[Dict[str, Any]] = None):
+        with self.lock:
+            self.versions[table_name] = self.versions.get(table_name, 0) + 1
+
+    def version(self, table_name: str) -> int:
+        return self.versions.get(table_name, 0)
+
+    def etag(self, table_name: str, *parts: Any) -> str:
+        epoch = int(time.time() // self.window) if self.window > 0 else 0
+        return weak_etag("table", BOOT_ID, table_name, self.version(table_name), epoch, *parts)
+
+
+class FileCache:
+    """File bodies, content-hash ETags and gzip variants, recomputed only when mtime/size change"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+    def _stamp(self, path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, path: str) -> Dict[str, Any]:
+        stamp = self._stamp(path)
+        cached = self.entries.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        with self.lock:
+            with open(path, "rb") as f:
+                body = f.read()
+            entry = {"body": body, "etag": weak_etag("file", hashlib.blake2b(body, digest_size=16).hexdigest()),
+                     "gzip": None}
+            self.entries[path] = (stamp, entry)
+        return entry
+
+    def etag(self, path: str) -> str:
+        return self.get(path)["etag"]
+
+    def response(self, request: Request, path: str, media_type: str, policy: str = "static") -> Response:
+        """Conditional, optionally gzip-encoded response for a file on disk"""
+        entry = self.get(path)
+        cached = not_modified(request, entry["etag"], policy)
+        if cached is not None:
+            return cached
+        headers = {**cache_headers(entry["etag"], policy), "Vary": "Accept-Encoding"}
+        body = entry["body"]
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"), supported=("gzip",))
+        if encoding == "gzip" and len(body) > 1024:
+            if entry["gzip"] is None:
+                entry["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            body = entry["gzip"]
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type=media_type, headers=headers)
+
+
+# Global instances
+table_versions = TableVersions()
+file_cache = FileCache()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,3 +13,34 @@ ALLOWED_ORIGINS = [s.strip() for s in os.getenv("ALLOWED_ORIGINS", "").split(","
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret-change-me")
 JWT_ALG = "HS256"
 JWT_EXPIRES_MIN = int(os.getenv("JWT_EXPIRES_MIN", "10080"))  # default 7d
+
+# Precomputed geo artifacts produced by the ETL scripts in backend/etl/roadnetwork
+ETL_OUTPUT_DIR = os.getenv("ETL_OUTPUT_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "etl", "roadnetwork"))
+HEX_GRID_DIR = os.getenv("HEX_GRID_DIR", os.path.join(ETL_OUTPUT_DIR, "hex_grid"))
+# Columnar amenity store built by etl/onemap/amenity_store.py
+AMENITY_STORE_DIR = os.getenv("AMENITY_STORE_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "..", "etl", "onemap", "amenity_store"))
+# hex resolution (metres) whose cells are the origins of the what-if accessibility model
+ACCESS_ORIGIN_SIZE = int(os.getenv("ACCESS_ORIGIN_SIZE", "500"))
+# Shared top-level ETL modules (etl/priority_mapping.py, etl/onemap, etl/arcgis)
+ETL_ROOT = os.getenv("ETL_ROOT", os.path.join(os.path.dirname(__file__), "..", "..", "..", "etl"))
+# Background job queue (SQLite file) and worker pool size
+# (defaults to the temp dir: serverless deploys only have a writable /tmp)
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(tempfile.gettempdir(), "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Tables the delta_sync job may write to (it runs with the service role key, so RLS does not apply)
+DELTA_SYNC_TABLES = [s.strip() for s in os.getenv("DELTA_SYNC_TABLES", "").split(",") if s.strip()]
+# Schema registry for the generic table routes: CREATE TABLE source and refresh interval (seconds)
+SCHEMA_DUMP = os.getenv("SCHEMA_DUMP", os.path.join(os.path.dirname(__file__), "..", "..", "dump.sql"))
+SCHEMA_TTL = float(os.getenv("SCHEMA_TTL", "300"))
+# Table ETags also roll over every N seconds so writes made outside the API show up
+TABLE_ETAG_WINDOW = float(os.getenv("TABLE_ETAG_WINDOW", "60"))
+# Per-route-class concurrency limits / queues / rate limits (app/core/admission.py)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") not in ("0", "false", "False")
+# Request profiles captured with ?profile=1 / X-Profile: 1 (admins only)
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "profiles"))
+# Origin x category x metric accessibility cube built by etl/roadnetwork/accessibility_cube.py
+ACCESSIBILITY_CUBE_DIR = os.getenv("ACCESSIBILITY_CUBE_DIR", os.path.join(ETL_OUTPUT_DIR, "accessibility_cube"))
+# Postal code -> location index (SQLite) built by etl/roadnetwork/postal_codes.py
+POSTAL_INDEX_DB = os.getenv("POSTAL_INDEX_DB", os.path.join(ETL_OUTPUT_DIR, "postal_index.sqlite3"))
+# Amenity store layers whose point clusters are built at startup (others on first request)
+CLUSTER_LAYERS = [s.strip() for s in os.getenv("CLUSTER_LAYERS", "bus_stops,hdb_points_shp").split(",") if s.strip()]
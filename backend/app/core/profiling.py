@@ -0,0 +1,130 @@
+# app/core/profiling.py - admin-only, per-request sampling profiles (?profile=1 or X-Profile: 1)
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+import jwt
+from fastapi import Header, HTTPException, status
+
+from app.core.config import ETL_ROOT, JWT_SECRET, JWT_ALG, PROFILE_DIR
+from app.core.responses import dump_json
+
+# the sampler lives with the ETL tooling (etl/profiling.py) so scripts and API share it
+if os.path.abspath(ETL_ROOT) not in sys.path:
+    sys.path.append(os.path.abspath(ETL_ROOT))
+try:
+    from profiling import StackSampler, current_rss
+except ImportError:  # deployed without the etl/ tree: profiling stays off
+    StackSampler = None
+
+REQUEST_SAMPLE_INTERVAL = 0.002
+
+
+def token_claims(authorization: Optional[str]) -> Dict[str, Any]:
+    """Claims of a valid bearer token, {} otherwise (no database round trip)"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return {}
+    try:
+        return jwt.decode(authorization.split(" ", 1)[1].strip(), JWT_SECRET, algorithms=[JWT_ALG])
+    except jwt.PyJWTError:
+        return {}
+
+
+def is_admin(authorization: Optional[str]) -> bool:
+    return token_claims(authorization).get("role") == "admin"
+
+
+async def require_admin(authorization: str = Header(None)):
+    if not is_admin(authorization):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="admin_only")
+
+
+def _wants_profile(scope) -> bool:
+    headers = dict(scope.get("headers", []))
+    if headers.get(b"x-profile", b"").lower() in (b"1", b"true"):
+        return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [""])[-1].lower() in ("1", "true")
+
+
+class ProfilingMiddleware:
+    """Samples every thread's stack while a flagged request runs and stores the profile.
+
+    Sampling is process wide, so requests served concurrently show up in the same
+    profile (their stacks are still separate in the flamegraph). The response
+    carries X-Profile-Id; GET /profiles/{id} returns the folded stacks.
+    """
+
+    def __init__(self, app, out_dir: str = PROFILE_DIR):
+        self.app = app
+        self.out_dir = out_dir
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or StackSampler is None or not _wants_profile(scope):
+            return await self.app(scope, receive, send)
+        authorization = dict(scope.get("headers", [])).get(b"authorization", b"").decode("latin-1")
+        if not is_admin(authorization):
+            body = dump_json({"detail": "profiling_requires_admin"})
+            await send({"type": "http.response.start", "status": 403,
+                        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        sampler = StackSampler(REQUEST_SAMPLE_INTERVAL)
+        rss0 = sampler.reset_rss()
+        t0, cpu0 = time.perf_counter(), time.process_time()
+        status_code = [None]
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+                elapsed = (time.perf_counter() - t0) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                headers.append((b"server-timing", f"profile;dur={elapsed:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            sampler.stop()
+            self._store(profile_id, sampler, scope, status_code[0], {
+                "wall_ms": round((time.perf_counter() - t0) * 1000, 2),
+                "cpu_ms": round((time.process_time() - cpu0) * 1000, 2),
+                "peak_rss_mb": round(max(sampler.rss_peak, current_rss()) / 1e6, 1),
+                "rss_growth_mb": round((max(sampler.rss_peak, current_rss()) - rss0) / 1e6, 1),
+            })
+
+    def _store(self, profile_id: str, sampler, scope, status_code, timings: Dict[str, Any]):
+        os.makedirs(self.out_dir, exist_ok=True)
+        with open(os.path.join(self.out_dir, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+            f.write(sampler.folded())
+        meta = {"id": profile_id, "method": scope["method"], "path": scope["path"], "status": status_code,
+                "samples": sampler.samples, **timings}
+        with open(os.path.join(self.out_dir, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+
+def list_profiles(limit: int = 50) -> List[Dict[str, Any]]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((n for n in os.listdir(PROFILE_DIR) if n.endswith(".json")), reverse=True)[:limit]
+    out = []
+    for name in names:
+        with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+            out.append(json.load(f))
+    return out
+
+
+def profile_path(profile_id: str, suffix: str) -> Optional[str]:
+    if not profile_id.replace("-", "").isalnum():
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}{suffix}")
+    return path if os.path.exists(path) else None
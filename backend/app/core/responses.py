@@ -0,0 +1,246 @@
+# app/core/responses.py - content-negotiated, compressed responses for large payloads
+import gzip
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to stdlib json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+# Accept header values -> canonical media type
+MEDIA_ALIASES = {
+    "application/json": JSON_TYPE,
+    "application/geo+json": JSON_TYPE,
+    "application/msgpack": MSGPACK_TYPE,
+    "application/x-msgpack": MSGPACK_TYPE,
+    "application/vnd.apache.arrow.stream": ARROW_TYPE,
+    "application/vnd.apache.arrow.file": ARROW_TYPE,
+}
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _default(obj: Any):
+    # datetimes / uuids / decimals coming out of Supabase or numpy scalars
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+
+def dump_json(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def dump_msgpack(payload: Any) -> bytes:
+    return msgpack.packb(payload, default=_default, use_bin_type=True)
+
+
+def array_columns(payload: Any) -> Dict[str, np.ndarray]:
+    """The numpy columns of a column-oriented payload ({"lon": array, "lat": array, ...}),
+    or {} when the payload is not one (no arrays, or arrays of different lengths)"""
+    if not isinstance(payload, dict):
+        return {}
+    cols = {k: v for k, v in payload.items() if isinstance(v, np.ndarray) and v.ndim >= 1}
+    return cols if len({len(v) for v in cols.values()}) == 1 else {}
+
+
+def _arrow_column(values: np.ndarray):
+    # trailing dimensions (e.g. hex polygons, n x 6 x 2) become nested fixed-size lists
+    if values.ndim == 1:
+        return pa.array(values)
+    arr = pa.array(np.ascontiguousarray(values).reshape(-1))
+    for size in reversed(values.shape[1:]):
+        arr = pa.FixedSizeListArray.from_arrays(arr, size)
+    return arr
+
+
+def dump_arrow(payload: Any, rows_key: str = "data") -> bytes:
+    """Rows (or the arrays of a column-oriented payload) become an Arrow IPC stream;
+    the remaining top-level keys go into schema metadata"""
+    columns = array_columns(payload) if isinstance(payload, dict) and rows_key not in payload else {}
+    if columns:
+        table = pa.table({k: _arrow_column(v) for k, v in columns.items()})
+        skip = set(columns)
+    else:
+        table = pa.Table.from_pylist(payload.get(rows_key, []) if isinstance(payload, dict) else payload)
+        skip = {rows_key}
+    if isinstance(payload, dict):
+        meta = {k: json.dumps(v, default=_default) for k, v in payload.items() if k not in skip}
+        table = table.replace_schema_metadata(meta)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def available_formats() -> Dict[str, bool]:
+    return {JSON_TYPE: True, MSGPACK_TYPE: msgpack is not None, ARROW_TYPE: pa is not None}
+
+
+def parse_qvalues(header: Optional[str]) -> List[Tuple[str, float]]:
+    """(lower-cased token, q) per element of an Accept / Accept-Encoding header, in order"""
+    out = []
+    for part in (header or "").split(","):
+        fields = [f.strip() for f in part.split(";")]
+        if not fields[0]:
+            continue
+        q = 1.0
+        for f in fields[1:]:
+            if f.startswith("q="):
+                try:
+                    q = float(f[2:])
+                except ValueError:
+                    q = 0.0
+        out.append((fields[0].lower(), q))
+    return out
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """Pick the best supported media type from an Accept header (q-values honoured)"""
+    if not accept:
+        return JSON_TYPE
+    formats = available_formats()
+    candidates = []
+    for i, (token, q) in enumerate(parse_qvalues(accept)):
+        media = MEDIA_ALIASES.get(token)
+        if media and formats[media] and q > 0:
+            candidates.append((-q, i, media))
+    return min(candidates)[2] if candidates else JSON_TYPE
+
+
+def negotiate_encoding(accept_encoding: Optional[str], supported: Tuple[str, ...] = ("br", "gzip")) -> Optional[str]:
+    """Best content coding we can produce: highest q wins, q=0 refuses a coding, "*"
+    covers codings not listed, and ties go to the order of `supported`"""
+    qvalues = dict(parse_qvalues(accept_encoding))
+    best, best_q = None, 0.0
+    for encoding in supported:
+        if encoding == "br" and brotli is None:
+            continue
+        q = qvalues.get(encoding, qvalues.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+SERIALIZERS = {
+    JSON_TYPE: dump_json,
+    MSGPACK_TYPE: dump_msgpack,
+    ARROW_TYPE: dump_arrow,
+}
+
+
+def encode_payload(payload: Any, media_type: str = JSON_TYPE, encoding: Optional[str] = None,
+                   min_compress_bytes: int = COMPRESS_MIN_BYTES,
+                   serializers: Optional[Dict[str, Callable[[Any], bytes]]] = None) -> Dict[str, Any]:
+    """Serialize (+ optionally compress) a payload and time each step.
+
+    `serializers` overrides the default encoder per media type (e.g. a table's
+    precompiled Arrow schema from the schema registry).
+    """
+    t0 = time.perf_counter()
+    body = ((serializers or {}).get(media_type) or SERIALIZERS[media_type])(payload)
+    t1 = time.perf_counter()
+    raw_bytes = len(body)
+
+    applied = None
+    if encoding and raw_bytes >= min_compress_bytes:
+        if encoding == "br":
+            body = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        applied = encoding
+    t2 = time.perf_counter()
+
+    return {
+        "body": body,
+        "media_type": media_type,
+        "encoding": applied,
+        "raw_bytes": raw_bytes,
+        "serialize_ms": (t1 - t0) * 1000,
+        "compress_ms": (t2 - t1) * 1000,
+    }
+
+
+def fast_response(request: Request, payload: Any, status_code: int = 200,
+                  headers: Optional[Dict[str, str]] = None,
+                  serializers: Optional[Dict[str, Callable[[Any], bytes]]] = None) -> Response:
+    """Return a pre-serialized Response.
+
+    Returning a Response directly skips FastAPI's jsonable_encoder / response_model
+    pass, which is pure overhead for rows that come straight from Supabase.
+    """
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    result = encode_payload(payload, media_type, encoding, serializers=serializers)
+
+    out_headers = {
+        "Vary": "Accept, Accept-Encoding",
+        "X-Raw-Bytes": str(result["raw_bytes"]),
+        "X-Payload-Bytes": str(len(result["body"])),
+        "Server-Timing": f"serialize;dur={result['serialize_ms']:.2f}, compress;dur={result['compress_ms']:.2f}",
+    }
+    if result["encoding"]:
+        out_headers["Content-Encoding"] = result["encoding"]
+    if headers:
+        out_headers.update(headers)
+    return Response(content=result["body"], status_code=status_code, media_type=media_type, headers=out_headers)
+
+
+if __name__ == "__main__":
+    # python -m app.core.responses  -> latency / size per format on a synthetic table
+    rows = [
+        {
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "created_at": "2025-09-13T10:00:00+00:00",
+            "status": ["pending", "dispatched", "onsite", "completed"][i % 4],
+            "assigned_agent": f"agent{i % 25}",
+            "location": {"addr": f"Jl. Sudirman No. {i}"},
+            "rating": 4.5,
+        }
+        for i in range(20000)
+    ]
+    payload = {"table": "orders", "data": rows, "count": len(rows)}
+    print(f"{'format':<40}{'encoding':<10}{'raw KB':>10}{'wire KB':>10}{'ser ms':>10}{'comp ms':>10}")
+    for media_type, ok in available_formats().items():
+        if not ok:
+            print(f"{media_type:<40}(not installed)")
+            continue
+        for enc in [None, "gzip"] + (["br"] if brotli is not None else []):
+            r = encode_payload(payload, media_type, enc)
+            print(f"{media_type:<40}{str(r['encoding']):<10}{r['raw_bytes'] / 1024:>10.1f}"
+                  f"{len(r['body']) / 1024:>10.1f}{r['serialize_ms']:>10.1f}{r['compress_ms']:>10.1f}")
+    t0 = time.perf_counter()
+    baseline = json.dumps(payload).encode()
+    print(f"{'stdlib json (baseline)':<40}{'None':<10}{len(baseline) / 1024:>10.1f}"
+          f"{len(baseline) / 1024:>10.1f}{(time.perf_counter() - t0) * 1000:>10.1f}{0:>10.1f}")
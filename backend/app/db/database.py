@@ -1,37 +1,170 @@
 # app/db/database.py
-from typing import List, Dict, Any, Optional
+import re
+from typing import List, Dict, Any, Optional, Union, Callable
 from supabase import Client
 from app.db.supabase import get_supabase
+from app.db.schema import schema_registry
+
+OrderBy = Union[str, List[str], None]
+
+# Plain column names, optionally followed by a JSONB path (location->>addr, timestamps->>dispatched)
+COLUMN_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+JSON_KEY_RE = re.compile(r"^[A-Za-z0-9_]+$")
+
+# JSONB columns that may be filtered/ordered by path
+JSONB_PATH_COLUMNS = {
+    "orders": {"location", "timestamps", "vehicle", "manual_assignment"},
+}
+
+# operator name -> postgrest builder method
+SIMPLE_OPERATORS = {
+    "eq": "eq",
+    "neq": "neq",
+    "gt": "gt",
+    "gte": "gte",
+    "lt": "lt",
+    "lte": "lte",
+    "like": "like",
+    "ilike": "ilike",
+}
+
+
+class QueryValidationError(ValueError):
+    """Raised when a filter / projection / ordering spec is malformed"""
+
+
+def validate_column(table_name: str, column: str) -> str:
+    """Validate a column reference, allowing JSONB paths on whitelisted columns"""
+    parts = re.split(r"(->>?)", column)
+    base = parts[0]
+    if not COLUMN_RE.match(base):
+        raise QueryValidationError(f"Invalid column: {column}")
+    if not schema_registry.has_column(table_name, base):
+        raise QueryValidationError(f"Unknown column: {table_name}.{base}")
+    if len(parts) == 1:
+        return column
+
+    if base not in JSONB_PATH_COLUMNS.get(table_name, set()):
+        raise QueryValidationError(f"JSON path filters are not supported on {table_name}.{base}")
+    keys = parts[2::2]
+    arrows = parts[1::2]
+    if any(not JSON_KEY_RE.match(k) for k in keys) or any(a == "->>" for a in arrows[:-1]):
+        raise QueryValidationError(f"Invalid JSON path: {column}")
+    return column
+
+
+def validate_record(table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Reject writes to columns the table does not have before they reach PostgREST"""
+    unknown = [k for k in data if not schema_registry.has_column(table_name, k)]
+    if unknown:
+        raise QueryValidationError(f"Unknown columns for {table_name}: {', '.join(sorted(unknown))}")
+    return data
+
+
+def build_select(table_name: str, columns: Optional[List[str]], select: str = "*") -> str:
+    """Build the select clause; an explicit column list is validated strictly"""
+    if not columns:
+        return select or "*"
+    return ",".join(validate_column(table_name, c) for c in columns)
+
+
+def parse_order_by(table_name: str, order_by: OrderBy) -> List[tuple]:
+    """Parse "a,-b" or ["a", "-b"] into [(column, desc), ...]"""
+    if not order_by:
+        return []
+    items = order_by.split(",") if isinstance(order_by, str) else order_by
+
+    result = []
+    for item in items:
+        item = item.strip()
+        desc = item.startswith("-")
+        column = item[1:] if desc else item
+        if ":" in column:
+            column, direction = column.rsplit(":", 1)
+            if direction not in ("asc", "desc"):
+                raise QueryValidationError(f"Invalid order direction: {item}")
+            desc = direction == "desc"
+        result.append((validate_column(table_name, column), desc))
+    return result
+
+
+def apply_filters(query, table_name: str, filters: Optional[Dict[str, Any]]):
+    """Apply the filter grammar to a postgrest query.
+
+    {"status": "pending"}                           -> eq
+    {"status": ["pending", "dispatched"]}           -> in
+    {"created_at": {"gte": "2025-01-01"}}           -> gt/gte/lt/lte/neq/like/ilike
+    {"created_at": {"range": [start, end]}}         -> gte start and lte end
+    {"workshop_id": {"is": None}}                   -> is null (also true/false)
+    {"location->>addr": {"ilike": "%sudirman%"}}    -> JSONB path filter
+    """
+    if not filters:
+        return query
+
+    for column, value in filters.items():
+        column = validate_column(table_name, column)
+        if isinstance(value, list):
+            query = query.in_(column, value)
+        elif isinstance(value, dict):
+            for op, operand in value.items():
+                if op in SIMPLE_OPERATORS:
+                    query = getattr(query, SIMPLE_OPERATORS[op])(column, operand)
+                elif op == "in":
+                    if not isinstance(operand, list):
+                        raise QueryValidationError(f"'in' expects a list for {column}")
+                    query = query.in_(column, operand)
+                elif op == "is":
+                    if operand not in (None, True, False):
+                        raise QueryValidationError(f"'is' expects null/true/false for {column}")
+                    query = query.is_(column, "null" if operand is None else str(operand).lower())
+                elif op == "not_null":
+                    query = query.not_.is_(column, "null") if operand else query.is_(column, "null")
+                elif op == "range":
+                    if not isinstance(operand, list) or len(operand) != 2:
+                        raise QueryValidationError(f"'range' expects [start, end] for {column}")
+                    start, end = operand
+                    if start is not None:
+                        query = query.gte(column, start)
+                    if end is not None:
+                        query = query.lte(column, end)
+                else:
+                    raise QueryValidationError(f"Unsupported operator '{op}' on {column}")
+        else:
+            query = query.eq(column, value)
+    return query
+
 
 class DatabaseService:
     def __init__(self):
         self.supabase = get_supabase()
+        if schema_registry.client is None:
+            schema_registry.client = self.supabase
+        self.write_listeners: List[Callable[[str, str, Dict[str, Any]], None]] = []
+
+    def add_write_listener(self, listener: Callable[[str, str, Dict[str, Any]], None]):
+        """Register a callback(table_name, op, record) fired after every successful write"""
+        self.write_listeners.append(listener)
+
+    def _notify_write(self, table_name: str, op: str, record: Dict[str, Any]):
+        for listener in self.write_listeners:
+            try:
+                listener(table_name, op, record)
+            except Exception as e:
+                # a broken listener must never fail the write itself
+                print(f"Write listener failed for {table_name} {op}: {e}")
     
     async def get_all_tables(self) -> List[str]:
-        """Get list of all table names in your database"""
-        try:
-            # Query information_schema to get table names
-            response = self.supabase.rpc('get_table_names').execute()
-            return response.data
-        except Exception as e:
-            # Fallback: return common table names or handle manually
-            print(f"Could not fetch table names: {e}")
-            return []
+        """Get list of all table names in your database (from the cached schema registry)"""
+        return schema_registry.table_names()
     
     async def get_table_structure(self, table_name: str) -> Dict[str, Any]:
-        """Get the structure/columns of a specific table"""
-        try:
-            # Get first row to understand structure
-            response = self.supabase.table(table_name).select("*").limit(1).execute()
-            if response.data:
-                return {"columns": list(response.data[0].keys()), "sample": response.data[0]}
-            return {"columns": [], "sample": {}}
-        except Exception as e:
-            raise Exception(f"Could not fetch structure for table {table_name}: {str(e)}")
+        """Get the structure/columns of a specific table without querying it"""
+        return schema_registry.structure(table_name)
     
     # Generic CRUD operations for any table
     async def get_all(self, table_name: str, select: str = "*") -> List[Dict[str, Any]]:
         """Get all records from any table"""
+        schema_registry.require_table(table_name)
         try:
             response = self.supabase.table(table_name).select(select).execute()
             return response.data or []
@@ -40,6 +173,7 @@ class DatabaseService:
     
     async def get_by_id(self, table_name: str, record_id: int, select: str = "*") -> Optional[Dict[str, Any]]:
         """Get single record by ID from any table"""
+        schema_registry.require_table(table_name)
         try:
             response = self.supabase.table(table_name).select(select).eq("id", record_id).execute()
             return response.data[0] if response.data else None
@@ -48,51 +182,79 @@ class DatabaseService:
     
     async def create_record(self, table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Create new record in any table"""
+        schema_registry.require_table(table_name)
+        validate_record(table_name, data)
         try:
             response = self.supabase.table(table_name).insert(data).execute()
-            return response.data[0] if response.data else {}
+            record = response.data[0] if response.data else {}
+            if record:
+                self._notify_write(table_name, "insert", record)
+            return record
         except Exception as e:
             raise Exception(f"Failed to create record in {table_name}: {str(e)}")
     
     async def update_record(self, table_name: str, record_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
         """Update record in any table"""
+        schema_registry.require_table(table_name)
+        validate_record(table_name, data)
         try:
             response = self.supabase.table(table_name).update(data).eq("id", record_id).execute()
-            return response.data[0] if response.data else {}
+            record = response.data[0] if response.data else {}
+            if record:
+                self._notify_write(table_name, "update", record)
+            return record
         except Exception as e:
             raise Exception(f"Failed to update {table_name} record {record_id}: {str(e)}")
     
     async def delete_record(self, table_name: str, record_id: int) -> bool:
         """Delete record from any table"""
+        schema_registry.require_table(table_name)
         try:
             response = self.supabase.table(table_name).delete().eq("id", record_id).execute()
-            return len(response.data) > 0 if response.data else False
+            deleted = len(response.data) > 0 if response.data else False
+            if deleted:
+                self._notify_write(table_name, "delete", response.data[0])
+            return deleted
         except Exception as e:
             raise Exception(f"Failed to delete {table_name} record {record_id}: {str(e)}")
     
-    async def query_table(self, table_name: str, filters: Dict[str, Any] = None, 
-                         select: str = "*", limit: int = None, order_by: str = None) -> List[Dict[str, Any]]:
-        """Advanced query with filters"""
+    async def query_table(self, table_name: str, filters: Dict[str, Any] = None,
+                         select: str = "*", limit: int = None, order_by: OrderBy = None,
+                         columns: Optional[List[str]] = None, offset: int = None) -> List[Dict[str, Any]]:
+        """Advanced query with filters, projection and multi-column ordering"""
+        schema_registry.require_table(table_name)
         try:
-            query = self.supabase.table(table_name).select(select)
-            
-            if filters:
-                for column, value in filters.items():
-                    if isinstance(value, list):
-                        query = query.in_(column, value)
-                    else:
-                        query = query.eq(column, value)
-            
-            if order_by:
-                query = query.order(order_by)
-            
+            query = self.supabase.table(table_name).select(build_select(table_name, columns, select))
+            query = apply_filters(query, table_name, filters)
+
+            for column, desc in parse_order_by(table_name, order_by):
+                query = query.order(column, desc=desc)
+
             if limit:
                 query = query.limit(limit)
-            
+
+            if offset:
+                query = query.offset(offset)
+
             response = query.execute()
             return response.data or []
+        except QueryValidationError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to query {table_name}: {str(e)}")
 
+    async def count_table(self, table_name: str, filters: Dict[str, Any] = None) -> int:
+        """Exact row count for a (filtered) table without transferring any rows"""
+        schema_registry.require_table(table_name)
+        try:
+            query = self.supabase.table(table_name).select("id", count="exact", head=True)
+            query = apply_filters(query, table_name, filters)
+            response = query.execute()
+            return response.count or 0
+        except QueryValidationError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to count {table_name}: {str(e)}")
+
 # Global service instance
 db_service = DatabaseService()
\ No newline at end of file
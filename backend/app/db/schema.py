@@ -0,0 +1,230 @@
+# app/db/schema.py - cached table / column metadata for the generic table routes
+import json
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.core.config import SCHEMA_DUMP, SCHEMA_TTL
+from app.core.responses import ARROW_TYPE, dump_arrow, dump_json, _default
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+CREATE_TABLE_RE = re.compile(r"CREATE TABLE\s+(?:IF NOT EXISTS\s+)?(?:public\.)?\"?(\w+)\"?\s*\((.*?)\n\);", re.S | re.I)
+# the type runs up to the first constraint keyword (or the end of the line), so multi-word
+# types such as "double precision" or "timestamp with time zone" are kept whole
+COLUMN_DEF_RE = re.compile(
+    r'^\s*"?(\w+)"?\s+([a-z].*?)\s*'
+    r'(?:\b(?:not|null|default|primary|references|unique|check|constraint|generated|collate)\b.*)?,?\s*$', re.I)
+CONSTRAINT_WORDS = ("primary", "constraint", "unique", "foreign", "check", "exclude")
+
+# postgres type (without modifiers) -> arrow type of the value PostgREST returns
+ARROW_TYPES = {
+    "smallint": "int64", "integer": "int64", "int": "int64", "bigint": "int64", "serial": "int64",
+    "bigserial": "int64", "numeric": "float64", "real": "float64", "double precision": "float64",
+    "boolean": "bool", "bool": "bool",
+    "json": "json", "jsonb": "json",
+}
+
+
+class UnknownTableError(ValueError):
+    """Raised for a table the registry knows does not exist"""
+
+
+def parse_dump(sql: str) -> Dict[str, Dict[str, Any]]:
+    """{table: {"columns": {name: pg_type}, "primary_key": name}} from CREATE TABLE statements"""
+    tables = {}
+    for name, body in CREATE_TABLE_RE.findall(sql):
+        columns, primary_key = {}, None
+        for line in body.splitlines():
+            line = line.split("--", 1)[0].strip()
+            if not line or line.lower().startswith(CONSTRAINT_WORDS):
+                continue
+            m = COLUMN_DEF_RE.match(line)
+            if not m:
+                continue
+            column, pg_type = m.group(1), m.group(2).strip().lower()
+            columns[column] = " ".join(re.sub(r"\(.*?\)", " ", pg_type).split())
+            if "primary key" in line.lower():
+                primary_key = column
+        tables[name] = {"columns": columns, "primary_key": primary_key}
+    return tables
+
+
+def _table_name(item: Any) -> str:
+    # get_table_names may return ["orders", ...] or [{"table_name": "orders"}, ...]
+    if isinstance(item, dict):
+        return str(item.get("table_name") or item.get("name") or next(iter(item.values())))
+    return str(item)
+
+
+class TableSerializer:
+    """Per-table response encoders built once from the column types.
+
+    Arrow output gets a precomputed schema per projected column set, so
+    pa.Table.from_pylist skips inferring types from every row; JSONB values are
+    shipped as JSON text since their shape varies from row to row.
+    """
+
+    def __init__(self, table: str, columns: Dict[str, str]):
+        self.table = table
+        self.columns = columns
+        self.arrow_schemas: Dict[Tuple[str, ...], Any] = {}
+
+    def _arrow_type(self, pg_type: str):
+        kind = ARROW_TYPES.get(pg_type, "string")
+        if kind == "json":
+            return pa.string()
+        return {"int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_()}.get(kind, pa.string())
+
+    def arrow_schema(self, keys: Tuple[str, ...]):
+        schema = self.arrow_schemas.get(keys)
+        if schema is None:
+            schema = pa.schema([(k, self._arrow_type(self.columns[k])) for k in keys])
+            self.arrow_schemas[keys] = schema
+        return schema
+
+    def dump_arrow(self, payload: Any, rows_key: str = "data") -> bytes:
+        rows = payload.get(rows_key, []) if isinstance(payload, dict) else payload
+        keys = tuple(rows[0]) if rows else ()
+        if not rows or any(k not in self.columns for k in keys):
+            # JSON path selects / unknown aliases: let arrow infer
+            return dump_arrow(payload, rows_key)
+
+        json_cols = [k for k in keys if ARROW_TYPES.get(self.columns[k]) == "json"]
+        if json_cols:
+            rows = [dict(r, **{k: None if r.get(k) is None else dump_json(r[k]).decode() for k in json_cols})
+                    for r in rows]
+        table = pa.Table.from_pylist(rows, schema=self.arrow_schema(keys))
+        if isinstance(payload, dict):
+            meta = {k: json.dumps(v, default=_default) for k, v in payload.items() if k != rows_key}
+            table = table.replace_schema_metadata(meta)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    def serializers(self) -> Dict[str, Any]:
+        """media type -> serializer overrides for fast_response"""
+        return {ARROW_TYPE: self.dump_arrow} if pa is not None else {}
+
+
+class SchemaRegistry:
+    """Table and column metadata loaded once and refreshed every `ttl` seconds.
+
+    Table names come from the get_table_names RPC when it is available, column
+    definitions from dump.sql; tables the dump does not describe have their
+    columns inferred from one sample row, once per refresh. While nothing could
+    be loaded at all the registry stays permissive instead of rejecting every
+    request.
+    """
+
+    def __init__(self, client=None, dump_path: str = SCHEMA_DUMP, ttl: float = SCHEMA_TTL):
+        self.client = client
+        self.dump_path = dump_path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self.source: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self._serializers: Dict[str, TableSerializer] = {}
+
+    # --- loading ----------------------------------------------------------------------
+    def _load_dump(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.dump_path, encoding="utf-8") as f:
+                return parse_dump(f.read())
+        except OSError:
+            return {}
+
+    def _load_names(self) -> Optional[List[str]]:
+        if self.client is None:
+            return None
+        try:
+            data = self.client.rpc("get_table_names").execute().data
+        except Exception as e:
+            print(f"⚠️ Schema registry could not call get_table_names: {e}")
+            return None
+        return [_table_name(item) for item in data or []]
+
+    def refresh(self):
+        dump = self._load_dump()
+        names = self._load_names()
+        if names:
+            tables = {n: dump.get(n, {"columns": None, "primary_key": None}) for n in names}
+            source = "rpc+dump" if dump else "rpc"
+        else:
+            tables, source = dump, ("dump" if dump else None)
+        with self.lock:
+            if tables or not self.tables:
+                self.tables, self.source = tables, source
+                self._serializers = {}
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def _ensure(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            self.refresh()
+
+    # --- lookups ----------------------------------------------------------------------
+    def table_names(self) -> List[str]:
+        self._ensure()
+        return sorted(self.tables)
+
+    def require_table(self, table_name: str) -> Dict[str, Any]:
+        self._ensure()
+        if not self.tables:
+            return {"columns": None, "primary_key": None}
+        meta = self.tables.get(table_name)
+        if meta is None:
+            raise UnknownTableError(f"Unknown table: {table_name}")
+        return meta
+
+    def columns(self, table_name: str) -> Optional[Dict[str, str]]:
+        """{column: pg_type} or None when the columns are not known"""
+        meta = self.require_table(table_name)
+        if meta["columns"] is None and self.client is not None and table_name in self.tables:
+            meta["columns"] = self._infer_columns(table_name)
+        return meta["columns"] or None
+
+    def _infer_columns(self, table_name: str) -> Dict[str, str]:
+        try:
+            rows = self.client.table(table_name).select("*").limit(1).execute().data
+        except Exception:
+            return {}
+        return {k: "unknown" for k in rows[0]} if rows else {}
+
+    def has_column(self, table_name: str, column: str) -> bool:
+        columns = self.columns(table_name)
+        return columns is None or column in columns
+
+    def structure(self, table_name: str) -> Dict[str, Any]:
+        columns = self.columns(table_name) or {}
+        return {"columns": list(columns), "types": columns,
+                "primary_key": self.tables.get(table_name, {}).get("primary_key"), "source": self.source}
+
+    def serializer(self, table_name: str) -> Optional[TableSerializer]:
+        """Cached per-table encoder, None when the column types are unknown"""
+        ser = self._serializers.get(table_name)
+        if ser is None:
+            try:
+                columns = self.columns(table_name)
+            except UnknownTableError:
+                return None
+            if not columns or "unknown" in columns.values():
+                return None
+            ser = self._serializers[table_name] = TableSerializer(table_name, columns)
+        return ser
+
+    def serializers(self, table_name: str) -> Dict[str, Any]:
+        ser = self.serializer(table_name)
+        return ser.serializers() if ser else {}
+
+
+# Global instance (bound to the Supabase client by DatabaseService / main)
+schema_registry = SchemaRegistry()
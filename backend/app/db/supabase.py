@@ -23,4 +23,14 @@ supabase_client = SupabaseClient()
 
 def get_supabase() -> Client:
     """Dependency to get Supabase client"""
-    return supabase_client.get_client()
\ No newline at end of file
+    return supabase_client.get_client()
+
+_service_client = None
+
+def get_service_client() -> Client:
+    """Client with the service role key (falls back to the anon key), used for app_users"""
+    global _service_client
+    if _service_client is None:
+        key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or supabase_client.key
+        _service_client = create_client(supabase_client.url, key)
+    return _service_client
@@ -10,6 +10,17 @@ load_dotenv()
 
 app = FastAPI(title="FYP BAWaterBender Backend")
 
+from app.core.admission import AdmissionMiddleware, admission_metrics
+from app.core.config import ADMISSION_ENABLED
+from app.core.profiling import ProfilingMiddleware
+
+# innermost, so time spent queued in admission control is not part of a profile
+app.add_middleware(ProfilingMiddleware)
+
+if ADMISSION_ENABLED:
+    # added before CORS so rejections (429/503) still carry CORS headers
+    app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Configure properly for production
@@ -29,6 +40,47 @@ else:
     supabase = None
     print("⚠️ Supabase credentials not found - database features will be disabled")
 
+from app.db.schema import schema_registry, UnknownTableError
+from app.routers import geo as geo_router
+from app.routers import accessibility as accessibility_router
+from app.routers import jobs as jobs_router
+from app.routers import map as map_router
+from app.routers import profiles as profiles_router
+from app.services.clusters import cluster_index
+from app.services.etl_tasks import job_runner
+
+app.include_router(geo_router.router)
+app.include_router(accessibility_router.router)
+app.include_router(jobs_router.router)
+app.include_router(map_router.router)
+app.include_router(profiles_router.router)
+
+@app.on_event("startup")
+def start_job_runner():
+    job_runner.start()
+
+@app.on_event("startup")
+def build_point_clusters():
+    cluster_index.build_startup_layers()
+
+@app.on_event("shutdown")
+def stop_job_runner():
+    job_runner.stop()
+
+if supabase:
+    schema_registry.client = supabase
+
+    # routers that need the shared DatabaseService are only mounted when configured
+    from app.routers import auth as auth_router
+    from app.routers import summary as summary_router
+
+    app.include_router(auth_router.router)
+    app.include_router(summary_router.router)
+
+    @app.on_event("startup")
+    def build_in_memory_aggregates():
+        summary_router.build_summaries()
+
 @app.get("/")
 async def root():
     return {"message": "FYP BAWaterBender Backend is running!"}
@@ -37,6 +89,11 @@ async def root():
 def health():
     return {"ok": True}
 
+@app.get("/health/admission")
+def admission():
+    """Per route class: in service / queued, rejections and queue vs service time percentiles"""
+    return {"enabled": ADMISSION_ENABLED, "classes": admission_metrics()}
+
 @app.get("/health/db")
 async def check_db_connection():
     if not supabase:
@@ -57,9 +114,8 @@ async def get_tables():
         raise HTTPException(status_code=500, detail="Database not configured")
     
     try:
-        # Try to get table information from information_schema
-        response = supabase.rpc('get_table_names').execute()
-        return {"tables": response.data}
+        # Served from the schema registry (get_table_names / dump.sql, refreshed on a TTL)
+        return {"tables": schema_registry.table_names()}
     except Exception as e:
         return {"message": "Could not fetch table names automatically", "error": str(e)}
 
@@ -70,12 +126,15 @@ async def get_table_data(table_name: str, limit: int = 10):
         raise HTTPException(status_code=500, detail="Database not configured")
     
     try:
+        schema_registry.require_table(table_name)
         response = supabase.table(table_name).select("*").limit(limit).execute()
         return {
             "table": table_name,
             "data": response.data,
             "count": len(response.data) if response.data else 0
         }
+    except UnknownTableError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching from {table_name}: {str(e)}")
 
@@ -86,6 +145,7 @@ async def get_record(table_name: str, record_id: int):
         raise HTTPException(status_code=500, detail="Database not configured")
     
     try:
+        schema_registry.require_table(table_name)
         response = supabase.table(table_name).select("*").eq("id", record_id).execute()
         if response.data:
             return {"table": table_name, "record": response.data[0]}
@@ -93,6 +153,8 @@ async def get_record(table_name: str, record_id: int):
             raise HTTPException(status_code=404, detail="Record not found")
     except HTTPException:
         raise
+    except UnknownTableError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fet ing record: {str(e)}")
 
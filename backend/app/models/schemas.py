@@ -0,0 +1,25 @@
+# app/models/schemas.py
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+
+class RegisterIn(BaseModel):
+    username: str
+    password: str
+    display_name: Optional[str] = None
+
+
+class LoginIn(BaseModel):
+    username: str
+    password: str
+
+
+class MeOut(BaseModel):
+    id: str
+    username: str
+    display_name: Optional[str] = None
+    role: str = "user"
+    profile: Optional[Dict] = None
@@ -0,0 +1,150 @@
+# app/routers/accessibility.py - what-if accessibility under facility closures + the precomputed cube
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Request, Query
+from pydantic import BaseModel
+
+from app.core.caching import stamps_etag, not_modified, cache_headers
+from app.core.responses import fast_response, negotiate_media_type
+from app.routers.geo import parse_bbox
+from app.services.accessibility import accessibility_model
+from app.services.accessibility_cube import accessibility_cube_store
+
+router = APIRouter(prefix="/accessibility", tags=["accessibility"])
+
+
+class NewFacility(BaseModel):
+    lon: float
+    lat: float
+    category: str
+    weight: Optional[float] = None
+
+
+class ClosureBatch(BaseModel):
+    close: List[int] = []
+    reopen: List[int] = []
+    reweight: Dict[int, float] = {}
+    add: List[NewFacility] = []
+    # close every facility inside a lon/lat bbox ("minlon,minlat,maxlon,maxlat"), e.g. a flooded area
+    close_bbox: Optional[str] = None
+    close_categories: Optional[List[str]] = None
+
+
+# The handlers that touch the model are plain `def`: FastAPI runs them in its threadpool,
+# so the first-request load() and the numpy work never block the event loop.
+def get_model():
+    if not accessibility_model.loaded:
+        with accessibility_model.lock:
+            if not accessibility_model.loaded:
+                try:
+                    accessibility_model.load()
+                except (FileNotFoundError, KeyError):
+                    raise HTTPException(status_code=503, detail="accessibility_inputs_not_built")
+    return accessibility_model
+
+
+def check_category(model, category: Optional[str]):
+    if category and category not in model.categories:
+        raise HTTPException(status_code=400, detail="unknown_category")
+
+
+@router.get("")
+def get_accessibility_info():
+    """Model size, categories and the facilities currently closed or added"""
+    return get_model().info()
+
+
+@router.get("/scores")
+def get_accessibility_scores(request: Request, category: Optional[str] = None,
+                             metric: str = Query("hansen", pattern="^(hansen|2sfca)$"),
+                             bbox: Optional[str] = None):
+    """Current per-origin scores for one category (or all categories summed)"""
+    model = get_model()
+    check_category(model, category)
+    return fast_response(request, model.scores(category, metric, parse_bbox(bbox)))
+
+
+@router.post("/closures")
+def apply_closures(request: Request, batch: ClosureBatch):
+    """Apply a batch of closures / reopenings / re-weights / new facilities and
+    return the origins whose scores changed"""
+    model = get_model()
+    for c in (batch.close_categories or []) + [f.category for f in batch.add]:
+        check_category(model, c)
+    close = list(batch.close)
+    bbox = parse_bbox(batch.close_bbox)
+    try:
+        if bbox:
+            close += model.facilities_in_bbox(bbox, batch.close_categories).tolist()
+        result = model.apply(close=close, reopen=batch.reopen, reweight=batch.reweight,
+                             add=[f.model_dump() for f in batch.add])
+    except IndexError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return fast_response(request, result)
+
+
+@router.post("/reset")
+def reset_accessibility():
+    """Reopen everything and drop added facilities"""
+    model = get_model()
+    with model.lock:
+        model.reset()
+    return {"message": "Accessibility model reset", "facilities": int(len(model.weight))}
+
+
+# --- precomputed multi-category cube (read only, no model load) -------------------------
+def cube_etag(origin_set: Optional[str], *parts) -> str:
+    """Validator tied to the files a response reads (meta.json plus the set's cube / origins)"""
+    return stamps_etag("cube", accessibility_cube_store.files(origin_set), origin_set, *parts)
+
+
+@router.get("/cube")
+async def get_cube_meta(request: Request):
+    """Origin sets, categories (with priority / weight) and metrics of the precomputed cube"""
+    try:
+        etag = cube_etag(None, "meta")
+        return not_modified(request, etag, "geo") or fast_response(request, accessibility_cube_store.meta,
+                                                                    headers=cache_headers(etag, "geo"))
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="accessibility_cube_not_built")
+
+
+@router.get("/cube/{origin_set}")
+async def get_cube_slice(request: Request, origin_set: str, category: Optional[str] = None,
+                         metric: str = Query("hansen", pattern="^(hansen|2sfca|count|nearest_m)$"),
+                         bbox: Optional[str] = None):
+    """One metric for every origin of a set: one category, or all categories as columns"""
+    try:
+        etag = cube_etag(origin_set, category, metric, bbox, negotiate_media_type(request.headers.get("accept")))
+        cached = not_modified(request, etag, "geo")
+        if cached is not None:
+            return cached
+        if category and category not in accessibility_cube_store.meta["categories"]:
+            raise HTTPException(status_code=400, detail="unknown_category")
+        result = accessibility_cube_store.query(origin_set, metric, category, parse_bbox(bbox))
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="accessibility_cube_not_built")
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No origin set {origin_set}; available: "
+                                                    f"{accessibility_cube_store.origin_sets()}")
+    return fast_response(request, result, headers=cache_headers(etag, "geo"))
+
+
+@router.get("/cube/{origin_set}/{origin}")
+async def get_cube_origin(request: Request, origin_set: str, origin: int):
+    """Every category x metric score of one origin"""
+    try:
+        etag = cube_etag(origin_set, origin, negotiate_media_type(request.headers.get("accept")))
+        cached = not_modified(request, etag, "geo")
+        if cached is not None:
+            return cached
+        result = accessibility_cube_store.origin(origin_set, origin)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="accessibility_cube_not_built")
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No origin set {origin_set}")
+    except IndexError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return fast_response(request, result, headers=cache_headers(etag, "geo"))
@@ -1,7 +1,10 @@
 # app/routers/database.py - New router for database operations
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any, List, Optional
-from app.db.database import db_service
+from fastapi import APIRouter, HTTPException, Depends, Request
+from typing import Dict, Any, List, Optional, Union
+from app.db.database import db_service, QueryValidationError
+from app.db.schema import schema_registry, UnknownTableError
+from app.core.responses import fast_response, negotiate_media_type
+from app.core.caching import table_versions, not_modified, cache_headers
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/db", tags=["database"])
@@ -15,8 +18,14 @@ class UpdateRecordRequest(BaseModel):
 class QueryRequest(BaseModel):
     filters: Optional[Dict[str, Any]] = None
     select: Optional[str] = "*"
+    columns: Optional[List[str]] = None  # strict projection, takes precedence over select
     limit: Optional[int] = None
-    order_by: Optional[str] = None
+    offset: Optional[int] = None
+    order_by: Optional[Union[str, List[str]]] = None  # "status,-created_at" or ["status", "-created_at"]
+    count_only: bool = False
+
+# every write through the API invalidates that table's ETags
+db_service.add_write_listener(table_versions.bump)
 
 @router.get("/tables")
 async def get_all_tables():
@@ -33,31 +42,55 @@ async def get_table_structure(table_name: str):
     try:
         structure = await db_service.get_table_structure(table_name)
         return {"table": table_name, "structure": structure}
+    except UnknownTableError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/tables/{table_name}")
-async def get_table_data(table_name: str, limit: Optional[int] = None):
-    """Get all data from a table"""
+async def get_table_data(request: Request, table_name: str, limit: Optional[int] = None, count_only: bool = False):
+    """Get all data from a table (conditional on If-None-Match)"""
     try:
+        schema_registry.require_table(table_name)
+        etag = table_versions.etag(table_name, limit, count_only, negotiate_media_type(request.headers.get("accept")))
+        cached = not_modified(request, etag, "table")
+        if cached is not None:
+            return cached
+        if count_only:
+            count = await db_service.count_table(table_name)
+            return fast_response(request, {"table": table_name, "count": count}, headers=cache_headers(etag, "table"))
         if limit:
             data = await db_service.query_table(table_name, limit=limit)
         else:
             data = await db_service.get_all(table_name)
-        return {"table": table_name, "data": data, "count": len(data)}
+        return fast_response(request, {"table": table_name, "data": data, "count": len(data)},
+                             headers=cache_headers(etag, "table"), serializers=schema_registry.serializers(table_name))
+    except UnknownTableError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except QueryValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/tables/{table_name}/{record_id}")
-async def get_record(table_name: str, record_id: int):
-    """Get single record by ID"""
+async def get_record(request: Request, table_name: str, record_id: int):
+    """Get single record by ID (conditional on If-None-Match)"""
     try:
+        schema_registry.require_table(table_name)
+        etag = table_versions.etag(table_name, "record", record_id, negotiate_media_type(request.headers.get("accept")))
+        cached = not_modified(request, etag, "record")
+        if cached is not None:
+            return cached
         record = await db_service.get_by_id(table_name, record_id)
         if not record:
             raise HTTPException(status_code=404, detail="Record not found")
-        return {"table": table_name, "record": record}
+        return fast_response(request, {"table": table_name, "record": record}, headers=cache_headers(etag, "record"))
     except HTTPException:
         raise
+    except UnknownTableError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except QueryValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -67,6 +100,10 @@ async def create_record(table_name: str, request: CreateRecordRequest):
     try:
         record = await db_service.create_record(table_name, request.data)
         return {"table": table_name, "record": record, "message": "Record created successfully"}
+    except UnknownTableError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except QueryValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -80,6 +117,10 @@ async def update_record(table_name: str, record_id: int, request: UpdateRecordRe
         return {"table": table_name, "record": record, "message": "Record updated successfully"}
     except HTTPException:
         raise
+    except UnknownTableError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except QueryValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -93,20 +134,34 @@ async def delete_record(table_name: str, record_id: int):
         return {"table": table_name, "message": "Record deleted successfully"}
     except HTTPException:
         raise
+    except UnknownTableError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except QueryValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/tables/{table_name}/query")
-async def query_table(table_name: str, request: QueryRequest):
+async def query_table(table_name: str, request: QueryRequest, http_request: Request):
     """Advanced query with filters"""
     try:
+        if request.count_only:
+            count = await db_service.count_table(table_name, request.filters)
+            return {"table": table_name, "count": count}
         data = await db_service.query_table(
             table_name, 
             request.filters, 
             request.select, 
             request.limit, 
-            request.order_by
+            request.order_by,
+            columns=request.columns,
+            offset=request.offset
         )
-        return {"table": table_name, "data": data, "count": len(data)}
+        return fast_response(http_request, {"table": table_name, "data": data, "count": len(data)},
+                             serializers=schema_registry.serializers(table_name))
+    except QueryValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnknownTableError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,144 @@
+# app/routers/geo.py - precomputed geo layers (no database access)
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Request, Query
+from pydantic import BaseModel
+
+from app.core.caching import weak_etag, stamps_etag, not_modified, cache_headers
+from app.core.responses import ARROW_TYPE, fast_response, negotiate_media_type
+from app.services.clusters import cluster_index, LayerClusters, MAX_ZOOM
+from app.services.hex_grid import hex_grid_store
+from app.services.postal_codes import postal_codes
+
+router = APIRouter(prefix="/geo", tags=["geo"])
+
+
+def parse_bbox(bbox: Optional[str]):
+    """"minlon,minlat,maxlon,maxlat" -> tuple of floats"""
+    if not bbox:
+        return None
+    try:
+        parts = tuple(float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_bbox")
+    if len(parts) != 4:
+        raise HTTPException(status_code=400, detail="invalid_bbox")
+    return parts
+
+def hexgrid_etag(*parts) -> str:
+    """Validator tied to the pyramid build (meta.json and every res_*.npz) plus the request shape"""
+    files = [os.path.join(hex_grid_store.path, level["file"]) for level in hex_grid_store.meta["resolutions"]]
+    return stamps_etag("hex", [os.path.join(hex_grid_store.path, "meta.json")] + files, *parts)
+
+@router.get("/hexgrid")
+async def get_hexgrid_meta(request: Request):
+    """Available hexagon resolutions and categories"""
+    try:
+        etag = hexgrid_etag("meta")
+        return not_modified(request, etag, "geo") or fast_response(request, hex_grid_store.meta,
+                                                                    headers=cache_headers(etag, "geo"))
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="hex_grid_not_built")
+
+@router.get("/hexgrid/{size_m}")
+async def get_hexgrid(request: Request, size_m: int, bbox: Optional[str] = None,
+                      category: Optional[str] = None,
+                      format: str = Query("geojson", pattern="^(geojson|arrays)$")):
+    """One resolution of the hex pyramid, optionally sliced to a bbox"""
+    try:
+        etag = hexgrid_etag(size_m, bbox, category, format, negotiate_media_type(request.headers.get("accept")))
+        cached = not_modified(request, etag, "geo")
+        if cached is not None:
+            return cached
+        if category and category not in hex_grid_store.meta["categories"]:
+            raise HTTPException(status_code=400, detail="unknown_category")
+        cells = hex_grid_store.query(size_m, parse_bbox(bbox), category)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="hex_grid_not_built")
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No hex grid at {size_m} m; available: {hex_grid_store.sizes()}")
+
+    # Arrow is columnar: serve the arrays rather than a FeatureCollection squeezed into metadata
+    if format == "arrays" or negotiate_media_type(request.headers.get("accept")) == ARROW_TYPE:
+        return fast_response(request, cells, headers=cache_headers(etag, "geo"))
+    return fast_response(request, hex_grid_store.to_geojson(cells), headers=cache_headers(etag, "geo"))
+
+
+def clusters_etag(clusters: LayerClusters, *parts) -> str:
+    """Validator tied to the amenity store build the layer's clusters were computed from"""
+    return weak_etag("clusters", clusters.name, *clusters.stamp, *parts)
+
+@router.get("/clusters")
+async def get_cluster_layers():
+    """Clusterable layers, zoom range and, for layers already built, clusters per zoom"""
+    try:
+        return cluster_index.info()
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="amenity_store_not_built")
+
+@router.get("/clusters/{layer}")
+def get_clusters(request: Request, layer: str, zoom: int = Query(..., ge=0, le=24),
+                 bbox: Optional[str] = None,
+                 format: str = Query("geojson", pattern="^(geojson|arrays)$")):
+    """Point clusters of one amenity layer at a map zoom (single points above MAX_ZOOM).
+
+    Plain def: a layer outside CLUSTER_LAYERS is built on its first request, which
+    then runs in the threadpool instead of on the event loop.
+    """
+    zoom = min(zoom, MAX_ZOOM + 1)
+    try:
+        layer_clusters = cluster_index.layer(layer)
+        etag = clusters_etag(layer_clusters, zoom, bbox, format, negotiate_media_type(request.headers.get("accept")))
+        cached = not_modified(request, etag, "geo")
+        if cached is not None:
+            return cached
+        clusters = layer_clusters.query(zoom, parse_bbox(bbox))
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="amenity_store_not_built")
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown layer: {layer}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if format == "arrays" or negotiate_media_type(request.headers.get("accept")) == ARROW_TYPE:
+        return fast_response(request, clusters, headers=cache_headers(etag, "geo"))
+    return fast_response(request, cluster_index.to_geojson(clusters), headers=cache_headers(etag, "geo"))
+
+
+class PostalBatch(BaseModel):
+    codes: List[str]
+
+
+@router.get("/postal")
+async def get_postal_index_stats():
+    """Size of the postal code index by source"""
+    try:
+        return postal_codes.stats()
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="postal_index_not_built")
+
+
+@router.get("/postal/{postal_code}")
+async def get_postal_code(postal_code: str):
+    """Coordinates, planning area, subzone and street of one postal code"""
+    if not (postal_code.isdigit() and len(postal_code) <= 6):
+        raise HTTPException(status_code=400, detail="invalid_postal_code")
+    try:
+        hit = postal_codes.lookup(postal_code)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="postal_index_not_built")
+    if hit is None:
+        raise HTTPException(status_code=404, detail=f"Unknown postal code: {postal_code}")
+    return hit
+
+
+@router.post("/postal")
+async def lookup_postal_codes(request: Request, batch: PostalBatch):
+    """Batch lookup; unknown and malformed codes are listed instead of failing the batch"""
+    if len(batch.codes) > 10000:
+        raise HTTPException(status_code=400, detail="too_many_codes")
+    try:
+        return fast_response(request, postal_codes.lookup_many(batch.codes))
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="postal_index_not_built")
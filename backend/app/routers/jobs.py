@@ -0,0 +1,105 @@
+# app/routers/jobs.py - trigger and poll background ETL / analysis jobs
+from typing import Dict, Any, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+
+from app.core.profiling import require_admin
+from app.services.etl_tasks import job_runner, PIPELINES, TASKS, pipeline_stages
+
+
+def require_job_store():
+    """503 instead of a crash when the job database could not be opened (e.g. read-only deploys)"""
+    if not job_runner.open_store():
+        raise HTTPException(status_code=503, detail="jobs_unavailable")
+    job_runner.start()   # no-op once running; covers a store that only became writable after startup
+
+
+# jobs write files and sync tables with the service role key: admins only
+router = APIRouter(prefix="/jobs", tags=["jobs"], dependencies=[Depends(require_admin), Depends(require_job_store)])
+
+
+class JobRequest(BaseModel):
+    task: str
+    params: Dict[str, Any] = {}
+    depends_on: List[str] = []
+
+
+class PipelineStage(BaseModel):
+    key: str
+    task: str
+    params: Dict[str, Any] = {}
+    after: List[str] = []
+
+
+class PipelineRequest(BaseModel):
+    pipeline: Optional[str] = None               # a named pipeline ...
+    params: Dict[str, Dict[str, Any]] = {}       # ... with per-stage overrides
+    stages: Optional[List[PipelineStage]] = None  # or an ad-hoc one
+
+
+@router.get("")
+async def list_jobs(status: Optional[str] = None, pipeline_id: Optional[str] = None, limit: int = 50):
+    """Most recent jobs first"""
+    return {"jobs": job_runner.store.list(status, pipeline_id, limit)}
+
+
+@router.get("/tasks")
+async def list_tasks():
+    """Available tasks and named pipelines"""
+    return {"tasks": sorted(TASKS), "pipelines": PIPELINES, "workers": job_runner.workers}
+
+
+@router.post("")
+async def submit_job(request: JobRequest):
+    """Queue one task; it starts once every job in depends_on has succeeded"""
+    try:
+        return job_runner.submit(request.task, request.params, request.depends_on)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"unknown_task: {request.task}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/pipelines")
+async def submit_pipeline(request: PipelineRequest):
+    """Queue a dependency-ordered pipeline; independent stages run in parallel"""
+    if request.stages:
+        stages = [s.model_dump() for s in request.stages]
+    elif request.pipeline in PIPELINES:
+        stages = pipeline_stages(request.pipeline, request.params)
+    else:
+        raise HTTPException(status_code=400, detail=f"unknown_pipeline: {request.pipeline}")
+    try:
+        return job_runner.submit_pipeline(stages)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"unknown_task: {e.args[0]}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/pipelines/{pipeline_id}")
+async def get_pipeline(pipeline_id: str):
+    jobs = job_runner.store.list(pipeline_id=pipeline_id, limit=1000)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    return {"pipeline_id": pipeline_id, "jobs": jobs}
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress, result or error of one job"""
+    job = job_runner.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued job (running jobs cannot be interrupted)"""
+    if not job_runner.store.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job_runner.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Only queued jobs can be cancelled")
+    return {"message": "Job cancelled", "id": job_id}
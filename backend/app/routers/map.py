@@ -0,0 +1,33 @@
+# app/routers/map.py - static GeoJSON layers written by the ETL scripts
+import os
+
+from fastapi import APIRouter, HTTPException, Request
+
+from app.core.caching import file_cache
+from app.core.config import ETL_OUTPUT_DIR
+
+router = APIRouter(prefix="/map", tags=["map"])
+
+# layer name -> file under ETL_OUTPUT_DIR (only these are served)
+MAP_LAYERS = {
+    "road_network": "road_network.geojson",
+    "planning_area": os.path.join("geojson", "planning_area.geojson"),
+    "subzone_area": os.path.join("geojson", "subzone_area.geojson"),
+}
+
+
+@router.get("/layers")
+async def list_layers():
+    """Known layers and whether each has been built"""
+    return {name: os.path.exists(os.path.join(ETL_OUTPUT_DIR, rel)) for name, rel in MAP_LAYERS.items()}
+
+
+@router.get("/{layer}.geojson")
+async def get_layer(request: Request, layer: str):
+    """One layer as GeoJSON; ETag is a content hash, so an unchanged file answers 304"""
+    if layer not in MAP_LAYERS:
+        raise HTTPException(status_code=404, detail=f"Unknown layer: {layer}")
+    try:
+        return file_cache.response(request, os.path.join(ETL_OUTPUT_DIR, MAP_LAYERS[layer]), "application/geo+json")
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail=f"{layer}_not_built")
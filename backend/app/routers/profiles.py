@@ -0,0 +1,23 @@
+# app/routers/profiles.py - stored request profiles (admin only)
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.profiling import list_profiles, profile_path, require_admin
+
+router = APIRouter(prefix="/profiles", tags=["profiles"], dependencies=[Depends(require_admin)])
+
+
+@router.get("")
+async def get_profiles(limit: int = 50):
+    """Most recent request profiles: wall / CPU time, peak RSS, sample count"""
+    return {"profiles": list_profiles(limit)}
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str):
+    """Folded stacks ("frame;frame count" lines) for flamegraph.pl / speedscope"""
+    path = profile_path(profile_id, ".folded")
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(path, encoding="utf-8") as f:
+        return PlainTextResponse(f.read())
@@ -0,0 +1,32 @@
+# app/routers/summary.py - Dispatch dashboard summaries served from in-memory aggregates
+from fastapi import APIRouter, Depends, HTTPException
+from app.core.security import get_current_user
+from app.db.database import db_service
+from app.services.order_summary import order_summary
+
+router = APIRouter(prefix="/summary", tags=["summary"])
+
+# keep the aggregate current from every write that goes through the generic API
+db_service.add_write_listener(order_summary.apply_write)
+
+def build_summaries():
+    """Initial full build, called once at startup"""
+    try:
+        order_summary.build(db_service.supabase)
+        print(f"✅ Order summary built ({len(order_summary.orders)} orders)")
+    except Exception as e:
+        print(f"⚠️ Could not build order summary: {e}")
+
+@router.get("/orders")
+async def get_order_summary():
+    """Order counts by status / agent / workshop and time-in-status percentiles"""
+    return order_summary.snapshot()
+
+@router.post("/orders/rebuild")
+def rebuild_order_summary(_=Depends(get_current_user)):
+    """Force a full rebuild from the tables (signed-in users only; it scans orders and status_logs)"""
+    try:
+        order_summary.build(db_service.supabase)
+        return {"message": "Order summary rebuilt", "total_orders": len(order_summary.orders)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
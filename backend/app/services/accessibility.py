@@ -0,0 +1,254 @@
+# app/services/accessibility.py - what-if accessibility (Hansen / 2SFCA) under facility closures
+import json
+import os
+import time
+from threading import Lock
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import AMENITY_STORE_DIR, HEX_GRID_DIR, ACCESS_ORIGIN_SIZE
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+try:
+    from pyproj import Transformer
+except ImportError:
+    Transformer = None
+
+# same decay / cutoff as backend/etl/roadnetwork/hex_grid.py, so the untouched
+# Hansen scores summed over categories equal the hex grid's accessibility
+ACCESS_CUTOFF_M = 3000.0
+ACCESS_POWER = 2
+DEMAND_PER_ORIGIN = 100.0   # uniform demand, as in amenity_accessibility.py
+SQRT3 = np.sqrt(3.0)
+METRICS = ("hansen", "2sfca")
+
+
+class AccessibilityModel:
+    """Accessibility of hex-cell origins to every amenity, kept up to date incrementally.
+
+    The origin -> facility pairs within the cutoff (and each pair's Hansen decay
+    term) are computed once and grouped by facility. Closing, reopening, re-weighting
+    or adding a facility only touches that facility's neighbouring origins:
+
+      hansen[i, c] += (w' - w) * f(d_ij)
+      2sfca[i, c]  += (w' - w) / D_j           D_j = demand within the catchment of j
+    """
+
+    def __init__(self, store_dir: str = AMENITY_STORE_DIR, hex_dir: str = HEX_GRID_DIR,
+                 origin_size: int = ACCESS_ORIGIN_SIZE):
+        self.store_dir = store_dir
+        self.hex_dir = hex_dir
+        self.origin_size = origin_size
+        self.lock = Lock()
+        self.loaded = False
+
+    # --- build -------------------------------------------------------------------
+    def load(self):
+        if cKDTree is None:
+            raise RuntimeError("scipy is required for the accessibility model")
+        with open(os.path.join(self.store_dir, "meta.json"), encoding="utf-8") as f:
+            store_meta = json.load(f)
+        with open(os.path.join(self.hex_dir, "meta.json"), encoding="utf-8") as f:
+            hex_meta = json.load(f)
+        entry = next((l for l in hex_meta["resolutions"] if l["size_m"] == self.origin_size), None)
+        if entry is None:
+            raise KeyError(self.origin_size)
+
+        with np.load(os.path.join(self.hex_dir, entry["file"])) as npz:
+            q, r = npz["q"].astype(np.float64), npz["r"].astype(np.float64)
+            self.origin_lon, self.origin_lat = npz["lon"], npz["lat"]
+        ox, oy = hex_meta["origin"]
+        self.origin_xy = np.column_stack([self.origin_size * SQRT3 * (q + r / 2) + ox,
+                                          self.origin_size * 1.5 * r + oy])
+        self.origin_tree = cKDTree(self.origin_xy)
+        self.demand = np.full(len(q), DEMAND_PER_ORIGIN)
+
+        self.categories = store_meta["categories"] + ["unmapped"]
+        x = np.load(os.path.join(self.store_dir, "x.npy"))
+        y = np.load(os.path.join(self.store_dir, "y.npy"))
+        category = np.load(os.path.join(self.store_dir, "category.npy")).astype(np.int16)
+        category[category < 0] = len(self.categories) - 1
+        weight = np.nan_to_num(np.load(os.path.join(self.store_dir, "importance.npy")).astype(np.float64))
+
+        self._build(np.column_stack([x, y]), category, weight)
+        self.loaded = True
+        return self
+
+    def _decay(self, d):
+        d_km = np.maximum(d, self.origin_size / 2) / 1000
+        return 1.0 / (d_km ** ACCESS_POWER + 0.001)
+
+    def _build(self, fac_xy, category, weight):
+        t0 = time.perf_counter()
+        self.fac_xy = fac_xy
+        self.category = category
+        self.base_weight = weight
+        pairs = self.origin_tree.sparse_distance_matrix(cKDTree(fac_xy), ACCESS_CUTOFF_M, output_type="ndarray")
+        order = np.argsort(pairs["j"], kind="stable")
+        self.pair_origin = pairs["i"][order].astype(np.int32)
+        self.pair_decay = self._decay(pairs["v"][order])
+        self.fac_start = np.searchsorted(pairs["j"][order], np.arange(len(fac_xy) + 1))
+        # facilities added at runtime: id -> (origins, decay)
+        self.extra: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+        fac_of_pair = np.repeat(np.arange(len(fac_xy)), np.diff(self.fac_start))
+        self.catchment_demand = np.bincount(fac_of_pair, weights=self.demand[self.pair_origin],
+                                            minlength=len(fac_xy))
+        self.reset()
+        self.build_seconds = time.perf_counter() - t0
+
+    def reset(self):
+        """Every facility open at its original weight"""
+        n_orig, n_cat, n_fac = len(self.origin_xy), len(self.categories), len(self.base_weight)
+        self.extra.clear()
+        self.fac_xy = self.fac_xy[:n_fac]
+        self.category = self.category[:n_fac]
+        self.catchment_demand = self.catchment_demand[:n_fac]
+        self.weight = self.base_weight.copy()
+        self.open = np.ones(n_fac, dtype=bool)
+
+        fac_of_pair = np.repeat(np.arange(n_fac), np.diff(self.fac_start))
+        cell = self.pair_origin.astype(np.int64) * n_cat + self.category[fac_of_pair]
+        w = self.weight[fac_of_pair]
+        self.hansen = np.bincount(cell, weights=w * self.pair_decay, minlength=n_orig * n_cat).reshape(n_orig, n_cat)
+        ratio = w / np.maximum(self.catchment_demand[fac_of_pair], 1e-12)
+        self.sfca = np.bincount(cell, weights=ratio, minlength=n_orig * n_cat).reshape(n_orig, n_cat)
+
+    def _neighbours(self, j: int) -> Tuple[np.ndarray, np.ndarray]:
+        if j in self.extra:
+            return self.extra[j]
+        s, e = self.fac_start[j], self.fac_start[j + 1]
+        return self.pair_origin[s:e], self.pair_decay[s:e]
+
+    def _effective(self, j: int) -> float:
+        return self.weight[j] if self.open[j] else 0.0
+
+    # --- incremental updates -----------------------------------------------------------
+    def _set(self, j: int, weight: Optional[float] = None, is_open: Optional[bool] = None) -> np.ndarray:
+        before = self._effective(j)
+        if weight is not None:
+            self.weight[j] = weight
+        if is_open is not None:
+            self.open[j] = is_open
+        delta = self._effective(j) - before
+        origins, decay = self._neighbours(j)
+        if delta and len(origins):
+            c = self.category[j]
+            self.hansen[origins, c] += delta * decay
+            if self.catchment_demand[j] > 0:
+                self.sfca[origins, c] += delta / self.catchment_demand[j]
+        return origins
+
+    def _add(self, x: float, y: float, category: int, weight: float) -> Tuple[int, np.ndarray]:
+        j = len(self.weight)
+        origins = np.asarray(self.origin_tree.query_ball_point([x, y], ACCESS_CUTOFF_M), dtype=np.int32)
+        decay = self._decay(np.hypot(self.origin_xy[origins, 0] - x, self.origin_xy[origins, 1] - y))
+        self.extra[j] = (origins, decay)
+        self.fac_xy = np.vstack([self.fac_xy, [[x, y]]])
+        self.category = np.append(self.category, np.int16(category))
+        self.catchment_demand = np.append(self.catchment_demand, self.demand[origins].sum())
+        self.weight = np.append(self.weight, 0.0)
+        self.open = np.append(self.open, True)
+        return j, self._set(j, weight=weight)
+
+    @staticmethod
+    def to_svy21(lon, lat):
+        if Transformer is None:
+            raise RuntimeError("pyproj is required for lon/lat input")
+        return Transformer.from_crs("EPSG:4326", "EPSG:3414", always_xy=True).transform(lon, lat)
+
+    def facilities_in_bbox(self, bbox, categories: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Ids of facilities inside a lon/lat bbox, optionally limited to categories"""
+        (x0, x1), (y0, y1) = self.to_svy21([bbox[0], bbox[2]], [bbox[1], bbox[3]])
+        xy = self.fac_xy
+        hit = (xy[:, 0] >= x0) & (xy[:, 0] <= x1) & (xy[:, 1] >= y0) & (xy[:, 1] <= y1)
+        if categories:
+            hit &= np.isin(self.category, [self.categories.index(c) for c in categories])
+        return np.flatnonzero(hit)
+
+    def apply(self, close: Iterable[int] = (), reopen: Iterable[int] = (),
+              reweight: Optional[Dict[int, float]] = None, add: Iterable[Dict[str, Any]] = ()) -> Dict[str, Any]:
+        """Apply one batch of closures / reopenings / weight changes / new facilities.
+
+        New facilities are dicts with lon, lat, category and an optional weight.
+        Returns the origins whose scores changed with their new values, for the
+        categories that were touched.
+        """
+        t0 = time.perf_counter()
+        with self.lock:
+            n_fac = len(self.weight)
+            ids = [int(j) for j in list(close) + list(reopen) + list((reweight or {}).keys())]
+            bad = [j for j in ids if not 0 <= j < n_fac]
+            if bad:
+                raise IndexError(f"unknown facility ids: {bad[:10]}")
+
+            touched: List[np.ndarray] = []
+            cats = set()
+            for j in close:
+                touched.append(self._set(int(j), is_open=False))
+                cats.add(int(self.category[int(j)]))
+            for j in reopen:
+                touched.append(self._set(int(j), is_open=True))
+                cats.add(int(self.category[int(j)]))
+            for j, w in (reweight or {}).items():
+                touched.append(self._set(int(j), weight=float(w)))
+                cats.add(int(self.category[int(j)]))
+            added = []
+            for fac in add:
+                c = self.categories.index(fac["category"])
+                x, y = self.to_svy21(fac["lon"], fac["lat"])
+                j, origins = self._add(float(x), float(y), c, 1.0 if fac.get("weight") is None else float(fac["weight"]))
+                touched.append(origins)
+                cats.add(c)
+                added.append(j)
+
+            affected = np.unique(np.concatenate(touched)) if touched else np.empty(0, dtype=np.int32)
+            cat_idx = sorted(cats)
+            return {
+                "affected_origins": int(len(affected)),
+                "added_ids": added,
+                "closed_total": int((~self.open).sum()),
+                "elapsed_ms": round((time.perf_counter() - t0) * 1000, 3),
+                "origins": affected,
+                "lon": self.origin_lon[affected],
+                "lat": self.origin_lat[affected],
+                "categories": [self.categories[c] for c in cat_idx],
+                "hansen": self.hansen[np.ix_(affected, cat_idx)],
+                "2sfca": self.sfca[np.ix_(affected, cat_idx)],
+            }
+
+    # --- reads ----------------------------------------------------------------------------
+    def scores(self, category: Optional[str] = None, metric: str = "hansen",
+               bbox: Optional[Tuple[float, float, float, float]] = None) -> Dict[str, Any]:
+        """Per-origin scores for one category (or summed over all)"""
+        values = self.hansen if metric == "hansen" else self.sfca
+        values = values[:, self.categories.index(category)] if category else values.sum(axis=1)
+        keep = slice(None)
+        if bbox:
+            keep = np.flatnonzero((self.origin_lon >= bbox[0]) & (self.origin_lon <= bbox[2])
+                                  & (self.origin_lat >= bbox[1]) & (self.origin_lat <= bbox[3]))
+        return {"metric": metric, "category": category, "lon": self.origin_lon[keep],
+                "lat": self.origin_lat[keep], "value": values[keep]}
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "origins": int(len(self.origin_xy)),
+            "origin_size_m": self.origin_size,
+            "facilities": int(len(self.weight)),
+            "closed": np.flatnonzero(~self.open).tolist(),
+            "added": sorted(self.extra),
+            "pairs": int(len(self.pair_origin)),
+            "categories": self.categories,
+            "metrics": list(METRICS),
+            "cutoff_m": ACCESS_CUTOFF_M,
+            "build_seconds": round(self.build_seconds, 3),
+        }
+
+
+# Global instance (loaded on first use)
+accessibility_model = AccessibilityModel()
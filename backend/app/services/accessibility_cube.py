@@ -0,0 +1,110 @@
+# app/services/accessibility_cube.py - serves the precomputed origin x category x metric cube
+# built by backend/etl/roadnetwork/accessibility_cube.py
+import json
+import os
+from threading import Lock
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import ACCESSIBILITY_CUBE_DIR
+
+ORIGIN_FIELDS = ("lon", "lat", "demand", "name", "q", "r")
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class AccessibilityCubeStore:
+    """Loads meta.json and memory-maps each origin set's cube on first use, again
+    whenever a file has been rewritten by a rebuild.
+
+    The cube is stored (metric, category, origin), so a category/metric slice is one
+    contiguous read and nothing is recomputed per request.
+    """
+
+    def __init__(self, path: str = ACCESSIBILITY_CUBE_DIR):
+        self.path = path
+        self.lock = Lock()
+        self._meta: Optional[Dict[str, Any]] = None
+        self._meta_stamp: Optional[Tuple[int, int]] = None
+        self._sets: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        path = os.path.join(self.path, "meta.json")
+        stamp = _stamp(path)
+        if self._meta is None or stamp != self._meta_stamp:
+            with open(path, encoding="utf-8") as f:
+                self._meta = json.load(f)
+            self._meta_stamp = stamp
+        return self._meta
+
+    def invalidate(self):
+        """Drop cached meta/cubes after a rebuild"""
+        with self.lock:
+            self._meta = None
+            self._sets = {}
+
+    def origin_sets(self):
+        return [s["name"] for s in self.meta["origin_sets"]]
+
+    def files(self, name: Optional[str] = None) -> List[str]:
+        """meta.json plus the data files of one origin set (or of all of them)"""
+        sets = [s for s in self.meta["origin_sets"] if name is None or s["name"] == name]
+        return [os.path.join(self.path, "meta.json")] + [os.path.join(self.path, s[k])
+                                                         for s in sets for k in ("file", "origins_file")]
+
+    def origin_set(self, name: str) -> Dict[str, np.ndarray]:
+        entry = next((s for s in self.meta["origin_sets"] if s["name"] == name), None)
+        if entry is None:
+            raise KeyError(name)
+        cube_path = os.path.join(self.path, entry["file"])
+        origins_path = os.path.join(self.path, entry["origins_file"])
+        stamp = (_stamp(cube_path), _stamp(origins_path))
+        cached = self._sets.get(name)
+        if cached is None or cached["stamp"] != stamp:
+            with self.lock:
+                cached = self._sets.get(name)
+                if cached is None or cached["stamp"] != stamp:
+                    data = {"cube": np.load(cube_path, mmap_mode="r")}
+                    with np.load(origins_path) as npz:
+                        data.update({k: npz[k] for k in ORIGIN_FIELDS if k in npz.files})
+                    cached = self._sets[name] = {"stamp": stamp, "data": data}
+        return cached["data"]
+
+    def query(self, name: str, metric: str, category: Optional[str] = None,
+              bbox: Optional[Tuple[float, float, float, float]] = None) -> Dict[str, Any]:
+        """Column-oriented slice for one metric: one category, or every category when None"""
+        data = self.origin_set(name)
+        cube = data["cube"][self.meta["metrics"].index(metric)]
+        if bbox:
+            minlon, minlat, maxlon, maxlat = bbox
+            keep = np.flatnonzero((data["lon"] >= minlon) & (data["lon"] <= maxlon)
+                                  & (data["lat"] >= minlat) & (data["lat"] <= maxlat))
+        else:
+            keep = slice(None)
+
+        out = {"origin_set": name, "metric": metric, "origin": np.arange(cube.shape[1])[keep]}
+        out.update({k: data[k][keep] for k in ORIGIN_FIELDS if k in data})
+        categories = [category] if category else self.meta["categories"]
+        for c in categories:
+            out[c] = np.asarray(cube[self.meta["categories"].index(c)][keep])
+        return out
+
+    def origin(self, name: str, index: int) -> Dict[str, Any]:
+        """Every category x metric value of one origin"""
+        data = self.origin_set(name)
+        if not 0 <= index < data["cube"].shape[2]:
+            raise IndexError(f"origin {index} out of range")
+        values = np.asarray(data["cube"][:, :, index])
+        out = {k: data[k][index].item() for k in ORIGIN_FIELDS if k in data}
+        out["scores"] = {c: {m: values[mi, ci].item() for mi, m in enumerate(self.meta["metrics"])}
+                         for ci, c in enumerate(self.meta["categories"])}
+        return {"origin_set": name, "origin": index, **out}
+
+
+# Global instance
+accessibility_cube_store = AccessibilityCubeStore()
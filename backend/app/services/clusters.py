@@ -0,0 +1,280 @@
+# app/services/clusters.py - supercluster-style hierarchical point clusters per amenity layer
+import json
+import os
+import sys
+import time
+from threading import Lock
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import AMENITY_STORE_DIR, ETL_ROOT, CLUSTER_LAYERS
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+try:
+    from pyproj import Transformer
+except ImportError:
+    Transformer = None
+
+# the packed R-tree / Hilbert sort are shared with the amenity store (etl/onemap/amenity_store.py)
+if os.path.abspath(ETL_ROOT) not in sys.path:
+    sys.path.append(os.path.abspath(ETL_ROOT))
+try:
+    from onemap.amenity_store import PackedRTree, hilbert_key
+except ImportError:  # deployed without the etl/ tree
+    PackedRTree = None
+
+MIN_ZOOM = 0
+MAX_ZOOM = 16              # above this every point is returned on its own
+RADIUS_PX = 40             # cluster radius in screen pixels, as supercluster's default
+TILE_SIZE = 512            # Mapbox GL vector tile size
+# metres per pixel at zoom 0 for 512 px tiles at Singapore's latitude (~1.35 N)
+METRES_PER_PX_Z0 = 2 * np.pi * 6378137 / TILE_SIZE * np.cos(np.deg2rad(1.35))
+NODE_SIZE = 16
+LEVEL_FIELDS = ("lon", "lat", "count", "importance", "point", "expansion_zoom")
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def cluster_radius(zoom: int) -> float:
+    """Cluster radius in metres (EPSG:3414 units) at a map zoom"""
+    return RADIUS_PX * METRES_PER_PX_Z0 / (2 ** zoom)
+
+
+class LayerClusters:
+    """Cluster levels MIN_ZOOM..MAX_ZOOM + 1 (the raw points) for one layer.
+
+    Built bottom-up like supercluster: at each zoom, clusters of the level below
+    are taken in turn and absorb every not-yet-taken neighbour within the zoom's
+    radius (count-weighted centroid, summed counts and importance). Each level is
+    Hilbert-sorted on lon/lat with a packed R-tree on top, so a bbox query touches
+    only the nodes overlapping it: its cost follows the number of results, not the
+    number of points in the layer.
+    """
+
+    def __init__(self, name: str, x, y, lon, lat, importance, point_ids,
+                 stamp: Optional[Tuple[int, int]] = None):
+        self.name = name
+        self.stamp = stamp                  # meta.json (mtime_ns, size) of the store build used
+        self.levels: Dict[int, Dict[str, np.ndarray]] = {}
+        self.trees: Dict[int, Any] = {}
+        t0 = time.perf_counter()
+        self._build(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64),
+                    np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64),
+                    np.asarray(importance, dtype=np.float64), np.asarray(point_ids, dtype=np.int64))
+        self.build_seconds = time.perf_counter() - t0
+
+    @staticmethod
+    def _cluster(x, y, radius) -> np.ndarray:
+        """Parent index (into the new level) of every cluster of the level below"""
+        parent = np.full(len(x), -1, dtype=np.int64)
+        neighbours = cKDTree(np.column_stack([x, y])).query_ball_point(np.column_stack([x, y]), radius)
+        n_new = 0
+        for i in range(len(x)):
+            if parent[i] >= 0:
+                continue
+            members = [j for j in neighbours[i] if parent[j] < 0]
+            parent[members] = n_new
+            parent[i] = n_new
+            n_new += 1
+        return parent
+
+    def _build(self, x, y, lon, lat, importance, point_ids):
+        count = np.ones(len(x))
+        expansion = np.full(len(x), -1, dtype=np.int16)
+        level = {"x": x, "y": y, "lon": lon, "lat": lat, "count": count, "importance": importance,
+                 "point": point_ids, "expansion_zoom": expansion}
+        self._store(MAX_ZOOM + 1, level)
+        for zoom in range(MAX_ZOOM, MIN_ZOOM - 1, -1):
+            below = self.levels[zoom + 1]
+            parent = self._cluster(below["x"], below["y"], cluster_radius(zoom))
+            n = int(parent.max()) + 1 if len(parent) else 0
+            w = below["count"]
+            total = np.bincount(parent, weights=w, minlength=n)
+            children = np.bincount(parent, minlength=n)
+            # a single-child cluster splits wherever its child does
+            only_child = np.zeros(n, dtype=np.int64)
+            only_child[parent] = np.arange(len(parent))
+            expansion = np.where(children > 1, zoom + 1, below["expansion_zoom"][only_child]).astype(np.int16)
+            level = {
+                "x": np.bincount(parent, weights=below["x"] * w, minlength=n) / total,
+                "y": np.bincount(parent, weights=below["y"] * w, minlength=n) / total,
+                "lon": np.bincount(parent, weights=below["lon"] * w, minlength=n) / total,
+                "lat": np.bincount(parent, weights=below["lat"] * w, minlength=n) / total,
+                "count": total,
+                "importance": np.bincount(parent, weights=below["importance"], minlength=n),
+                "point": np.where(children > 1, -1, below["point"][only_child]),
+                "expansion_zoom": expansion,
+            }
+            self._store(zoom, level)
+
+    def _store(self, zoom: int, level: Dict[str, np.ndarray]):
+        """Hilbert-sort a level on lon/lat and index it; x / y are kept for the next level up"""
+        lon, lat = level["lon"], level["lat"]
+        if len(lon):
+            order = np.argsort(hilbert_key(lon, lat, (lon.min(), lat.min(), lon.max(), lat.max())), kind="stable")
+            level = {k: v[order] for k, v in level.items()}
+        self.levels[zoom] = level
+        self.trees[zoom] = PackedRTree.build(level["lon"], level["lat"], NODE_SIZE)
+
+    def query(self, zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None) -> Dict[str, Any]:
+        """Clusters (and lone points) of one zoom inside a lon/lat bbox, column oriented"""
+        zoom = min(max(int(zoom), MIN_ZOOM), MAX_ZOOM + 1)
+        level = self.levels[zoom]
+        if bbox:
+            rows = self.trees[zoom].query(level["lon"], level["lat"], *bbox)
+        else:
+            rows = slice(None)
+        out = {k: level[k][rows] for k in LEVEL_FIELDS}
+        out["count"] = out["count"].astype(np.int64)
+        return {"layer": self.name, "zoom": zoom, **out}
+
+    def info(self) -> Dict[str, Any]:
+        return {"points": int(len(self.levels[MAX_ZOOM + 1]["lon"])), "build_seconds": round(self.build_seconds, 3),
+                "clusters_per_zoom": {z: int(len(self.levels[z]["lon"])) for z in range(MIN_ZOOM, MAX_ZOOM + 1)}}
+
+
+class ClusterIndex:
+    """Per-layer LayerClusters over the amenity store; CLUSTER_LAYERS are built at startup,
+    any other store layer on first request.
+
+    Each layer has its own build lock, so building one layer never holds up requests
+    for another. rebuild() builds every layer from the new store first and swaps
+    them in at once; a first-request build that started before the swap is dropped
+    instead of replacing the fresh layer with one from the old store. A store
+    rebuilt outside the job runner (the CLI) is noticed through the meta.json stamp
+    and drops every layer, like invalidate().
+    """
+
+    def __init__(self, store_dir: str = AMENITY_STORE_DIR, layers: Optional[List[str]] = None):
+        self.store_dir = store_dir
+        self.startup_layers = list(layers if layers is not None else CLUSTER_LAYERS)
+        self.lock = Lock()                      # guards _meta / _layers / _layer_locks / generation
+        self._layer_locks: Dict[str, Lock] = {}
+        self._meta: Optional[Dict[str, Any]] = None
+        self._meta_stamp: Optional[Tuple[int, int]] = None
+        self._layers: Dict[str, LayerClusters] = {}
+        self.generation = 0
+
+    def _read_meta(self) -> Dict[str, Any]:
+        with open(os.path.join(self.store_dir, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _current(self) -> Tuple[Dict[str, Any], Tuple[int, int]]:
+        """meta.json and its stamp, re-read (dropping every layer) once the file changes"""
+        stamp = _stamp(os.path.join(self.store_dir, "meta.json"))
+        if self._meta is None or stamp != self._meta_stamp:
+            meta = self._read_meta()
+            with self.lock:
+                if self._meta is None or stamp != self._meta_stamp:
+                    if self._meta is not None:
+                        self._layers = {}
+                        self.generation += 1
+                    self._meta, self._meta_stamp = meta, stamp
+        with self.lock:
+            return self._meta, self._meta_stamp
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        return self._current()[0]
+
+    def invalidate(self):
+        """Drop every layer after the amenity store has been rebuilt"""
+        with self.lock:
+            self._meta = None
+            self._meta_stamp = None
+            self._layers = {}
+            self.generation += 1
+
+    def layer_names(self) -> List[str]:
+        return self.meta["layers"]
+
+    def _build_layer(self, name: str, meta: Dict[str, Any], stamp: Tuple[int, int]) -> LayerClusters:
+        if cKDTree is None or Transformer is None or PackedRTree is None:
+            raise RuntimeError("scipy, pyproj and the etl/ tree are required for clustering")
+        code = meta["layers"].index(name)
+        layer = np.load(os.path.join(self.store_dir, "layer.npy"), mmap_mode="r")
+        rows = np.flatnonzero(layer == code)
+        x = np.load(os.path.join(self.store_dir, "x.npy"), mmap_mode="r")[rows]
+        y = np.load(os.path.join(self.store_dir, "y.npy"), mmap_mode="r")[rows]
+        importance = np.nan_to_num(np.load(os.path.join(self.store_dir, "importance.npy"), mmap_mode="r")[rows])
+        lon, lat = Transformer.from_crs(meta["crs"], "EPSG:4326", always_xy=True).transform(x, y)
+        return LayerClusters(name, x, y, lon, lat, importance, rows, stamp)
+
+    def layer(self, name: str) -> LayerClusters:
+        meta, stamp = self._current()
+        clusters = self._layers.get(name)
+        if clusters is not None:
+            return clusters
+        if name not in meta["layers"]:
+            raise KeyError(name)
+        with self.lock:
+            build_lock = self._layer_locks.setdefault(name, Lock())
+        with build_lock:
+            clusters = self._layers.get(name)
+            if clusters is None:
+                generation = self.generation
+                clusters = self._build_layer(name, meta, stamp)
+                with self.lock:
+                    if generation == self.generation:
+                        self._layers[name] = clusters
+        return clusters
+
+    def rebuild(self):
+        """Rebuild the startup layers (and any built since) from a new store, then swap"""
+        stamp = _stamp(os.path.join(self.store_dir, "meta.json"))
+        meta = self._read_meta()
+        names = [n for n in dict.fromkeys(self.startup_layers + list(self._layers)) if n in meta["layers"]]
+        layers = {name: self._build_layer(name, meta, stamp) for name in names}
+        with self.lock:
+            self._meta, self._meta_stamp = meta, stamp
+            self._layers = layers
+            self.generation += 1
+        return layers
+
+    def build_startup_layers(self):
+        """Called from the app's startup hook; a missing store only logs a warning"""
+        try:
+            for name in self.startup_layers:
+                if name in self.layer_names():
+                    clusters = self.layer(name)
+                    print(f"✅ Clustered {name}: {clusters.info()['points']} points in {clusters.build_seconds:.2f}s")
+        except (FileNotFoundError, RuntimeError) as e:
+            print(f"⚠️ Point clusters not built at startup: {e}")
+
+    def query(self, name: str, zoom: int, bbox=None) -> Dict[str, Any]:
+        return self.layer(name).query(zoom, bbox)
+
+    def info(self) -> Dict[str, Any]:
+        return {"min_zoom": MIN_ZOOM, "max_zoom": MAX_ZOOM, "radius_px": RADIUS_PX,
+                "layers": {name: (self._layers[name].info() if name in self._layers else None)
+                           for name in self.layer_names()}}
+
+    @staticmethod
+    def to_geojson(clusters: Dict[str, Any]) -> Dict[str, Any]:
+        features = []
+        for i in range(len(clusters["lon"])):
+            count = int(clusters["count"][i])
+            props = {"count": count, "importance": float(clusters["importance"][i])}
+            if count == 1:
+                props["id"] = int(clusters["point"][i])
+            else:
+                props["cluster"] = True
+                props["expansion_zoom"] = int(clusters["expansion_zoom"][i])
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [float(clusters["lon"][i]), float(clusters["lat"][i])]},
+                "properties": props,
+            })
+        return {"type": "FeatureCollection", "features": features}
+
+
+# Global instance
+cluster_index = ClusterIndex()
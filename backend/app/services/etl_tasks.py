@@ -0,0 +1,225 @@
+# app/services/etl_tasks.py - ETL entry points exposed as background job tasks
+import importlib
+import os
+import sys
+from typing import Dict, Any, Callable, List, Optional
+
+from app.core.config import (ETL_OUTPUT_DIR, ETL_ROOT, HEX_GRID_DIR, AMENITY_STORE_DIR, ACCESSIBILITY_CUBE_DIR,
+                             POSTAL_INDEX_DB, SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY,
+                             DELTA_SYNC_TABLES)
+from app.services.accessibility import accessibility_model
+from app.services.accessibility_cube import accessibility_cube_store
+from app.services.clusters import cluster_index
+from app.services.hex_grid import hex_grid_store
+from app.services.jobs import JobRunner
+from app.services.postal_codes import postal_codes
+
+# A task is fn(params, progress) -> JSON-able result; progress(fraction or None, message).
+Task = Callable[[Dict[str, Any], Callable], Any]
+
+
+def etl_module(name: str):
+    """Import an ETL module by name (backend/etl/roadnetwork modules or etl/<pkg>.<module>)"""
+    for path in (os.path.abspath(ETL_OUTPUT_DIR), os.path.abspath(ETL_ROOT)):
+        if path not in sys.path:
+            sys.path.append(path)
+    return importlib.import_module(name)
+
+
+def etl_path(*parts: str) -> str:
+    return os.path.join(ETL_OUTPUT_DIR, *parts)
+
+
+def fetch_road_network(params, progress):
+    out = params.get("out", etl_path("road_network.geojson"))
+    geojson = etl_module("roadnetwork").fetch_road_network(out, progress=progress)
+    return {"path": out, "features": len(geojson["features"])}
+
+
+def fetch_arcgis_amenities(params, progress):
+    out = params.get("out", os.path.join(ETL_ROOT, "arcgis", "all_amenities.geojson"))
+    return {"path": str(etl_module("arcgis.tester").fetch_all_amenities(out_file=out, progress=progress))}
+
+
+def fetch_onemap_themes(params, progress):
+    module = etl_module("onemap.onemap_extended")
+    return {"path": str(module.export_themes(params.get("out", module.OUTPUT_CSV), progress=progress))}
+
+
+def score_amenities(params, progress):
+    module = etl_module("priority_mapping")
+    output = params.get("output", module.OUTPUT_PARQUET)
+    # the CSV export goes next to the Parquet output unless given explicitly ("csv": null disables it)
+    csv_path = params["csv"] if "csv" in params else os.path.splitext(str(output))[0] + ".csv"
+    if csv_path and os.path.abspath(csv_path) == os.path.abspath(str(output)):
+        csv_path = None
+    out = module.score_amenities(params.get("input", module.INPUT_CSV), output, csv_path=csv_path,
+                                 progress=progress)
+    return {"path": str(out), "csv": csv_path}
+
+
+def build_amenity_store(params, progress):
+    module = etl_module("onemap.amenity_store")
+    out = module.build_amenity_store(params.get("layers", module.LAYERS_DIR), params.get("out", AMENITY_STORE_DIR))
+    accessibility_model.loaded = False
+    cluster_index.rebuild()
+    return {"path": str(out)}
+
+
+def build_hex_grid(params, progress):
+    module = etl_module("hex_grid")
+    out = module.build_hex_pyramid(params.get("store", AMENITY_STORE_DIR), module.PLANNING_GEOJSON,
+                                   params.get("out", HEX_GRID_DIR), params.get("sizes", module.RESOLUTIONS))
+    hex_grid_store.invalidate()
+    accessibility_model.loaded = False
+    return {"path": str(out)}
+
+
+def build_accessibility_cube(params, progress):
+    module = etl_module("accessibility_cube")
+    out = module.build_accessibility_cube(params.get("store", AMENITY_STORE_DIR), module.PLANNING_GEOJSON,
+                                          params.get("hex", HEX_GRID_DIR), params.get("out", ACCESSIBILITY_CUBE_DIR),
+                                          params.get("origins", module.ORIGIN_SETS))
+    accessibility_cube_store.invalidate()
+    return {"path": str(out)}
+
+
+def road_criticality(params, progress):
+    module = etl_module("road_criticality")
+    store = etl_module("onemap.amenity_store").AmenityStore(params.get("store", AMENITY_STORE_DIR))
+    progress(0.1, "assigning amenities to segments")
+    crit = module.RoadCriticality.build(module.load_segments(params.get("roads", module.ROAD_NETWORK_GEOJSON)), store)
+    crit.save(params.get("out", module.CRITICALITY_DIR))
+    return {"segments": len(crit.segments), "top_roads": crit.road_scores().head(10).to_dict("records")}
+
+
+def flood_exposure(params, progress):
+    module = etl_module("flood_exposure")
+    output = params.get("output", module.OUTPUT_PARQUET)
+    scores = module.run_flood_exposure(params.get("flood_csv", module.FLOOD_PRECIP_CSV),
+                                       params.get("store", AMENITY_STORE_DIR), output)
+    return {"path": str(output), "rows": len(scores)}
+
+
+def reverse_geocode(params, progress):
+    module = etl_module("parallel_geocode")
+    return module.parallel_reverse_geocode(params["input_csv"], params["output_csv"],
+                                           workers=params.get("workers"),
+                                           chunksize=params.get("chunksize", module.CHUNK_SIZE))
+
+
+def build_postal_index(params, progress):
+    """params: flood_csv, csv (extra sources), store, fill (file of codes to resolve via OneMap)"""
+    module = etl_module("postal_codes")
+    stats = module.build_postal_index(params.get("out", POSTAL_INDEX_DB),
+                                      params.get("flood_csv", module.FLOOD_PRECIP_CSV), params.get("csv", ()),
+                                      params.get("store", AMENITY_STORE_DIR), params.get("fill"), progress=progress)
+    postal_codes.invalidate()
+    return stats
+
+
+def accessibility_report(params, progress):
+    module = etl_module("accessibility_report")
+    out = module.render_report(params.get("store", AMENITY_STORE_DIR), module.PLANNING_GEOJSON,
+                               params.get("out", module.REPORT_DIR), params.get("categories"),
+                               formats=params.get("formats", ("png",)), workers=params.get("workers"))
+    return {"path": str(out)}
+
+
+def delta_sync(params, progress):
+    """params: source, table, key (+ columns, batch_size, dry_run, from_table); table must be in DELTA_SYNC_TABLES"""
+    from supabase import create_client
+
+    if params["table"] not in DELTA_SYNC_TABLES:
+        raise ValueError(f"table {params['table']!r} is not in DELTA_SYNC_TABLES")
+
+    client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY)
+    return etl_module("delta_sync").delta_sync(
+        client, params["source"], params["table"], params["key"], params.get("columns"),
+        batch_size=params.get("batch_size", 500), dry_run=params.get("dry_run", False),
+        from_table=params.get("from_table", False), progress=progress)
+
+
+TASKS: Dict[str, Task] = {
+    "fetch_road_network": fetch_road_network,
+    "fetch_arcgis_amenities": fetch_arcgis_amenities,
+    "fetch_onemap_themes": fetch_onemap_themes,
+    "score_amenities": score_amenities,
+    "build_amenity_store": build_amenity_store,
+    "build_hex_grid": build_hex_grid,
+    "build_accessibility_cube": build_accessibility_cube,
+    "road_criticality": road_criticality,
+    "flood_exposure": flood_exposure,
+    "reverse_geocode": reverse_geocode,
+    "build_postal_index": build_postal_index,
+    "accessibility_report": accessibility_report,
+    "delta_sync": delta_sync,
+}
+
+# Named pipelines: stages run as soon as the stages listed in "after" have succeeded
+PIPELINES: Dict[str, List[Dict[str, Any]]] = {
+    "amenities": [
+        {"key": "store", "task": "build_amenity_store"},
+        {"key": "hex", "task": "build_hex_grid", "after": ["store"]},
+        {"key": "cube", "task": "build_accessibility_cube", "after": ["hex"]},
+        {"key": "criticality", "task": "road_criticality", "after": ["store"]},
+        {"key": "exposure", "task": "flood_exposure", "after": ["store"]},
+        {"key": "postal", "task": "build_postal_index", "after": ["store"]},
+        {"key": "report", "task": "accessibility_report", "after": ["store"]},
+    ],
+    "refresh_all": [
+        {"key": "roads", "task": "fetch_road_network"},
+        {"key": "arcgis", "task": "fetch_arcgis_amenities"},
+        {"key": "store", "task": "build_amenity_store"},
+        {"key": "hex", "task": "build_hex_grid", "after": ["store"]},
+        {"key": "cube", "task": "build_accessibility_cube", "after": ["hex"]},
+        {"key": "criticality", "task": "road_criticality", "after": ["roads", "store"]},
+        {"key": "exposure", "task": "flood_exposure", "after": ["store"]},
+        {"key": "report", "task": "accessibility_report", "after": ["store"]},
+    ],
+}
+
+
+def pipeline_stages(name: str, params: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Copy of a named pipeline with per-stage parameter overrides applied"""
+    params = params or {}
+    return [dict(stage, params={**stage.get("params", {}), **params.get(stage["key"], {})})
+            for stage in PIPELINES[name]]
+
+
+# Params naming files or directories; jobs arrive over HTTP, so these must stay inside the ETL trees
+PATH_PARAMS = {"out", "output", "input", "input_csv", "output_csv", "source", "store", "layers", "hex",
+               "roads", "flood_csv", "csv", "fill"}
+PATH_ROOTS = (ETL_OUTPUT_DIR, ETL_ROOT)
+
+
+def resolve_param_path(name: str, value: Any) -> str:
+    """Absolute real path of a path param (relative ones are taken from ETL_OUTPUT_DIR);
+    ValueError when it is not a string or falls outside PATH_ROOTS"""
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"{name} must be a path")
+    path = os.path.realpath(os.path.join(os.path.realpath(ETL_OUTPUT_DIR), value))
+    for root in map(os.path.realpath, PATH_ROOTS):
+        if path == root or path.startswith(root + os.sep):
+            return path
+    raise ValueError(f"{name} must be inside the ETL directories")
+
+
+def check_params(task: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Resolve path params (refusing anything outside PATH_ROOTS) and the delta_sync table allow-list"""
+    out = dict(params)
+    for name, value in params.items():
+        if name not in PATH_PARAMS or value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            out[name] = [resolve_param_path(name, v) for v in value]
+        else:
+            out[name] = resolve_param_path(name, value)
+    if task == "delta_sync" and params.get("table") not in DELTA_SYNC_TABLES:
+        raise ValueError(f"table {params.get('table')!r} is not in DELTA_SYNC_TABLES")
+    return out
+
+
+# Global instance; the SQLite store is opened by start() in the app's startup hook, so
+# importing this module never touches the filesystem
+job_runner = JobRunner(None, TASKS, check_params=check_params)
@@ -0,0 +1,106 @@
+# app/services/hex_grid.py - serves the precomputed hexagon pyramid from backend/etl/roadnetwork/hex_grid.py
+import json
+import os
+from threading import Lock
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import HEX_GRID_DIR
+
+FIELDS = ("q", "r", "lon", "lat", "polygons", "counts", "importance", "accessibility")
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class HexGridStore:
+    """Loads meta.json and each resolution's arrays on first use, and again whenever
+    the file on disk has been rewritten (a rebuild outside the job runner)"""
+
+    def __init__(self, path: str = HEX_GRID_DIR):
+        self.path = path
+        self.lock = Lock()
+        self._meta: Optional[Dict[str, Any]] = None
+        self._meta_stamp: Optional[Tuple[int, int]] = None
+        self._levels: Dict[int, Dict[str, np.ndarray]] = {}
+        self._level_stamps: Dict[int, Tuple[int, int]] = {}
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        path = os.path.join(self.path, "meta.json")
+        stamp = _stamp(path)
+        if self._meta is None or stamp != self._meta_stamp:
+            with open(path, encoding="utf-8") as f:
+                self._meta = json.load(f)
+            self._meta_stamp = stamp
+        return self._meta
+
+    def invalidate(self):
+        """Drop cached meta/levels after the pyramid has been rebuilt"""
+        with self.lock:
+            self._meta = None
+            self._levels = {}
+            self._level_stamps = {}
+
+    def sizes(self):
+        return [level["size_m"] for level in self.meta["resolutions"]]
+
+    def level(self, size: int) -> Dict[str, np.ndarray]:
+        entry = next((l for l in self.meta["resolutions"] if l["size_m"] == size), None)
+        if entry is None:
+            raise KeyError(size)
+        path = os.path.join(self.path, entry["file"])
+        stamp = _stamp(path)
+        if self._level_stamps.get(size) != stamp:
+            with self.lock:
+                if self._level_stamps.get(size) != stamp:
+                    with np.load(path) as npz:
+                        self._levels[size] = {k: npz[k] for k in FIELDS}
+                    self._level_stamps[size] = stamp
+        return self._levels[size]
+
+    def query(self, size: int, bbox: Optional[Tuple[float, float, float, float]] = None,
+              category: Optional[str] = None) -> Dict[str, Any]:
+        """Column-oriented slice of one resolution, optionally limited to a lon/lat bbox"""
+        lvl = self.level(size)
+        if bbox:
+            minlon, minlat, maxlon, maxlat = bbox
+            keep = np.flatnonzero((lvl["lon"] >= minlon) & (lvl["lon"] <= maxlon)
+                                  & (lvl["lat"] >= minlat) & (lvl["lat"] <= maxlat))
+        else:
+            keep = slice(None)
+
+        categories = self.meta["categories"]
+        counts = lvl["counts"][keep]
+        out = {
+            "size_m": size,
+            "q": lvl["q"][keep], "r": lvl["r"][keep],
+            "lon": lvl["lon"][keep], "lat": lvl["lat"][keep],
+            "count": counts.sum(axis=1),
+            "importance": lvl["importance"][keep],
+            "accessibility": lvl["accessibility"][keep],
+            "polygons": lvl["polygons"][keep],
+        }
+        if category:
+            out[f"count_{category}"] = counts[:, categories.index(category)]
+        return out
+
+    @staticmethod
+    def to_geojson(cells: Dict[str, Any]) -> Dict[str, Any]:
+        props = [k for k in cells if k not in ("size_m", "lon", "lat", "polygons")]
+        features = []
+        for i in range(len(cells["q"])):
+            ring = cells["polygons"][i].tolist()
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Polygon", "coordinates": [ring + [ring[0]]]},
+                "properties": {k: cells[k][i].item() for k in props},
+            })
+        return {"type": "FeatureCollection", "features": features}
+
+
+# Global instance
+hex_grid_store = HexGridStore()
@@ -0,0 +1,277 @@
+# app/services/jobs.py - persistent background job queue for ETL / analysis tasks
+import json
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, List, Optional
+
+from app.core.config import JOBS_DB, JOB_WORKERS
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED, SKIPPED = "queued", "running", "succeeded", "failed", "cancelled", "skipped"
+FINISHED = {SUCCEEDED, FAILED, CANCELLED, SKIPPED}
+PROGRESS_INTERVAL = 0.5   # seconds between progress writes for one job
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    task        TEXT NOT NULL,
+    params      TEXT NOT NULL DEFAULT '{}',
+    status      TEXT NOT NULL,
+    pipeline_id TEXT,
+    stage       TEXT,
+    depends_on  TEXT NOT NULL DEFAULT '[]',
+    progress    REAL,
+    message     TEXT,
+    result      TEXT,
+    error       TEXT,
+    created_at  TEXT NOT NULL,
+    started_at  TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_pipeline ON jobs (pipeline_id);
+"""
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobStore:
+    """Jobs table in a local SQLite file, so queued work survives a restart"""
+
+    def __init__(self, path: str = JOBS_DB):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _row(row) -> Dict[str, Any]:
+        job = dict(row)
+        for key in ("params", "depends_on", "result"):
+            job[key] = json.loads(job[key]) if job[key] else None
+        return job
+
+    def insert(self, task: str, params: Dict[str, Any], depends_on: List[str],
+               pipeline_id: Optional[str] = None, stage: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO jobs (id, task, params, status, pipeline_id, stage, depends_on, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, task, json.dumps(params), QUEUED, pipeline_id, stage, json.dumps(depends_on), now()))
+        return job_id
+
+    def update(self, job_id: str, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], default=str)
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def list(self, status: Optional[str] = None, pipeline_id: Optional[str] = None,
+             limit: int = 50) -> List[Dict[str, Any]]:
+        sql, args = "SELECT * FROM jobs WHERE 1=1", []
+        if status:
+            sql, args = sql + " AND status = ?", args + [status]
+        if pipeline_id:
+            sql, args = sql + " AND pipeline_id = ?", args + [pipeline_id]
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        with self.lock:
+            rows = self.conn.execute(sql, (*args, limit)).fetchall()
+        return [self._row(r) for r in rows]
+
+    def statuses(self, job_ids: List[str]) -> Dict[str, str]:
+        if not job_ids:
+            return {}
+        marks = ",".join("?" * len(job_ids))
+        with self.lock:
+            rows = self.conn.execute(f"SELECT id, status FROM jobs WHERE id IN ({marks})", job_ids).fetchall()
+        return {r["id"]: r["status"] for r in rows}
+
+    def requeue_interrupted(self) -> int:
+        """Jobs left 'running' by a previous process go back to the queue"""
+        with self.lock:
+            cur = self.conn.execute("UPDATE jobs SET status = ?, message = 'requeued after restart', started_at = NULL "
+                                    "WHERE status = ?", (QUEUED, RUNNING))
+        return cur.rowcount
+
+
+class JobRunner:
+    """Bounded worker pool fed from the JobStore.
+
+    A dispatcher thread starts queued jobs whose dependencies have all succeeded
+    (independent jobs therefore run side by side, up to `workers` at a time) and
+    skips jobs whose dependencies failed or were cancelled.
+    """
+
+    def __init__(self, store: Optional[JobStore], tasks: Dict[str, Callable], workers: int = JOB_WORKERS,
+                 store_path: str = JOBS_DB,
+                 check_params: Optional[Callable[[str, Dict[str, Any]], Dict[str, Any]]] = None):
+        self.store = store
+        # check_params(task, params) -> params to store; raises ValueError to refuse a job
+        self.check_params = check_params
+        self.store_path = store_path
+        self.store_error: Optional[str] = None
+        self.tasks = tasks
+        self.workers = workers
+        self.wake = threading.Event()
+        self.running: set = set()
+        self.pool: Optional[ThreadPoolExecutor] = None
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = False
+
+    # --- lifecycle ------------------------------------------------------------------
+    def open_store(self) -> bool:
+        """Open the SQLite store if that has not happened yet; False (and store_error) when it can't be"""
+        if self.store is None:
+            try:
+                self.store = JobStore(self.store_path)
+                self.store_error = None
+            except (sqlite3.Error, OSError) as e:
+                self.store_error = f"{self.store_path}: {e}"
+                return False
+        return True
+
+    @property
+    def available(self) -> bool:
+        return self.store is not None
+
+    def start(self):
+        if self.thread:
+            return
+        if not self.open_store():
+            print(f"⚠️ Job queue disabled, cannot open {self.store_error}")
+            return
+        requeued = self.store.requeue_interrupted()
+        if requeued:
+            print(f"🔁 Requeued {requeued} interrupted jobs")
+        self.stopping = False
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self.thread = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping = True
+        self.wake.set()
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        self.thread = None
+
+    # --- submission -------------------------------------------------------------------
+    def submit(self, task: str, params: Optional[Dict[str, Any]] = None, depends_on: Optional[List[str]] = None,
+               pipeline_id: Optional[str] = None, stage: Optional[str] = None) -> Dict[str, Any]:
+        if task not in self.tasks:
+            raise KeyError(task)
+        params = self._checked(task, params)
+        depends_on = list(depends_on or [])
+        missing = set(depends_on) - set(self.store.statuses(depends_on))
+        if missing:
+            raise ValueError(f"unknown dependencies: {sorted(missing)}")
+        job_id = self.store.insert(task, params, depends_on, pipeline_id, stage)
+        self.wake.set()
+        return self.store.get(job_id)
+
+    def submit_pipeline(self, stages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """stages: [{"key", "task", "params", "after": [keys]}], submitted in dependency order"""
+        by_key = {s["key"]: s for s in stages}
+        if len(by_key) != len(stages):
+            raise ValueError("duplicate stage keys")
+        for s in stages:
+            if s["task"] not in self.tasks:
+                raise KeyError(s["task"])
+            unknown = set(s.get("after") or []) - set(by_key)
+            if unknown:
+                raise ValueError(f"stage {s['key']} depends on unknown stages {sorted(unknown)}")
+        params = {s["key"]: self._checked(s["task"], s.get("params")) for s in stages}
+
+        # topological order (Kahn) so every dependency already has a job id
+        order, done, pending = [], set(), list(stages)
+        while pending:
+            ready = [s for s in pending if set(s.get("after") or []) <= done]
+            if not ready:
+                raise ValueError("pipeline has a dependency cycle")
+            order += ready
+            done |= {s["key"] for s in ready}
+            pending = [s for s in pending if s["key"] not in done]
+
+        pipeline_id = uuid.uuid4().hex
+        ids: Dict[str, str] = {}
+        for s in order:
+            ids[s["key"]] = self.store.insert(s["task"], params[s["key"]],
+                                              [ids[k] for k in s.get("after") or []], pipeline_id, s["key"])
+        self.wake.set()
+        return {"pipeline_id": pipeline_id, "jobs": ids}
+
+    def _checked(self, task: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        params = dict(params or {})
+        return self.check_params(task, params) if self.check_params else params
+
+    def cancel(self, job_id: str) -> bool:
+        """Only queued jobs can be cancelled; their dependents get skipped"""
+        job = self.store.get(job_id)
+        if not job or job["status"] != QUEUED:
+            return False
+        self.store.update(job_id, status=CANCELLED, finished_at=now())
+        self.wake.set()
+        return True
+
+    # --- scheduling ---------------------------------------------------------------------
+    def _dispatch_loop(self):
+        while not self.stopping:
+            try:
+                self._schedule()
+            except Exception as e:
+                print(f"⚠️ Job dispatcher error: {e}")
+            self.wake.wait(timeout=1.0)
+            self.wake.clear()
+
+    def _schedule(self):
+        queued = sorted(self.store.list(status=QUEUED, limit=10_000), key=lambda j: j["created_at"])
+        for job in queued:
+            deps = self.store.statuses(job["depends_on"])
+            if any(s in (FAILED, CANCELLED, SKIPPED) for s in deps.values()) or len(deps) < len(job["depends_on"]):
+                self.store.update(job["id"], status=SKIPPED, message="dependency did not succeed", finished_at=now())
+                self.wake.set()
+                continue
+            if any(s != SUCCEEDED for s in deps.values()) or len(self.running) >= self.workers:
+                continue
+            self.running.add(job["id"])
+            self.store.update(job["id"], status=RUNNING, started_at=now(), progress=0.0)
+            self.pool.submit(self._run, job)
+
+    def _run(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        last = [0.0]
+
+        def progress(fraction: Optional[float] = None, message: Optional[str] = None):
+            t = time.monotonic()
+            if t - last[0] < PROGRESS_INTERVAL and (fraction or 0) < 1:
+                return
+            last[0] = t
+            fields = {"message": message} if message is not None else {}
+            if fraction is not None:
+                fields["progress"] = max(0.0, min(1.0, float(fraction)))
+            if fields:
+                self.store.update(job_id, **fields)
+
+        try:
+            result = self.tasks[job["task"]](job["params"] or {}, progress)
+            self.store.update(job_id, status=SUCCEEDED, progress=1.0, result=result, finished_at=now())
+        except Exception as e:
+            self.store.update(job_id, status=FAILED, error=f"{e}\n{traceback.format_exc()}", finished_at=now())
+        finally:
+            self.running.discard(job_id)
+            self.wake.set()
@@ -0,0 +1,161 @@
+# app/services/order_summary.py
+from bisect import insort
+from collections import Counter
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Any, List, Optional, Tuple
+
+from supabase import Client
+
+# Statuses an order moves through; a status_logs row whose "to" is one of these
+# (or whose action is a status change) counts as a transition.
+ORDER_STATUSES = {"pending", "dispatched", "onsite", "completed", "cancelled"}
+STATUS_ACTIONS = {"status", "status_change", "set_status"}
+
+PERCENTILES = (50, 90, 95)
+PAGE_SIZE = 1000
+
+
+def parse_ts(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def fetch_all_rows(sb: Client, table_name: str, select: str, order_by: str = None) -> List[Dict[str, Any]]:
+    """Page through a table (PostgREST caps a single response at ~1000 rows)"""
+    rows, start = [], 0
+    while True:
+        query = sb.table(table_name).select(select)
+        if order_by:
+            query = query.order(order_by)
+        batch = query.range(start, start + PAGE_SIZE - 1).execute().data or []
+        rows.extend(batch)
+        if len(batch) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+class OrderSummary:
+    """In-memory aggregate of orders by status / agent / workshop plus time-in-status.
+
+    Built once from the tables, then kept current by apply_write() so reads never
+    touch the database.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        self.orders: Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]] = {}
+        self.by_status: Counter = Counter()
+        self.by_agent: Counter = Counter()
+        self.by_workshop: Counter = Counter()
+        # order_id -> (status, entered_at) of the latest transition seen
+        self.current_transition: Dict[str, Tuple[str, datetime]] = {}
+        # status -> sorted list of completed durations in seconds
+        self.durations: Dict[str, List[float]] = {}
+        self.ready = False
+        self.built_at: Optional[str] = None
+
+    # --- building -----------------------------------------------------------
+    def build(self, sb: Client):
+        """Full rebuild from orders + status_logs (startup / manual refresh)"""
+        orders = fetch_all_rows(sb, "orders", "id,status,assigned_agent,workshop_id")
+        logs = fetch_all_rows(sb, "status_logs", 'order_id,at,action,"to"', order_by="at")
+        self.build_from_rows(orders, logs)
+
+    def build_from_rows(self, orders: List[Dict[str, Any]], logs: List[Dict[str, Any]]):
+        with self.lock:
+            self.reset()
+            for row in orders:
+                self._upsert_order(row)
+            for log in sorted(logs, key=lambda l: str(l.get("at") or "")):
+                self._add_status_log(log)
+            self.ready = True
+            self.built_at = datetime.now().astimezone().isoformat()
+
+    # --- incremental updates ------------------------------------------------
+    def apply_write(self, table_name: str, op: str, record: Dict[str, Any]):
+        """DatabaseService write listener"""
+        if table_name == "orders":
+            with self.lock:
+                if op == "delete":
+                    # its status_logs rows stay, so keep the transition state a rebuild would replay
+                    self._remove_order(str(record.get("id")))
+                else:
+                    self._upsert_order(record)
+        elif table_name == "status_logs" and op == "insert":
+            with self.lock:
+                self._add_status_log(record)
+
+    def _upsert_order(self, row: Dict[str, Any]):
+        order_id = str(row.get("id"))
+        self._remove_order(order_id)
+        key = (row.get("status"), row.get("assigned_agent"), row.get("workshop_id"))
+        self.orders[order_id] = key
+        self.by_status[key[0]] += 1
+        self.by_agent[key[1]] += 1
+        self.by_workshop[key[2]] += 1
+
+    def _remove_order(self, order_id: str):
+        key = self.orders.pop(order_id, None)
+        if key is None:
+            return
+        for counter, value in zip((self.by_status, self.by_agent, self.by_workshop), key):
+            counter[value] -= 1
+            if counter[value] <= 0:
+                del counter[value]
+
+    def _add_status_log(self, log: Dict[str, Any]):
+        to_status = log.get("to")
+        if not to_status or (to_status not in ORDER_STATUSES and log.get("action") not in STATUS_ACTIONS):
+            return
+        at = parse_ts(log.get("at"))
+        if at is None:
+            return
+
+        order_id = str(log.get("order_id"))
+        previous = self.current_transition.get(order_id)
+        if previous:
+            prev_status, entered_at = previous
+            if at < entered_at:
+                # late/out-of-order log: older than what we already have, ignore
+                return
+            insort(self.durations.setdefault(prev_status, []), (at - entered_at).total_seconds())
+        self.current_transition[order_id] = (to_status, at)
+
+    # --- reads --------------------------------------------------------------
+    def time_in_status(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for status, values in self.durations.items():
+            n = len(values)
+            if not n:
+                continue
+            stats = {"samples": n}
+            for p in PERCENTILES:
+                stats[f"p{p}_seconds"] = values[min(n - 1, (n * p) // 100)]
+            out[status] = stats
+        return out
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "ready": self.ready,
+                "built_at": self.built_at,
+                "total_orders": len(self.orders),
+                "by_status": dict(self.by_status),
+                "by_assigned_agent": dict(self.by_agent),
+                "by_workshop_id": dict(self.by_workshop),
+                "time_in_status": self.time_in_status(),
+            }
+
+
+# Global aggregate instance
+order_summary = OrderSummary()
@@ -0,0 +1,58 @@
+# app/services/postal_codes.py - postal code lookups against the persistent index built by
+# backend/etl/roadnetwork/postal_codes.py
+import os
+import sys
+from threading import Lock
+from typing import Dict, Any, Iterable, Optional
+
+from app.core.config import ETL_ROOT, POSTAL_INDEX_DB
+
+# the index class lives with the ETL tooling (etl/postal_index.py) so scripts and API share it
+if os.path.abspath(ETL_ROOT) not in sys.path:
+    sys.path.append(os.path.abspath(ETL_ROOT))
+try:
+    from postal_index import PostalIndex, normalize_postal
+except ImportError:  # deployed without the etl/ tree
+    PostalIndex = None
+
+
+class PostalCodeService:
+    """Opens the SQLite index read-only on first use; reopened after a rebuild"""
+
+    def __init__(self, path: str = POSTAL_INDEX_DB):
+        self.path = path
+        self.lock = Lock()
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self.lock:
+                if self._index is None:
+                    if PostalIndex is None:
+                        raise FileNotFoundError(self.path)
+                    self._index = PostalIndex(self.path)
+        return self._index
+
+    def invalidate(self):
+        # only swap the reference: a lookup still running on the old index keeps its
+        # connection, which is closed once the last such request lets go of it
+        with self.lock:
+            self._index = None
+
+    def lookup(self, code: str) -> Optional[Dict[str, Any]]:
+        return self.index.lookup(code)
+
+    def lookup_many(self, codes: Iterable[str]) -> Dict[str, Any]:
+        codes = list(codes)
+        found = self.index.lookup_many(codes)
+        invalid = [c for c in codes if normalize_postal(c) is None]
+        missing = sorted({normalize_postal(c) for c in codes} - set(found) - {None})
+        return {"results": found, "missing": missing, "invalid": invalid}
+
+    def stats(self) -> Dict[str, Any]:
+        return self.index.stats()
+
+
+# Global instance
+postal_codes = PostalCodeService()
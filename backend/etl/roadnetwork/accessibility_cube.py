@@ -0,0 +1,200 @@
+# Origin x category x metric accessibility cube for every amenity category at once
+#
+# Facilities come from the amenity store and are weighted by their category's
+# importance from amenity_categories.json (weight^2 / priority, as in
+# priority_mapping.py), so re-prioritising a category only needs a cube rebuild.
+# One origin -> facility distance pass (cKDTree, cutoff ACCESS_CUTOFF_M) feeds every
+# category and metric through bincounts keyed on origin * n_categories + category.
+#
+# Output directory:
+#   meta.json               categories (+ priority / weight / importance), metrics, origin sets
+#   <set>.npy               float32 cube laid out (metric, category, origin) so one
+#                           category/metric slice is a contiguous read of an mmap
+#   <set>_origins.npz       lon / lat / x / y / demand (+ name or q / r) per origin
+#
+# Metrics: hansen (sum S_j f(d_ij)), 2sfca (sum S_j / D_j over facilities within the
+# cutoff, 0 for facilities with no demand in their catchment), count (facilities within
+# the cutoff), nearest_m (NaN = none within the cutoff).
+# The "all" category sums the additive metrics and takes the minimum nearest_m.
+import argparse
+import json
+import time
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+from scipy.spatial import cKDTree
+
+import etl_paths  # noqa: F401  (puts etl/ on sys.path)
+from etl_paths import BASE, GEOJSON_DIR
+from hex_grid import HEX_GRID_DIR, TARGET_CRS, TO_WGS84, hex_center
+from onemap.amenity_store import AmenityStore, STORE_DIR
+from priority_mapping import load_category_table, CONFIG_PATH
+from profiling import Profiler, add_profile_argument, profiler_from_args
+
+# --- File paths ---
+PLANNING_GEOJSON = GEOJSON_DIR / "planning_area.geojson"
+CUBE_DIR         = BASE / "accessibility_cube"
+
+# same decay / cutoff as hex_grid.py and the API's what-if model
+ACCESS_CUTOFF_M   = 3000.0
+ACCESS_POWER      = 2
+MIN_DISTANCE_M    = 250.0      # distance floor so a facility on top of an origin does not dominate
+DEMAND_PER_ORIGIN = 100.0      # uniform demand when the store holds no residential points
+DEMAND_CATEGORY   = "residential"
+METRICS           = ("hansen", "2sfca", "count", "nearest_m")
+ORIGIN_SETS       = ("planning_area", "hex_500")
+
+
+# --- origins ---
+def planning_area_origins(planning_geojson=PLANNING_GEOJSON):
+    """One origin per planning area at a point guaranteed to lie inside it"""
+    areas = gpd.read_file(planning_geojson).to_crs(TARGET_CRS)
+    points = areas.geometry.make_valid().representative_point()
+    return {"x": points.x.to_numpy(), "y": points.y.to_numpy(),
+            "name": areas["PLN_AREA_N"].to_numpy(dtype=str)}
+
+
+def hex_origins(size, hex_dir=HEX_GRID_DIR):
+    """Centres of the hex pyramid's cells at one resolution"""
+    with open(Path(hex_dir) / "meta.json", encoding="utf-8") as f:
+        meta = json.load(f)
+    entry = next((l for l in meta["resolutions"] if l["size_m"] == size), None)
+    if entry is None:
+        raise KeyError(f"No {size} m level in {hex_dir}")
+    with np.load(Path(hex_dir) / entry["file"]) as npz:
+        q, r = npz["q"], npz["r"]
+    cx, cy = hex_center(q.astype(np.float64), r.astype(np.float64), size)
+    ox, oy = meta["origin"]
+    return {"x": cx + ox, "y": cy + oy, "q": q, "r": r}
+
+
+def load_origins(origin_set, planning_geojson=PLANNING_GEOJSON, hex_dir=HEX_GRID_DIR):
+    if origin_set == "planning_area":
+        return planning_area_origins(planning_geojson)
+    if origin_set.startswith("hex_"):
+        return hex_origins(int(origin_set[4:]), hex_dir)
+    raise ValueError(f"Unknown origin set: {origin_set} (planning_area or hex_<size>)")
+
+
+# --- facilities ---
+def category_importance(categories, config_path=CONFIG_PATH):
+    """(priority, weight, importance) per store category; NaN where the table has no score"""
+    table = load_category_table(config_path)
+    index = {c: i for i, c in enumerate(table.categories)}
+    rows = [index.get(c, -1) for c in categories]
+    priority = np.array([table.category_priority[i] if i >= 0 else np.nan for i in rows])
+    weight = np.array([table.category_weight[i] if i >= 0 else np.nan for i in rows])
+    return priority, weight, weight ** 2 / priority
+
+
+# --- cube ---
+def compute_cube(origin_xy, fac_xy, fac_category, fac_supply, n_cat, demand_category=None):
+    """(metrics, categories + "all", origins) float32 cube plus per-origin demand.
+
+    demand_category: category code whose facilities within the cutoff are counted as
+    an origin's demand (homes); uniform DEMAND_PER_ORIGIN when there are none.
+    """
+    n_orig = len(origin_xy)
+    pairs = cKDTree(origin_xy).sparse_distance_matrix(cKDTree(fac_xy), ACCESS_CUTOFF_M, output_type="ndarray")
+    i, j, d = pairs["i"].astype(np.int64), pairs["j"], pairs["v"]
+    c = fac_category[j]
+    cell = i * n_cat + c
+
+    demand = np.zeros(n_orig)
+    if demand_category is not None:
+        demand = np.bincount(i[c == demand_category], minlength=n_orig).astype(np.float64)
+    if not demand.any():
+        demand = np.full(n_orig, DEMAND_PER_ORIGIN)
+    # 2SFCA step 1: demand inside each facility's catchment
+    catchment = np.bincount(j, weights=demand[i], minlength=len(fac_xy))
+
+    supply = fac_supply[j]
+    d_km = np.maximum(d, MIN_DISTANCE_M) / 1000
+    size = n_orig * n_cat
+    hansen = np.bincount(cell, weights=supply / (d_km ** ACCESS_POWER + 0.001), minlength=size)
+    # a facility whose catchment holds no demand contributes nothing (standard 2SFCA)
+    ratio = np.divide(supply, catchment[j], out=np.zeros_like(supply), where=catchment[j] > 0)
+    sfca = np.bincount(cell, weights=ratio, minlength=size)
+    count = np.bincount(cell, minlength=size).astype(np.float64)
+    nearest = np.full(size, np.inf)
+    np.minimum.at(nearest, cell, d)
+
+    cube = np.empty((len(METRICS), n_cat + 1, n_orig), dtype=np.float32)
+    for m, values in enumerate((hansen, sfca, count, nearest)):
+        per_cat = values.reshape(n_orig, n_cat).T
+        cube[m, :n_cat] = per_cat
+        cube[m, n_cat] = per_cat.min(axis=0) if METRICS[m] == "nearest_m" else per_cat.sum(axis=0)
+    cube[cube == np.inf] = np.nan
+    return cube, demand
+
+
+def build_accessibility_cube(store_dir=STORE_DIR, planning_geojson=PLANNING_GEOJSON, hex_dir=HEX_GRID_DIR,
+                             out_dir=CUBE_DIR, origin_sets=ORIGIN_SETS, config_path=CONFIG_PATH, profiler=None):
+    prof = profiler or Profiler("accessibility_cube", enabled=False)
+    t0 = time.perf_counter()
+
+    with prof.stage("load_facilities"):
+        store = AmenityStore(store_dir)
+        categories = store.categories + ["unmapped"]
+        n_cat = len(categories)
+        fac_xy = np.column_stack([np.asarray(store.x), np.asarray(store.y)])
+        fac_category = np.asarray(store.category, dtype=np.int64)
+        fac_category[fac_category < 0] = n_cat - 1
+        priority, weight, importance = category_importance(store.categories, config_path)
+        supply = np.nan_to_num(np.append(importance, np.nan))[fac_category]
+        demand_code = categories.index(DEMAND_CATEGORY) if DEMAND_CATEGORY in categories else None
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sets = []
+    for origin_set in origin_sets:
+        with prof.stage("load_origins"):
+            origins = load_origins(origin_set, planning_geojson, hex_dir)
+        with prof.stage("cube"):
+            cube, demand = compute_cube(np.column_stack([origins["x"], origins["y"]]), fac_xy, fac_category,
+                                        supply, n_cat, demand_code)
+        with prof.stage("write"):
+            lon, lat = TO_WGS84.transform(origins["x"], origins["y"])
+            np.save(out_dir / f"{origin_set}.npy", cube)
+            np.savez(out_dir / f"{origin_set}_origins.npz", **origins, demand=demand.astype(np.float32),
+                     lon=np.asarray(lon, dtype=np.float32), lat=np.asarray(lat, dtype=np.float32))
+        sets.append({"name": origin_set, "origins": int(cube.shape[2]), "file": f"{origin_set}.npy",
+                     "origins_file": f"{origin_set}_origins.npz"})
+        print(f"  ✅ {origin_set}: {cube.shape[2]} origins × {cube.shape[1]} categories × {cube.shape[0]} metrics")
+
+    def listed(values):
+        return [None if np.isnan(v) else float(v) for v in values] + [None, None]
+
+    meta = {
+        "crs": TARGET_CRS,
+        "axes": ["metric", "category", "origin"],
+        "metrics": list(METRICS),
+        "categories": categories + ["all"],
+        "priority": listed(priority),
+        "weight": listed(weight),
+        "importance": listed(importance),
+        "origin_sets": sets,
+        "parameters": {"cutoff_m": ACCESS_CUTOFF_M, "power": ACCESS_POWER, "min_distance_m": MIN_DISTANCE_M,
+                       "demand": DEMAND_CATEGORY if demand_code is not None else "uniform"},
+    }
+    with open(out_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    print(f"✓ Accessibility cube ({len(sets)} origin sets) → {out_dir} in {time.perf_counter() - t0:.1f}s")
+    return out_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the origin × category × metric accessibility cube")
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--planning", default=str(PLANNING_GEOJSON))
+    parser.add_argument("--hex", default=str(HEX_GRID_DIR))
+    parser.add_argument("--out", default=str(CUBE_DIR))
+    parser.add_argument("--origins", nargs="+", default=list(ORIGIN_SETS),
+                        help="origin sets: planning_area and/or hex_<size>")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    profiler = profiler_from_args("accessibility_cube", args).start()
+    build_accessibility_cube(args.store, args.planning, args.hex, args.out, args.origins, profiler=profiler)
+    profiler.stop()
@@ -0,0 +1,166 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")   # headless: never opens a window, safe in workers / CI
+import matplotlib.pyplot as plt
+from matplotlib.collections import PolyCollection
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from etl_paths import BASE, GEOJSON_DIR
+from onemap.amenity_store import AmenityStore, STORE_DIR
+
+# --- File paths ---
+PLANNING_GEOJSON = GEOJSON_DIR / "planning_area.geojson"
+REPORT_DIR       = BASE / "accessibility_report"
+
+TARGET_CRS       = "EPSG:3414"
+SIMPLIFY_M       = 25.0        # geometry tolerance for rendering; invisible at report scale
+HANSEN_POWER     = 2
+METRICS          = ("hansen", "count", "density")
+METRIC_LABELS    = {"hansen": "Hansen accessibility", "count": "Amenities in area",
+                    "density": "Amenities per km²"}
+FIGSIZE          = (12, 8)
+DPI              = 120
+
+
+# --- data ---------------------------------------------------------------------
+def load_base_layer(planning_geojson=PLANNING_GEOJSON, tolerance=SIMPLIFY_M):
+    """Planning areas simplified once and flattened to polygon rings for PolyCollection"""
+    gdf = gpd.read_file(planning_geojson).to_crs(TARGET_CRS)
+    geoms = shapely.simplify(gdf.geometry.make_valid().values, tolerance, preserve_topology=True)
+    parts, owner = shapely.get_parts(geoms, return_index=True)
+    polys = parts[shapely.get_type_id(parts) == 3]
+    owner = owner[shapely.get_type_id(parts) == 3]
+    rings = [np.asarray(shapely.get_coordinates(shapely.get_exterior_ring(p)), dtype=np.float32) for p in polys]
+    return {
+        "names": gdf["PLN_AREA_N"].tolist() if "PLN_AREA_N" in gdf.columns else [str(i) for i in range(len(gdf))],
+        "geoms": gdf.geometry.values,
+        "rings": rings,
+        "ring_owner": owner,
+        "bounds": shapely.total_bounds(geoms),
+    }
+
+
+def area_metrics(base, store: AmenityStore):
+    """{category: {metric: per-area values}} for every category in the store"""
+    geoms = base["geoms"]
+    origins = shapely.centroid(geoms)
+    ox, oy = shapely.get_x(origins), shapely.get_y(origins)
+    area_km2 = shapely.area(geoms) / 1e6
+
+    x, y = np.asarray(store.x), np.asarray(store.y)
+    category = np.asarray(store.category)
+    weight = np.nan_to_num(np.asarray(store.importance, dtype=np.float64))
+    # point -> planning area once for all categories
+    pt_idx, area_idx = shapely.STRtree(geoms).query(shapely.points(x, y), predicate="within")
+    area_of = np.full(len(x), -1, dtype=np.int64)
+    area_of[pt_idx[::-1]] = area_idx[::-1]
+
+    n_area = len(geoms)
+    out = {}
+    for code, name in enumerate(store.categories):
+        sel = np.flatnonzero(category == code)
+        d_km = np.hypot(ox[:, None] - x[sel][None, :], oy[:, None] - y[sel][None, :]) / 1000
+        # same form as amenity_accessibility.hansen_accessibility
+        hansen = ((weight[sel] if weight[sel].any() else 1.0) / (d_km ** HANSEN_POWER + 0.001)).sum(axis=1)
+        inside = area_of[sel][area_of[sel] >= 0]
+        count = np.bincount(inside, minlength=n_area).astype(np.float64)
+        out[name] = {"hansen": hansen, "count": count, "density": count / np.maximum(area_km2, 1e-9)}
+    return out
+
+
+# --- rendering (one cached figure per worker) -------------------------------------
+_worker = {}
+
+
+def _init_renderer(rings, ring_owner, bounds):
+    fig, ax = plt.subplots(figsize=FIGSIZE)
+    coll = PolyCollection(rings, cmap="YlOrRd", edgecolors="black", linewidths=0.3)
+    coll.set_array(np.zeros(len(rings)))
+    ax.add_collection(coll)
+    ax.set_xlim(bounds[0], bounds[2])
+    ax.set_ylim(bounds[1], bounds[3])
+    ax.set_aspect("equal")
+    ax.set_axis_off()
+    cbar = fig.colorbar(coll, ax=ax, shrink=0.7)
+    points = ax.scatter([], [], s=2, c="#1f4e9c", alpha=0.5, linewidths=0)
+    fig.tight_layout()
+    _worker.update(fig=fig, ax=ax, coll=coll, cbar=cbar, points=points, owner=np.asarray(ring_owner))
+
+
+def _render(category, metric, values, xy, out_path):
+    w = _worker
+    t0 = time.perf_counter()
+    ring_values = np.asarray(values)[w["owner"]]
+    w["coll"].set_array(ring_values)
+    w["coll"].set_clim(float(ring_values.min()), float(ring_values.max()) or 1.0)
+    w["cbar"].set_label(METRIC_LABELS[metric])
+    w["points"].set_offsets(xy if len(xy) else np.empty((0, 2)))
+    w["ax"].set_title(f"{category.replace('_', ' ').title()} — {METRIC_LABELS[metric]}", fontsize=14)
+    w["fig"].savefig(out_path, dpi=DPI)
+    return str(out_path), time.perf_counter() - t0
+
+
+def render_report(store_dir=STORE_DIR, planning_geojson=PLANNING_GEOJSON, out_dir=REPORT_DIR,
+                  categories=None, metrics=METRICS, formats=("png",), workers=None):
+    """One map per (category, metric, format), rendered across a process pool"""
+    t0 = time.perf_counter()
+    store = AmenityStore(store_dir)
+    base = load_base_layer(planning_geojson)
+    values = area_metrics(base, store)
+    categories = categories or store.categories
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Prepared {len(base['rings'])} rings and metrics in {time.perf_counter() - t0:.1f}s")
+
+    x, y = np.asarray(store.x), np.asarray(store.y)
+    category = np.asarray(store.category)
+    jobs = []
+    for name in categories:
+        code = store.categories.index(name)
+        xy = np.column_stack([x, y])[category == code].astype(np.float32)
+        for metric in metrics:
+            for fmt in formats:
+                jobs.append((name, metric, values[name][metric], xy, out_dir / f"{name}_{metric}.{fmt}"))
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs)) or 1
+    # spawn, not fork: forking after geopandas/matplotlib have started threads can deadlock a worker
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_renderer,
+                             initargs=(base["rings"], base["ring_owner"], base["bounds"])) as pool:
+        results = list(pool.map(_render, *zip(*jobs)))
+    for path, seconds in results:
+        print(f"  ✅ {Path(path).name} ({seconds:.2f}s)")
+
+    index = {
+        "areas": base["names"],
+        "maps": [p for p, _ in results],
+        "values": {c: {m: np.round(values[c][m], 4).tolist() for m in metrics} for c in categories},
+    }
+    with open(out_dir / "report.json", "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    print(f"✓ {len(results)} maps → {out_dir} in {time.perf_counter() - t0:.1f}s with {workers} workers")
+    return out_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the accessibility report maps (headless)")
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--planning", default=str(PLANNING_GEOJSON))
+    parser.add_argument("--out", default=str(REPORT_DIR))
+    parser.add_argument("--categories", nargs="+", default=None)
+    parser.add_argument("--metrics", nargs="+", default=list(METRICS), choices=METRICS)
+    parser.add_argument("--formats", nargs="+", default=["png"], choices=["png", "svg"])
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    render_report(args.store, args.planning, args.out, args.categories, args.metrics, args.formats, args.workers)
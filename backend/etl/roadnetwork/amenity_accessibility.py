@@ -1,3 +1,5 @@
+import argparse
+
 import pandas as pd
 import geopandas as gpd
 import numpy as np
@@ -7,6 +9,9 @@ from shapely.geometry import Point
 import warnings
 warnings.filterwarnings('ignore')
 
+import etl_paths  # noqa: F401  (puts etl/ on sys.path for profiling)
+from profiling import add_profile_argument, profiler_from_args, Profiler
+
 # Cell 1: Load your data
 def load_singapore_data():
     """Load your Singapore data"""
@@ -83,8 +88,9 @@ def hansen_accessibility(demand, capacity, distances, power=2):
     return accessibility
 
 # Cell 5: Plot accessibility map
-def plot_planning_area_accessibility(planning_areas, accessibility_values, childcare, title):
-    """Plot accessibility map using planning areas"""
+def plot_planning_area_accessibility(planning_areas, accessibility_values, childcare, title, out_path=None):
+    """Plot accessibility map using planning areas (saved instead of shown when out_path is given;
+    see accessibility_report.py for the batch renderer)"""
     fig, ax = plt.subplots(figsize=(15, 12))
     
     # Add accessibility values to planning areas
@@ -121,7 +127,11 @@ def plot_planning_area_accessibility(planning_areas, accessibility_values, child
     ax.tick_params(labelsize=10)
     
     plt.tight_layout()
-    plt.show()
+    if out_path:
+        fig.savefig(out_path, dpi=120)
+        plt.close(fig)
+    else:
+        plt.show()
     
     return fig, ax
 
@@ -158,35 +168,42 @@ def print_accessibility_stats(planning_areas, accessibility_values, area_name_co
     print(f"Max accessibility: {accessibility_values.max():.2f}")
 
 # Cell 7: Run complete analysis
-def run_planning_area_analysis():
+def run_planning_area_analysis(profiler=None, out_path=None):
     """Run the complete planning area accessibility analysis"""
+    prof = profiler or Profiler("planning_area_analysis", enabled=False)
     
     print("=== Singapore Planning Area Childcare Accessibility Analysis ===\n")
     
     # Step 1: Load data
-    childcare, planning_area = load_singapore_data()
+    with prof.stage("load_data"):
+        childcare, planning_area = load_singapore_data()
     
     # Step 2: Prepare data
-    origins, destinations = prepare_data_for_accessibility(childcare, planning_area)
+    with prof.stage("prepare"):
+        origins, destinations = prepare_data_for_accessibility(childcare, planning_area)
     
     # Step 3: Calculate distances
-    distances = calculate_distances(origins, destinations)
+    with prof.stage("distances"):
+        distances = calculate_distances(origins, destinations)
     
     # Step 4: Calculate Hansen accessibility
     print("\nCalculating Hansen accessibility...")
-    accessibility = hansen_accessibility(
-        origins['demand'].values,
-        destinations['capacity'].values, 
-        distances
-    )
+    with prof.stage("hansen"):
+        accessibility = hansen_accessibility(
+            origins['demand'].values,
+            destinations['capacity'].values, 
+            distances
+        )
     
     # Step 5: Create visualization
-    plot_planning_area_accessibility(
-        planning_area, 
-        accessibility, 
-        childcare,
-        'Childcare Accessibility by Planning Area (Hansen Method)'
-    )
+    with prof.stage("plot"):
+        plot_planning_area_accessibility(
+            planning_area, 
+            accessibility, 
+            childcare,
+            'Childcare Accessibility by Planning Area (Hansen Method)',
+            out_path=out_path
+        )
     
     # Step 6: Print statistics
     print_accessibility_stats(planning_area, accessibility)
@@ -195,7 +212,7 @@ def run_planning_area_analysis():
     return planning_area, childcare, accessibility, distances
 
 # Cell 8: Alternative simple visualization
-def simple_accessibility_plot(planning_areas, accessibility_values):
+def simple_accessibility_plot(planning_areas, accessibility_values, out_path=None):
     """Simple bar chart of accessibility by planning area"""
     
     # Find name column
@@ -220,10 +237,25 @@ def simple_accessibility_plot(planning_areas, accessibility_values):
         plt.title('Childcare Accessibility by Planning Area')
         plt.grid(axis='x', alpha=0.3)
         plt.tight_layout()
-        plt.show()
+        if out_path:
+            plt.savefig(out_path, dpi=120)
+            plt.close()
+        else:
+            plt.show()
     else:
         print("Could not find area name column for bar chart")
 
 print("=== Ready to run! ===")
 print("Execute: planning_area, childcare, accessibility, distances = run_planning_area_analysis()")
-print("Or run step by step using the individual functions above")
\ No newline at end of file
+print("Or run step by step using the individual functions above")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Planning area childcare accessibility (Hansen)")
+    parser.add_argument("--out", default=None, help="save the map here instead of showing it")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    profiler = profiler_from_args("planning_area_analysis", args).start()
+    run_planning_area_analysis(profiler, args.out)
+    profiler.stop()
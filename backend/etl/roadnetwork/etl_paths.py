@@ -0,0 +1,13 @@
+# Shared locations for the road-network / accessibility ETL scripts
+import sys
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+GEOJSON_DIR = BASE / "geojson"
+REPO_ROOT = BASE.parents[2]
+ETL_ROOT = REPO_ROOT / "etl"
+ONEMAP_LAYERS_DIR = ETL_ROOT / "onemap" / "geojson_layers"
+
+# make the shared top-level ETL modules (artifacts, priority_mapping, ...) importable
+if str(ETL_ROOT) not in sys.path:
+    sys.path.append(str(ETL_ROOT))
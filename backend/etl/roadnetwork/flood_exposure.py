@@ -0,0 +1,110 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from pyproj import Transformer
+from scipy.spatial import cKDTree
+
+from etl_paths import BASE
+from artifacts import write_artifact
+from onemap.amenity_store import AmenityStore, STORE_DIR
+
+# --- File paths ---
+FLOOD_PRECIP_CSV = BASE / "postal_codes_flood_precipitation_rows.csv"
+OUTPUT_PARQUET   = BASE / "postal_codes_flood_exposure.parquet"   # next to ..._rows_v2 from reverse_geolocate.py
+DEFAULT_RADII    = (250, 500, 1000)
+
+TO_SVY21 = Transformer.from_crs("EPSG:4326", "EPSG:3414", always_xy=True)
+
+
+def project_lonlat(lon, lat):
+    """WGS84 lon/lat arrays -> EPSG:3414 metres"""
+    x, y = TO_SVY21.transform(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+    return np.asarray(x), np.asarray(y)
+
+
+def exposure_matrix(px, py, store: AmenityStore, radii=DEFAULT_RADII):
+    """Importance-weighted amenity counts around each point, per radius and category.
+
+    One KD-tree pass at the largest radius yields every (point, amenity, distance)
+    pair; each smaller radius is just a mask over those pairs, and the per-category
+    sums are a single bincount on (point, category) keys.
+
+    Returns (weighted, counts) with shapes (len(radii), n_points, n_categories) and
+    (len(radii), n_points). Unmapped amenities have no importance, so they only show
+    up in the counts.
+    """
+    radii = sorted(radii)
+    n, n_cat = len(px), len(store.categories)
+
+    amen_tree = cKDTree(np.column_stack([store.x, store.y]))
+    point_tree = cKDTree(np.column_stack([px, py]))
+    pairs = point_tree.sparse_distance_matrix(amen_tree, radii[-1], output_type="ndarray")
+    i, j, d = pairs["i"], pairs["j"], pairs["v"]
+
+    category = np.asarray(store.category, dtype=np.int64)[j]
+    mapped = category >= 0
+    weight = np.nan_to_num(np.asarray(store.importance, dtype=np.float64)[j])
+    key = i * n_cat + category
+
+    weighted = np.zeros((len(radii), n, n_cat))
+    counts = np.zeros((len(radii), n), dtype=np.int32)
+    for r_idx, r in enumerate(radii):
+        inside = d <= r
+        scored = inside & mapped
+        weighted[r_idx] = np.bincount(key[scored], weights=weight[scored], minlength=n * n_cat).reshape(n, n_cat)
+        counts[r_idx] = np.bincount(i[inside], minlength=n)
+    return weighted, counts
+
+
+def exposure_frame(weighted, counts, categories, radii=DEFAULT_RADII) -> pd.DataFrame:
+    """Flatten exposure arrays into exposure_<r>m, amenities_<r>m and exposure_<r>m_<category> columns"""
+    cols = {}
+    for r_idx, r in enumerate(sorted(radii)):
+        cols[f"exposure_{r}m"] = weighted[r_idx].sum(axis=1)
+        cols[f"amenities_{r}m"] = counts[r_idx]
+        for c_idx, cat in enumerate(categories):
+            cols[f"exposure_{r}m_{cat}"] = weighted[r_idx, :, c_idx]
+    return pd.DataFrame(cols)
+
+
+def run_flood_exposure(flood_csv=FLOOD_PRECIP_CSV, store_dir=STORE_DIR, output=OUTPUT_PARQUET,
+                       radii=DEFAULT_RADII, csv=True):
+    """Score every postal code in the flood dataset and write the result"""
+    t0 = time.perf_counter()
+    df = pd.read_csv(flood_csv, dtype={"Postal_Code": str})
+    df["Postal_Code"] = df["Postal_Code"].str.zfill(6)
+    store = AmenityStore(store_dir)
+
+    # rows without usable coordinates are dropped before the KD-tree (and the Hilbert sort on write)
+    lon = pd.to_numeric(df["longitude"], errors="coerce")
+    lat = pd.to_numeric(df["latitude"], errors="coerce")
+    px, py = project_lonlat(lon, lat)
+    valid = np.isfinite(px) & np.isfinite(py) & lon.between(-180, 180).to_numpy() & lat.between(-90, 90).to_numpy()
+    if not valid.all():
+        print(f"⚠️ Skipping {int((~valid).sum())} postal codes with missing or invalid coordinates")
+    df = df.loc[valid].assign(longitude=lon[valid], latitude=lat[valid])
+    weighted, counts = exposure_matrix(px[valid], py[valid], store, radii)
+
+    scores = exposure_frame(weighted, counts, store.categories, radii)
+    scores.index = df.index
+    out = pd.concat([df[["Postal_Code", "latitude", "longitude"]], scores], axis=1)
+
+    import geopandas as gpd
+    out_gdf = gpd.GeoDataFrame(out, geometry=gpd.points_from_xy(out["longitude"], out["latitude"]), crs="EPSG:4326")
+    write_artifact(out_gdf, output, keep_as_string=("Postal_Code",), csv=csv)
+    print(f"✓ Flood exposure for {valid.sum()} postal codes x {len(radii)} radii "
+          f"in {time.perf_counter() - t0:.1f}s → {output}")
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importance-weighted amenity exposure per postal code")
+    parser.add_argument("--flood-csv", default=str(FLOOD_PRECIP_CSV))
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--output", default=str(OUTPUT_PARQUET))
+    parser.add_argument("--radii", type=int, nargs="+", default=list(DEFAULT_RADII))
+    args = parser.parse_args()
+
+    run_flood_exposure(args.flood_csv, args.store, args.output, args.radii)
@@ -0,0 +1,303 @@
+import argparse
+import heapq
+import time
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from etl_paths import BASE, GEOJSON_DIR
+from onemap.amenity_store import AmenityStore, STORE_DIR
+from road_index import RoadSegmentIndex
+
+# --- File paths ---
+ROAD_NETWORK_GEOJSON = BASE / "road_network.geojson"
+SUBZONE_GEOJSON      = GEOJSON_DIR / "subzone_area.geojson"
+REACHABILITY_DIR     = BASE / "flood_reachability"
+
+TARGET_CRS      = "EPSG:3414"
+NODE_PRECISION  = 2      # decimals (cm) when merging segment end points into graph nodes
+REPAIR_FRACTION = 0.05   # above this share of nodes cut, a C Dijkstra re-run beats the Python repair
+NO_PRED         = -9999  # scipy's "no predecessor" marker
+
+
+class RoadGraph:
+    """Undirected graph over the road segments of a RoadSegmentIndex.
+
+    Edge ids are segment ids, so flooded segments map straight onto edges; nodes
+    are segment end points merged to NODE_PRECISION.
+    """
+
+    def __init__(self, roads: RoadSegmentIndex):
+        self.roads = roads
+        ends = np.vstack([np.column_stack([roads.ax, roads.ay]), np.column_stack([roads.bx, roads.by])])
+        self.node_xy, inverse = np.unique(np.round(ends, NODE_PRECISION), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        n_edges = len(roads)
+        self.edge_u, self.edge_v = inverse[:n_edges], inverse[n_edges:]
+        self.edge_len = roads.seg_length
+        self.open = self.edge_u != self.edge_v   # self loops never help
+
+        # adjacency in CSR form: for node n, (neighbour, edge id) pairs in adj_*[adj_start[n]:adj_start[n+1]]
+        src = np.concatenate([self.edge_u, self.edge_v])
+        order = np.argsort(src, kind="stable")
+        self.adj_node = np.concatenate([self.edge_v, self.edge_u])[order]
+        self.adj_edge = np.tile(np.arange(n_edges), 2)[order]
+        self.adj_start = np.searchsorted(src[order], np.arange(len(self.node_xy) + 1))
+
+    @property
+    def n_nodes(self):
+        return len(self.node_xy)
+
+    def lists(self):
+        """Plain-list views of the adjacency for the pure-Python repair loop"""
+        if getattr(self, "_lists", None) is None:
+            self._lists = (self.adj_start.tolist(), self.adj_node.tolist(), self.adj_edge.tolist(),
+                           self.edge_len.tolist())
+        return (*self._lists, self.open.tolist())
+
+    def matrix(self):
+        """Sparse weight matrix of the open edges (parallel edges keep the shortest)"""
+        ok = np.flatnonzero(self.open)
+        u, v, w = self.edge_u[ok], self.edge_v[ok], self.edge_len[ok]
+        order = np.lexsort((w, v, u))
+        u, v, w = u[order], v[order], w[order]
+        first = np.ones(len(u), dtype=bool)
+        first[1:] = (u[1:] != u[:-1]) | (v[1:] != v[:-1])
+        # zero-length edges would vanish from a sparse matrix; keep them as tiny weights
+        w = np.maximum(w[first], 1e-9)
+        return coo_matrix((w, (u[first], v[first])), shape=(self.n_nodes, self.n_nodes)).tocsr()
+
+    def snap_nodes(self, x, y):
+        """Graph node for each point plus the distance from the point to that node"""
+        snapped = self.roads.snap(x, y)
+        seg = snapped["segment_id"].to_numpy()
+        node = np.full(len(seg), -1, dtype=np.int64)
+        extra = np.full(len(seg), np.inf)
+        ok = seg >= 0
+        offset = snapped["segment_offset_m"].to_numpy()[ok]
+        length = self.edge_len[seg[ok]]
+        near_a = offset <= length / 2
+        node[ok] = np.where(near_a, self.edge_u[seg[ok]], self.edge_v[seg[ok]])
+        extra[ok] = snapped["distance_m"].to_numpy()[ok] + np.where(near_a, offset, length - offset)
+        return node, extra
+
+    def edges_in_polygons(self, polygons) -> np.ndarray:
+        """Segment ids touching any of the (EPSG:3414) flood polygons"""
+        _, seg = self.roads.tree.query(np.asarray(polygons), predicate="intersects")
+        return np.unique(seg)
+
+    def edges_for_roads(self, names) -> np.ndarray:
+        return np.flatnonzero(np.isin(self.roads.road_names[self.roads.seg_road], list(names)))
+
+
+class FloodReachability:
+    """Shortest-path trees from each source (subzone centroid) to every node, kept up to
+    date as road segments close and reopen.
+
+    Closing an edge only invalidates the subtrees hanging below it in the trees that
+    actually used it; those nodes are re-settled from their intact neighbours.
+    Reopening an edge recomputes only the trees it actually shortens.
+    """
+
+    def __init__(self, graph: RoadGraph, source_xy, source_names, target_xy, target_meta: pd.DataFrame):
+        self.graph = graph
+        self.source_names = np.asarray(source_names, dtype=object)
+        self.source_node, self.source_extra = graph.snap_nodes(source_xy[:, 0], source_xy[:, 1])
+        self.target_node, self.target_extra = graph.snap_nodes(target_xy[:, 0], target_xy[:, 1])
+        self.target_meta = target_meta.reset_index(drop=True)
+
+        t0 = time.perf_counter()
+        ok = self.source_node >= 0
+        self.dist = np.full((len(self.source_node), graph.n_nodes), np.inf)
+        self.pred = np.full((len(self.source_node), graph.n_nodes), NO_PRED, dtype=np.int32)
+        d, p = dijkstra(graph.matrix(), directed=False, indices=self.source_node[ok], return_predecessors=True)
+        self.dist[ok], self.pred[ok] = d, p
+        self.base = self.target_distances()
+        self.stats = {"build_s": round(time.perf_counter() - t0, 3), "repaired_nodes": 0, "full_reruns": 0}
+
+    def target_distances(self) -> np.ndarray:
+        """(sources x targets) network distance including the snap legs at both ends"""
+        ok = self.target_node >= 0
+        out = np.full((len(self.source_node), len(self.target_node)), np.inf)
+        out[:, ok] = self.dist[:, self.target_node[ok]] + self.target_extra[ok]
+        return out + self.source_extra[:, None]
+
+    # --- closures ---------------------------------------------------------------------
+    def _descendants(self, s, roots) -> np.ndarray:
+        """Nodes whose tree path from source s passes through any of roots (pointer jumping)"""
+        pred = self.pred[s].astype(np.int64)
+        anc = np.where(pred >= 0, pred, np.arange(len(pred)))
+        cut = np.zeros(len(pred), dtype=bool)
+        cut[roots] = True
+        # after k rounds, cut[n] covers n and its first 2^k ancestors
+        while True:
+            cut |= cut[anc]
+            nxt = anc[anc]
+            if np.array_equal(nxt, anc):
+                return np.flatnonzero(cut)
+            anc = nxt
+
+    def _resettle(self, s, nodes):
+        """Exact distances for `nodes` after closures; every other node is still final"""
+        g, dist, pred = self.graph, self.dist[s], self.pred[s]
+        inside = np.zeros(g.n_nodes, dtype=bool)
+        inside[nodes] = True
+        dist[nodes], pred[nodes] = np.inf, NO_PRED
+
+        # seed each cut node from its best intact, still-open neighbour
+        start, end = g.adj_start[nodes], g.adj_start[nodes + 1]
+        count = end - start
+        idx = np.repeat(start, count) + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        owner = np.repeat(nodes, count)
+        nbr, edge = g.adj_node[idx], g.adj_edge[idx]
+        ok = g.open[edge] & ~inside[nbr] & np.isfinite(dist[nbr])
+        heap = list(zip((dist[nbr] + g.edge_len[edge])[ok].tolist(), owner[ok].tolist(), nbr[ok].tolist()))
+        heapq.heapify(heap)
+
+        adj_start, adj_node, adj_edge, edge_len, is_open = g.lists()
+        best = {n: np.inf for n in nodes.tolist()}
+        while heap:
+            d, n, via = heapq.heappop(heap)
+            if d >= best[n]:
+                continue
+            best[n] = d
+            dist[n], pred[n] = d, via
+            for k in range(adj_start[n], adj_start[n + 1]):
+                m, e = adj_node[k], adj_edge[k]
+                if m in best and is_open[e]:
+                    nd = d + edge_len[e]
+                    if nd < best[m]:
+                        heapq.heappush(heap, (nd, m, n))
+
+    def _rerun(self, sources):
+        ok = sources[self.source_node[sources] >= 0]
+        if len(ok):
+            d, p = dijkstra(self.graph.matrix(), directed=False, indices=self.source_node[ok],
+                            return_predecessors=True)
+            self.dist[ok], self.pred[ok] = d, p
+            self.stats["full_reruns"] += len(ok)
+
+    def close_edges(self, edges) -> dict:
+        """Close segments (flooded); repairs only the subtrees that ran through them"""
+        t0 = time.perf_counter()
+        g = self.graph
+        edges = np.asarray([e for e in np.unique(edges) if g.open[e]], dtype=np.int64)
+        g.open[edges] = False
+        u, v = g.edge_u[edges], g.edge_v[edges]
+
+        # (source, cut node) for every tree that used a closed edge, in either direction
+        hit_s, hit_e = np.nonzero(self.pred[:, v] == u)
+        hit_s2, hit_e2 = np.nonzero(self.pred[:, u] == v)
+        sources = np.concatenate([hit_s, hit_s2])
+        roots = np.concatenate([v[hit_e], u[hit_e2]])
+
+        rerun, repaired = [], 0
+        for s in np.unique(sources):
+            cut = self._descendants(s, np.unique(roots[sources == s]))
+            if len(cut) > REPAIR_FRACTION * g.n_nodes:
+                rerun.append(s)
+            else:
+                self._resettle(s, cut)
+                repaired += len(cut)
+        self._rerun(np.asarray(rerun, dtype=np.int64))
+        self.stats["repaired_nodes"] += repaired
+        return {"closed": int(len(edges)), "trees_affected": int(len(np.unique(sources))),
+                "nodes_repaired": repaired, "full_reruns": len(rerun),
+                "seconds": round(time.perf_counter() - t0, 3)}
+
+    def reopen_edges(self, edges) -> dict:
+        """Reopen segments; only the trees that a reopened edge shortens are recomputed"""
+        t0 = time.perf_counter()
+        g = self.graph
+        edges = np.asarray([e for e in np.unique(edges) if not g.open[e] and g.edge_u[e] != g.edge_v[e]],
+                           dtype=np.int64)
+        g.open[edges] = True
+        u, v, w = g.edge_u[edges], g.edge_v[edges], g.edge_len[edges]
+        improves = ((self.dist[:, u] + w < self.dist[:, v]) | (self.dist[:, v] + w < self.dist[:, u])).any(axis=1)
+        sources = np.flatnonzero(improves)
+        self._rerun(sources)
+        return {"reopened": int(len(edges)), "trees_affected": int(len(sources)),
+                "seconds": round(time.perf_counter() - t0, 3)}
+
+    # --- reporting ----------------------------------------------------------------------
+    def pair_changes(self) -> pd.DataFrame:
+        """(source, target) pairs that became unreachable or longer than at build time"""
+        current = self.target_distances()
+        base_ok = np.isfinite(self.base)
+        unreachable = base_ok & ~np.isfinite(current)
+        longer = base_ok & np.isfinite(current) & (current - self.base > 1e-6)
+        s, t = np.nonzero(unreachable | longer)
+        df = pd.DataFrame({
+            "source": self.source_names[s],
+            "target_id": t,
+            "base_m": self.base[s, t],
+            "flooded_m": current[s, t],
+            "added_m": current[s, t] - self.base[s, t],
+            "unreachable": unreachable[s, t],
+        })
+        return pd.concat([df, self.target_meta.iloc[t].reset_index(drop=True)], axis=1)
+
+    def source_summary(self, pairs: pd.DataFrame = None) -> pd.DataFrame:
+        pairs = self.pair_changes() if pairs is None else pairs
+        reachable = pairs[~pairs["unreachable"]]
+        summary = pd.DataFrame({"source": self.source_names})
+        summary["newly_unreachable"] = summary["source"].map(pairs.groupby("source")["unreachable"].sum()).fillna(0).astype(int)
+        summary["longer_pairs"] = summary["source"].map(reachable.groupby("source").size()).fillna(0).astype(int)
+        summary["mean_added_m"] = summary["source"].map(reachable.groupby("source")["added_m"].mean())
+        summary["max_added_m"] = summary["source"].map(reachable.groupby("source")["added_m"].max())
+        return summary.sort_values("newly_unreachable", ascending=False, kind="stable")
+
+
+def load_sources(subzone_geojson=SUBZONE_GEOJSON):
+    """Subzone centroids (point on surface, so always inside the subzone)"""
+    sz = gpd.read_file(subzone_geojson).to_crs(TARGET_CRS)
+    pts = shapely.point_on_surface(sz.geometry.values)
+    return np.column_stack([shapely.get_x(pts), shapely.get_y(pts)]), sz["SUBZONE_N"].to_numpy()
+
+
+def load_targets(store: AmenityStore, categories=None):
+    rows = np.flatnonzero(store.mask(categories=categories))
+    frame = store.to_frame(rows)
+    frame.insert(0, "amenity_id", rows)
+    xy = np.column_stack([frame["x"].to_numpy(), frame["y"].to_numpy()])
+    return xy, frame.drop(columns=["x", "y"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Amenity reachability from subzones with flooded roads closed")
+    parser.add_argument("--roads", default=str(ROAD_NETWORK_GEOJSON))
+    parser.add_argument("--subzones", default=str(SUBZONE_GEOJSON))
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--categories", nargs="+", default=None)
+    parser.add_argument("--flood-geojson", help="polygons of flooded areas")
+    parser.add_argument("--flooded-roads", nargs="+", default=(), help="RD_NAMEs to close entirely")
+    parser.add_argument("--flooded-segments", nargs="+", type=int, default=(), help="segment ids to close")
+    parser.add_argument("--out", default=str(REACHABILITY_DIR))
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    graph = RoadGraph(RoadSegmentIndex.from_frame(gpd.read_file(args.roads)))
+    source_xy, source_names = load_sources(args.subzones)
+    target_xy, target_meta = load_targets(AmenityStore(args.store), args.categories)
+    model = FloodReachability(graph, source_xy, source_names, target_xy, target_meta)
+    print(f"✅ {graph.n_nodes} nodes / {len(graph.edge_len)} edges, {len(source_names)} sources, "
+          f"{len(target_xy)} targets; trees built in {model.stats['build_s']}s")
+
+    closed = [np.asarray(args.flooded_segments, dtype=np.int64), graph.edges_for_roads(args.flooded_roads)]
+    if args.flood_geojson:
+        closed.append(graph.edges_in_polygons(gpd.read_file(args.flood_geojson).to_crs(TARGET_CRS).geometry.values))
+    print(f"🌀 closing segments: {model.close_edges(np.concatenate(closed))}")
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    pairs = model.pair_changes()
+    pairs.to_parquet(out / "pair_changes.parquet", index=False)
+    summary = model.source_summary(pairs)
+    summary.to_csv(out / "subzone_summary.csv", index=False)
+    print(f"✓ {int(pairs['unreachable'].sum())} newly unreachable pairs, {int((~pairs['unreachable']).sum())} longer "
+          f"→ {out} in {time.perf_counter() - t0:.1f}s")
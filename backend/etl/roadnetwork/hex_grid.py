@@ -0,0 +1,161 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from pyproj import Transformer
+from scipy.spatial import cKDTree
+
+from etl_paths import BASE, GEOJSON_DIR
+from onemap.amenity_store import AmenityStore, STORE_DIR
+
+# --- File paths ---
+PLANNING_GEOJSON = GEOJSON_DIR / "planning_area.geojson"
+HEX_GRID_DIR     = BASE / "hex_grid"
+
+# hexagon circumradius in metres, coarse -> fine
+RESOLUTIONS        = (2000, 1000, 500, 250)
+ACCESS_CUTOFF_M    = 3000.0
+ACCESS_POWER       = 2
+TARGET_CRS         = "EPSG:3414"
+SQRT3              = np.sqrt(3.0)
+
+TO_WGS84 = Transformer.from_crs(TARGET_CRS, "EPSG:4326", always_xy=True)
+
+
+# --- pointy-top axial hex maths (relative to the grid origin) ---
+def hex_index(x, y, size):
+    """Vectorised point -> (q, r) axial cell assignment with cube rounding"""
+    qf = (SQRT3 / 3 * x - y / 3) / size
+    rf = (2 / 3 * y) / size
+    sf = -qf - rf
+    q, r, s = np.rint(qf), np.rint(rf), np.rint(sf)
+    dq, dr, ds = np.abs(q - qf), np.abs(r - rf), np.abs(s - sf)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    q = np.where(fix_q, -r - s, q)
+    r = np.where(fix_r, -q - s, r)
+    return q.astype(np.int32), r.astype(np.int32)
+
+
+def cell_key(q, r):
+    """(q, r) -> int64 key ordered like (q, r) lexicographically"""
+    return (q.astype(np.int64) << 32) | (r.astype(np.int64) + (1 << 31))
+
+
+def hex_center(q, r, size):
+    return size * SQRT3 * (q + r / 2), size * 1.5 * r
+
+
+def hex_vertices(cx, cy, size):
+    """(n, 6, 2) corner coordinates for pointy-top hexagons"""
+    angles = np.deg2rad(60 * np.arange(6) - 30)
+    return np.stack([cx[:, None] + size * np.cos(angles), cy[:, None] + size * np.sin(angles)], axis=-1)
+
+
+def grid_cells(bounds, size):
+    """Every (q, r) whose centre falls in the bounds (relative to bounds' lower-left origin)"""
+    minx, miny, maxx, maxy = bounds
+    w, h = maxx - minx, maxy - miny
+    r = np.arange(-1, int(np.ceil(h / (1.5 * size))) + 2)
+    q_min = int(np.floor(-r.max() / 2)) - 1
+    q = np.arange(q_min, int(np.ceil(w / (SQRT3 * size))) + 2)
+    qq, rr = np.meshgrid(q, r)
+    qq, rr = qq.ravel().astype(np.int32), rr.ravel().astype(np.int32)
+    cx, cy = hex_center(qq, rr, size)
+    keep = (cx >= -size) & (cx <= w + size) & (cy >= -size) & (cy <= h + size)
+    return qq[keep], rr[keep]
+
+
+def build_resolution(size, origin, land, store: AmenityStore):
+    """Cells over land (or holding amenities) with counts / importance / accessibility"""
+    ox, oy = origin
+    x, y = np.asarray(store.x) - ox, np.asarray(store.y) - oy
+    n_cat = len(store.categories) + 1
+
+    # candidate cells: grid over the extent, kept if the centre is on land
+    q, r = grid_cells(land.bounds, size) if land is not None else hex_index(x, y, size)
+    cx, cy = hex_center(q, r, size)
+    if land is not None:
+        on_land = shapely.contains_xy(land, cx + ox, cy + oy)
+        aq, ar = hex_index(x, y, size)
+        q, r = np.concatenate([q[on_land], aq]), np.concatenate([r[on_land], ar])
+    # pack (q, r) into one sortable int64 key so cell assignment is a binary search
+    cell_keys = np.unique(cell_key(q, r))
+    q = (cell_keys >> 32).astype(np.int32)
+    r = ((cell_keys & 0xFFFFFFFF) - (1 << 31)).astype(np.int32)
+    cx, cy = hex_center(q, r, size)
+
+    pq, pr = hex_index(x, y, size)
+    cell_of = np.searchsorted(cell_keys, cell_key(pq, pr))
+
+    category = np.asarray(store.category, dtype=np.int64)
+    category[category < 0] = n_cat - 1
+    weight = np.nan_to_num(np.asarray(store.importance, dtype=np.float64))
+    counts = np.bincount(cell_of * n_cat + category, minlength=len(q) * n_cat).reshape(len(q), n_cat)
+    importance = np.bincount(cell_of, weights=weight, minlength=len(q))
+
+    # Hansen accessibility from each cell centre (same form as amenity_accessibility.py)
+    pairs = cKDTree(np.column_stack([cx, cy])).sparse_distance_matrix(
+        cKDTree(np.column_stack([x, y])), ACCESS_CUTOFF_M, output_type="ndarray")
+    d_km = np.maximum(pairs["v"], size / 2) / 1000
+    access = np.bincount(pairs["i"], weights=weight[pairs["j"]] / (d_km ** ACCESS_POWER + 0.001), minlength=len(q))
+
+    lon, lat = TO_WGS84.transform(cx + ox, cy + oy)
+    verts = hex_vertices(cx + ox, cy + oy, size).reshape(-1, 2)
+    vlon, vlat = TO_WGS84.transform(verts[:, 0], verts[:, 1])
+    return {
+        "q": q, "r": r,
+        "lon": np.asarray(lon, dtype=np.float32), "lat": np.asarray(lat, dtype=np.float32),
+        "polygons": np.column_stack([vlon, vlat]).reshape(len(q), 6, 2).astype(np.float32),
+        "counts": counts.astype(np.int32),
+        "importance": importance.astype(np.float32),
+        "accessibility": access.astype(np.float32),
+    }
+
+
+def build_hex_pyramid(store_dir=STORE_DIR, planning_geojson=PLANNING_GEOJSON, out_dir=HEX_GRID_DIR,
+                      resolutions=RESOLUTIONS):
+    t0 = time.perf_counter()
+    store = AmenityStore(store_dir)
+    land = None
+    if planning_geojson and Path(planning_geojson).exists():
+        land = shapely.union_all(gpd.read_file(planning_geojson).to_crs(TARGET_CRS).geometry.make_valid().values)
+        shapely.prepare(land)
+    bounds = land.bounds if land is not None else store.meta["bounds"]
+    origin = (bounds[0], bounds[1])
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    levels = []
+    for size in sorted(resolutions, reverse=True):
+        arrays = build_resolution(size, origin, land, store)
+        np.savez(out_dir / f"res_{size}.npz", **arrays)
+        levels.append({"size_m": size, "cells": int(len(arrays["q"])), "file": f"res_{size}.npz"})
+        print(f"  ✅ {size} m hexes: {len(arrays['q'])} cells")
+
+    meta = {
+        "crs": TARGET_CRS,
+        "origin": origin,
+        "categories": store.categories + ["unmapped"],
+        "resolutions": levels,
+        "accessibility": {"method": "hansen", "power": ACCESS_POWER, "cutoff_m": ACCESS_CUTOFF_M},
+    }
+    with open(out_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    print(f"✓ Hex pyramid ({len(levels)} levels) → {out_dir} in {time.perf_counter() - t0:.1f}s")
+    return out_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the multi-resolution hexagon aggregation pyramid")
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--planning", default=str(PLANNING_GEOJSON))
+    parser.add_argument("--out", default=str(HEX_GRID_DIR))
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(RESOLUTIONS))
+    args = parser.parse_args()
+
+    build_hex_pyramid(args.store, args.planning, args.out, args.sizes)
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import time
+from collections import deque, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from etl_paths import BASE
+from profiling import Profiler, add_profile_argument, profiler_from_args
+from reverse_geolocate import (BoundaryIndex, PLANNING_GEOJSON, SUBZONE_GEOJSON, ROAD_NETWORK_GEOJSON,
+                               TARGET_CRS)
+
+# --- File paths ---
+WKB_CACHE_DIR = BASE / "wkb_cache"
+CHUNK_SIZE    = 100_000
+LAYERS        = {"planning": "PLN_AREA_N", "subzone": "SUBZONE_N", "roads": "RD_NAME"}
+
+
+# --- memory-mapped WKB cache ------------------------------------------------
+def write_wkb_cache(cache_dir=WKB_CACHE_DIR, planning_geojson=PLANNING_GEOJSON,
+                    subzone_geojson=SUBZONE_GEOJSON, road_network_geojson=ROAD_NETWORK_GEOJSON):
+    """Write each boundary layer as one WKB blob + offsets + names (EPSG:3414).
+
+    Workers mmap these files instead of receiving pickled geometries, so start-up
+    cost per worker is a WKB decode and the OS shares the pages between processes.
+    """
+    import geopandas as gpd
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    sources = {"planning": planning_geojson, "subzone": subzone_geojson, "roads": road_network_geojson}
+    for name, path in sources.items():
+        gdf = gpd.read_file(path).to_crs(TARGET_CRS)
+        wkb = shapely.to_wkb(gdf.geometry.values)
+        offsets = np.cumsum([0] + [len(b) for b in wkb]).astype(np.int64)
+        with open(cache_dir / f"{name}.wkb", "wb") as f:
+            for b in wkb:
+                f.write(b)
+        np.save(cache_dir / f"{name}.offsets.npy", offsets)
+        names = gdf[LAYERS[name]].tolist() if LAYERS[name] in gdf.columns else [None] * len(gdf)
+        with open(cache_dir / f"{name}.names.json", "w", encoding="utf-8") as f:
+            json.dump(names, f)
+        if name == "subzone" and "PLN_AREA_N" in gdf.columns:
+            # lets the index derive planning areas from subzones without a second test
+            with open(cache_dir / "subzone.planning.json", "w", encoding="utf-8") as f:
+                json.dump(gdf["PLN_AREA_N"].tolist(), f)
+        print(f"  ✅ {name}: {len(gdf)} geometries, {offsets[-1] / 1e6:.1f} MB WKB")
+    return cache_dir
+
+
+def read_wkb_layer(cache_dir, name):
+    cache_dir = Path(cache_dir)
+    blob = np.memmap(cache_dir / f"{name}.wkb", dtype=np.uint8, mode="r")
+    offsets = np.load(cache_dir / f"{name}.offsets.npy", mmap_mode="r")
+    geoms = shapely.from_wkb([blob[offsets[i]:offsets[i + 1]].tobytes() for i in range(len(offsets) - 1)])
+    with open(cache_dir / f"{name}.names.json", encoding="utf-8") as f:
+        names = json.load(f)
+    return geoms, names
+
+
+def index_from_cache(cache_dir=WKB_CACHE_DIR) -> BoundaryIndex:
+    layers = {name: read_wkb_layer(cache_dir, name) for name in LAYERS}
+    parents = Path(cache_dir) / "subzone.planning.json"
+    subzone_planning = None
+    if parents.exists():
+        with open(parents, encoding="utf-8") as f:
+            subzone_planning = json.load(f)
+    return BoundaryIndex(*layers["planning"], *layers["subzone"], *layers["roads"],
+                         subzone_planning=subzone_planning)
+
+
+# --- worker side --------------------------------------------------------------
+_worker_index = None
+
+
+def _init_worker(cache_dir):
+    global _worker_index
+    _worker_index = index_from_cache(cache_dir)
+
+
+def _geocode_chunk(chunk_id, lon, lat):
+    t0 = time.perf_counter()
+    result = _worker_index.lookup_lonlat(lon, lat)
+    return chunk_id, result, time.perf_counter() - t0, os.getpid()
+
+
+# --- driver -----------------------------------------------------------------
+def parallel_reverse_geocode(input_csv, output_csv, cache_dir=WKB_CACHE_DIR, workers=None,
+                             chunksize=CHUNK_SIZE, lon_col="longitude", lat_col="latitude", profiler=None):
+    """Reverse-geocode a large CSV across a process pool, streaming results in input order.
+
+    At most 2 x workers chunks are in flight, so memory stays bounded however large
+    the input is; finished chunks are written as soon as every earlier chunk is done.
+    A profiler only sees the driver process; worker time shows up as "wait_workers"
+    and in the per-worker busy rates printed at the end.
+    """
+    prof = profiler or Profiler("reverse_geocode", enabled=False)
+    workers = workers or os.cpu_count() or 1
+    if not (Path(cache_dir) / "roads.wkb").exists():
+        with prof.stage("wkb_cache"):
+            write_wkb_cache(cache_dir)
+
+    t0 = time.perf_counter()
+    busy = defaultdict(float)
+    rows_by_pid = defaultdict(int)
+    total = 0
+    pending = deque()
+
+    def write_ready():
+        nonlocal total
+        while pending and pending[0][1].done():
+            chunk_id, future, frame = pending.popleft()
+            _, result, elapsed, pid = future.result()
+            busy[pid] += elapsed
+            rows_by_pid[pid] += len(result)
+            with prof.stage("write_csv"):
+                result.index = frame.index
+                out = pd.concat([frame, result], axis=1)
+                out.to_csv(output_csv, mode="w" if chunk_id == 0 else "a", header=chunk_id == 0, index=False)
+            total += len(out)
+            print(f"  🌀 {total} rows written ({total / (time.perf_counter() - t0):,.0f} rows/s)")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(cache_dir),)) as pool:
+        for chunk_id, frame in enumerate(prof.iterate("read_csv", pd.read_csv(input_csv, chunksize=chunksize))):
+            with prof.stage("submit"):
+                future = pool.submit(_geocode_chunk, chunk_id, frame[lon_col].to_numpy(), frame[lat_col].to_numpy())
+            pending.append((chunk_id, future, frame))
+            write_ready()
+            while len(pending) >= 2 * workers:
+                with prof.stage("wait_workers"):
+                    pending[0][1].result()
+                write_ready()
+        while pending:
+            with prof.stage("wait_workers"):
+                pending[0][1].result()
+            write_ready()
+
+    wall = time.perf_counter() - t0
+    print(f"✓ {total} rows in {wall:.1f}s with {workers} workers → {output_csv}")
+    print(f"  overall: {total / wall:,.0f} rows/s, {total / wall / workers:,.0f} rows/s per core")
+    for pid in sorted(busy):
+        print(f"  worker {pid}: {rows_by_pid[pid]} rows, {rows_by_pid[pid] / busy[pid]:,.0f} rows/s busy")
+    return {"rows": total, "seconds": wall, "workers": workers,
+            "rows_per_sec": total / wall if wall else 0.0,
+            "rows_per_sec_per_core": total / wall / workers if wall else 0.0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel chunked reverse geocoding of lon/lat CSVs")
+    parser.add_argument("input_csv")
+    parser.add_argument("output_csv")
+    parser.add_argument("--cache", default=str(WKB_CACHE_DIR))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--lon-col", default="longitude")
+    parser.add_argument("--lat-col", default="latitude")
+    parser.add_argument("--rebuild-cache", action="store_true")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    profiler = profiler_from_args("reverse_geocode", args).start()
+    if args.rebuild_cache:
+        with profiler.stage("wkb_cache"):
+            write_wkb_cache(args.cache)
+    parallel_reverse_geocode(args.input_csv, args.output_csv, args.cache, args.workers,
+                             args.chunksize, args.lon_col, args.lat_col, profiler=profiler)
+    profiler.stop()
@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+import shapely
+
+CELL_SIZE = 100.0   # metres (EPSG:3414)
+
+OUTSIDE = 0         # raster code: no polygon touches the cell
+BOUNDARY = -1       # raster code: cell crosses a polygon edge -> exact test
+# codes >= 1 mean "entirely inside polygon code - 1"
+
+
+class RasterPIPIndex:
+    """Point-in-polygon index with raster pre-classification.
+
+    The polygons' extent is cut into square cells. A cell lying entirely inside one
+    polygon stores that polygon, so points in it are answered by an array lookup
+    with no geometry test; only points in boundary cells are tested exactly against
+    the (prepared) polygons whose boxes touch that cell.
+    """
+
+    def __init__(self, geoms, cell_size=CELL_SIZE):
+        t0 = time.perf_counter()
+        self.geoms = np.asarray(geoms)
+        shapely.prepare(self.geoms)
+        self.cell_size = float(cell_size)
+        minx, miny, maxx, maxy = shapely.total_bounds(self.geoms)
+        self.origin = (minx, miny)
+        self.nx = int(np.ceil((maxx - minx) / cell_size)) + 1
+        self.ny = int(np.ceil((maxy - miny) / cell_size)) + 1
+
+        ix, iy = np.meshgrid(np.arange(self.nx), np.arange(self.ny), indexing="xy")
+        x0 = minx + ix.ravel() * cell_size
+        y0 = miny + iy.ravel() * cell_size
+        cells = shapely.box(x0, y0, x0 + cell_size, y0 + cell_size)
+
+        tree = shapely.STRtree(self.geoms)
+        cell_hit, geom_hit = tree.query(cells, predicate="intersects")
+        n_cells = len(cells)
+        touching = np.bincount(cell_hit, minlength=n_cells)
+
+        raster = np.full(n_cells, OUTSIDE, dtype=np.int32)
+        raster[touching > 0] = BOUNDARY
+        # a cell touched by exactly one polygon that also contains it is interior
+        single = touching[cell_hit] == 1
+        inside = shapely.contains_properly(self.geoms[geom_hit[single]], cells[cell_hit[single]])
+        raster[cell_hit[single][inside]] = geom_hit[single][inside] + 1
+        self.raster = raster
+
+        # CSR candidate lists for boundary cells
+        boundary = raster[cell_hit] == BOUNDARY
+        order = np.argsort(cell_hit[boundary], kind="stable")
+        self.cand_cells = cell_hit[boundary][order]
+        self.cand_geoms = geom_hit[boundary][order]
+        self.cand_start = np.searchsorted(self.cand_cells, np.arange(n_cells + 1))
+
+        self.stats = {
+            "cells": n_cells,
+            "interior": int((raster > 0).sum()),
+            "boundary": int((raster == BOUNDARY).sum()),
+            "build_s": round(time.perf_counter() - t0, 3),
+        }
+
+    def cell_of(self, x, y):
+        cx = np.floor((x - self.origin[0]) / self.cell_size).astype(np.int64)
+        cy = np.floor((y - self.origin[1]) / self.cell_size).astype(np.int64)
+        ok = (cx >= 0) & (cx < self.nx) & (cy >= 0) & (cy < self.ny) & np.isfinite(x) & np.isfinite(y)
+        return np.where(ok, cy * self.nx + cx, -1)
+
+    def lookup(self, x, y) -> np.ndarray:
+        """Index of the polygon containing each point (-1 if none)"""
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        cell = self.cell_of(x, y)
+        code = np.where(cell >= 0, self.raster[np.maximum(cell, 0)], OUTSIDE)
+        out = np.where(code > 0, code - 1, -1).astype(np.int64)
+
+        todo = np.flatnonzero(code == BOUNDARY)
+        if len(todo):
+            start = self.cand_start[cell[todo]]
+            count = self.cand_start[cell[todo] + 1] - start
+            pt = np.repeat(todo, count)
+            offs = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+            geom = self.cand_geoms[np.repeat(start, count) + offs]
+            hit = shapely.intersects_xy(self.geoms[geom], x[pt], y[pt])
+            pt, geom = pt[hit], geom[hit]
+            # lowest polygon index wins, like the sequential scan did
+            order = np.lexsort((geom, pt))
+            pt, geom = pt[order], geom[order]
+            first = np.unique(pt, return_index=True)[1]
+            out[pt[first]] = geom[first]
+        return out
+
+
+class HierarchicalPIPIndex:
+    """Subzone lookup through the raster index; the planning area follows from the subzone.
+
+    Points that fall in no subzone (gaps between the two datasets) fall back to a
+    direct planning-area lookup.
+    """
+
+    def __init__(self, subzone_geoms, subzone_names, subzone_planning, planning_geoms, planning_names,
+                 cell_size=CELL_SIZE):
+        self.subzones = RasterPIPIndex(subzone_geoms, cell_size)
+        self.subzone_names = np.asarray(subzone_names, dtype=object)
+        self.subzone_planning = np.asarray(subzone_planning, dtype=object)
+        self.planning_geoms = np.asarray(planning_geoms)
+        self.planning_names = np.asarray(planning_names, dtype=object)
+        self.planning_tree = shapely.STRtree(self.planning_geoms)
+
+    def lookup(self, x, y):
+        """(planning_area, subzone) name arrays"""
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        sz = self.subzones.lookup(x, y)
+        subzone = np.full(len(x), None, dtype=object)
+        planning = np.full(len(x), None, dtype=object)
+        found = sz >= 0
+        subzone[found] = self.subzone_names[sz[found]]
+        planning[found] = self.subzone_planning[sz[found]]
+
+        missing = np.flatnonzero(~found & np.isfinite(x) & np.isfinite(y))
+        if len(missing):
+            pt_idx, geom_idx = self.planning_tree.query(shapely.points(x[missing], y[missing]), predicate="within")
+            order = np.lexsort((geom_idx, pt_idx))
+            pt_idx, geom_idx = pt_idx[order], geom_idx[order]
+            first = np.unique(pt_idx, return_index=True)[1]
+            planning[missing[pt_idx[first]]] = self.planning_names[geom_idx[first]]
+        return planning, subzone
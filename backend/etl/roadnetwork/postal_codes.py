@@ -0,0 +1,123 @@
+# Build / refresh the persistent postal code index (etl/postal_index.py)
+#
+# Bulk sources, highest priority first: the flood CSV (Postal_Code, latitude,
+# longitude), extra CSVs with the same columns, then the amenity store's postal
+# codes. Planning area / subzone / street come from one vectorised BoundaryIndex
+# pass per source. Codes still missing (--fill) are resolved through OneMap
+# search in rate-limited batches, each written as soon as it arrives.
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pyproj import Transformer
+
+import etl_paths  # noqa: F401  (puts etl/ on sys.path)
+from onemap.amenity_store import AmenityStore, STORE_DIR
+from parallel_geocode import WKB_CACHE_DIR, index_from_cache, write_wkb_cache
+from postal_index import INDEX_PATH, PostalIndex, fetch_onemap, normalize_postal
+from profiling import Profiler, add_profile_argument, profiler_from_args
+from reverse_geolocate import FLOOD_PRECIP_CSV, TARGET_CRS
+
+TO_WGS84 = Transformer.from_crs(TARGET_CRS, "EPSG:4326", always_xy=True)
+
+
+def boundary_index(cache_dir=WKB_CACHE_DIR):
+    if not (Path(cache_dir) / "roads.wkb").exists():
+        write_wkb_cache(cache_dir)
+    return index_from_cache(cache_dir)
+
+
+def _records(codes, lon, lat, places, street_names=None):
+    streets = places["street_name"].to_numpy() if street_names is None else street_names
+    return zip(codes, lon, lat, places["planning_area"].to_numpy(), places["subzone"].to_numpy(), streets)
+
+
+def csv_records(path, boundaries, code_col="Postal_Code", lon_col="longitude", lat_col="latitude"):
+    """Normalised, de-duplicated rows of a postal code CSV with their boundaries"""
+    df = pd.read_csv(path, dtype={code_col: str}, usecols=[code_col, lon_col, lat_col])
+    df[code_col] = df[code_col].map(normalize_postal)
+    df = df.dropna().drop_duplicates(code_col)
+    places = boundaries.lookup_lonlat(df[lon_col].to_numpy(), df[lat_col].to_numpy())
+    return list(_records(df[code_col], df[lon_col], df[lat_col], places))
+
+
+def store_records(store_dir, boundaries):
+    """Amenities that carry a postal code (coordinates are already EPSG:3414)"""
+    store = AmenityStore(store_dir)
+    codes = store.attributes(columns=["postal_code"])["postal_code"].map(normalize_postal)
+    keep = np.flatnonzero(codes.notna().to_numpy() & ~codes.duplicated().to_numpy())
+    x, y = np.asarray(store.x)[keep], np.asarray(store.y)[keep]
+    lon, lat = TO_WGS84.transform(x, y)
+    return list(_records(codes.iloc[keep], lon, lat, boundaries.lookup(x, y)))
+
+
+def fill_from_onemap(index, codes, boundaries, batch_size=200, progress=None):
+    """Resolve codes missing from the index through OneMap; returns (found, not found)"""
+    todo = index.missing(codes)
+    found = not_found = 0
+    for hits, misses in fetch_onemap(todo, batch_size=batch_size):
+        if hits:
+            code, lon, lat, road = map(list, zip(*hits))
+            places = boundaries.lookup_lonlat(lon, lat)
+            # OneMap's own road name beats snapping to the nearest segment
+            streets = [r or s for r, s in zip(road, places["street_name"])]
+            index.upsert(_records(code, lon, lat, places, streets), "onemap")
+        index.record_misses(misses)
+        found, not_found = found + len(hits), not_found + len(misses)
+        if progress:
+            progress((found + not_found) / max(len(todo), 1), f"{found + not_found}/{len(todo)} codes from OneMap")
+    return found, not_found
+
+
+def build_postal_index(out=INDEX_PATH, flood_csv=FLOOD_PRECIP_CSV, extra_csvs=(), store_dir=STORE_DIR,
+                       fill=None, cache_dir=WKB_CACHE_DIR, profiler=None, progress=None):
+    prof = profiler or Profiler("postal_index", enabled=False)
+    t0 = time.perf_counter()
+    with prof.stage("boundaries"):
+        boundaries = boundary_index(cache_dir)
+    index = PostalIndex(out, writable=True)
+
+    # lowest priority first, each source overwriting what came before it
+    sources = []
+    if store_dir and (Path(store_dir) / "meta.json").exists():
+        sources.append(("amenity_store", lambda: store_records(store_dir, boundaries)))
+    for path in reversed([flood_csv, *extra_csvs]):
+        if path and Path(path).exists():
+            sources.append((Path(path).stem, lambda path=path: csv_records(path, boundaries)))
+    for name, load in sources:
+        with prof.stage(f"load_{name}"):
+            records = load()
+        with prof.stage("write"):
+            n = index.upsert(records, name)
+        print(f"  ✅ {name}: {n} postal codes")
+
+    if fill:
+        codes = pd.read_csv(fill, dtype=str).iloc[:, 0] if str(fill).endswith(".csv") else \
+            Path(fill).read_text(encoding="utf-8").split()
+        with prof.stage("onemap"):
+            found, not_found = fill_from_onemap(index, list(codes), boundaries, progress=progress)
+        print(f"  ✅ OneMap: {found} resolved, {not_found} not found")
+
+    stats = index.stats()
+    index.close()
+    print(f"✓ Postal index: {stats['codes']} codes → {out} in {time.perf_counter() - t0:.1f}s")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the postal code -> location index")
+    parser.add_argument("--out", default=str(INDEX_PATH))
+    parser.add_argument("--flood-csv", default=str(FLOOD_PRECIP_CSV))
+    parser.add_argument("--csv", nargs="*", default=[], help="more CSVs with Postal_Code/latitude/longitude")
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--fill", default=None,
+                        help="codes to resolve through OneMap when missing (.csv first column, or whitespace separated)")
+    parser.add_argument("--cache", default=str(WKB_CACHE_DIR))
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    profiler = profiler_from_args("postal_index", args).start()
+    build_postal_index(args.out, args.flood_csv, args.csv, args.store, args.fill, args.cache, profiler)
+    profiler.stop()
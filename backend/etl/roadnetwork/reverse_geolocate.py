@@ -1,19 +1,110 @@
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point
+import shapely
+from pyproj import Transformer
 from pathlib import Path
 
+from etl_paths import BASE
+from artifacts import write_artifact
+from postal_index import INDEX_PATH as POSTAL_INDEX, PostalIndex, normalize_postal
+from pip_index import HierarchicalPIPIndex
+from road_index import RoadSegmentIndex
+
 # --- File paths ---
-BASE = Path(__file__).resolve().parent
 FLOOD_PRECIP_CSV     = BASE / "postal_codes_flood_precipitation_rows.csv"
 PLANNING_GEOJSON     = BASE / "planning_area.geojson"   # use cleaned files
 SUBZONE_GEOJSON      = BASE / "subzone_area.geojson"
 ROAD_NETWORK_GEOJSON = BASE / "road_network.geojson"
 OUTPUT_CSV           = BASE / "postal_codes_flood_precipitation_rows_v2.csv"
+OUTPUT_PARQUET       = OUTPUT_CSV.with_suffix(".parquet")
+
+TARGET_CRS = "EPSG:3414"
+TO_SVY21 = Transformer.from_crs("EPSG:4326", TARGET_CRS, always_xy=True)
+EMPTY_RESULT = {"planning_area": None, "subzone": None, "street_name": None}
+
+
+class BoundaryIndex:
+    """Vectorised containment / nearest-road lookups over EPSG:3414 geometry arrays.
+
+    Built either from GeoDataFrames (SGReverseGeolocator) or straight from a WKB
+    cache (parallel_geocode.py), so every reverse-geocode path shares this code.
+    Containment goes through a raster-classified subzone index (pip_index.py); the
+    planning area is taken from the subzone's PLN_AREA_N rather than tested again.
+    Street names come from the segment-level RoadSegmentIndex (road_index.py).
+    """
+
+    def __init__(self, planning_geoms, planning_names, subzone_geoms, subzone_names, road_geoms, road_names,
+                 subzone_planning=None):
+        self.planning_names = np.asarray(planning_names, dtype=object)
+        self.subzone_names = np.asarray(subzone_names, dtype=object)
+        self.planning_tree = shapely.STRtree(planning_geoms)
+        self.roads = RoadSegmentIndex(road_geoms, road_names)
+        if subzone_planning is None:
+            subzone_planning = self._parent_names(subzone_geoms)
+        self.pip = HierarchicalPIPIndex(subzone_geoms, subzone_names, subzone_planning,
+                                        planning_geoms, planning_names)
+
+    @classmethod
+    def from_frames(cls, planning_gdf, subzone_gdf, roads_gdf):
+        p = planning_gdf.to_crs(TARGET_CRS)
+        s = subzone_gdf.to_crs(TARGET_CRS)
+        r = roads_gdf.to_crs(TARGET_CRS)
+        return cls(p.geometry.values, p.get("PLN_AREA_N"), s.geometry.values, s.get("SUBZONE_N"),
+                   r.geometry.values, r.get("RD_NAME", pd.Series(None, index=r.index)),
+                   subzone_planning=s.get("PLN_AREA_N"))
+
+    def _parent_names(self, subzone_geoms):
+        """Planning area of each subzone, for sources that don't carry PLN_AREA_N"""
+        reps = shapely.point_on_surface(np.asarray(subzone_geoms))
+        return self._take(self.planning_names, self._first_match(self.planning_tree, reps, len(reps)))
+
+    @staticmethod
+    def _first_match(tree, points, n):
+        """Index of the first polygon containing each point (-1 if none)"""
+        out = np.full(n, -1, dtype=np.int64)
+        pt_idx, geom_idx = tree.query(points, predicate="within")
+        # keep the lowest polygon index per point, matching iloc[0] on a boolean mask
+        order = np.lexsort((geom_idx, pt_idx))
+        pt_idx, geom_idx = pt_idx[order], geom_idx[order]
+        first = np.unique(pt_idx, return_index=True)[1]
+        out[pt_idx[first]] = geom_idx[first]
+        return out
+
+    @staticmethod
+    def _take(names, idx):
+        vals = np.empty(len(idx), dtype=object)
+        ok = idx >= 0
+        vals[ok] = names[idx[ok]]
+        return vals
+
+    def lookup(self, x, y, road_detail=False) -> pd.DataFrame:
+        """planning_area / subzone / street_name for arrays of EPSG:3414 coordinates
+
+        With road_detail=True the snapping columns from RoadSegmentIndex.snap
+        (distance, snapped point, offsets) are appended as well.
+        """
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        planning, subzone = self.pip.lookup(x, y)
+        snapped = self.roads.snap(x, y)
+
+        result = pd.DataFrame({
+            "planning_area": planning,
+            "subzone": subzone,
+            "street_name": snapped["street_name"].to_numpy(),
+        })
+        if road_detail:
+            result = pd.concat([result, snapped.drop(columns=["street_name"])], axis=1)
+        return result
+
+    def lookup_lonlat(self, lon, lat, road_detail=False) -> pd.DataFrame:
+        x, y = TO_SVY21.transform(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+        return self.lookup(x, y, road_detail)
 
 
 class SGReverseGeolocator:
-    def __init__(self, flood_csv, planning_geojson, subzone_geojson, road_network_geojson):
+    def __init__(self, flood_csv, planning_geojson, subzone_geojson, road_network_geojson,
+                 postal_index=POSTAL_INDEX):
         # Load flood dataset
         df = pd.read_csv(flood_csv)
         df["Postal_Code"] = df["Postal_Code"].astype(str).str.zfill(6)
@@ -29,48 +120,36 @@ class SGReverseGeolocator:
         self.subzone_gdf  = gpd.read_file(subzone_geojson).to_crs("EPSG:4326")
         self.roads_gdf    = gpd.read_file(road_network_geojson).to_crs("EPSG:4326")
 
-    def reverse_lookup(self, postal_code=None, lat=None, lon=None):
-        pt = None
-        row = None
+        # Projected once, queried through spatial trees
+        self.index = BoundaryIndex.from_frames(self.planning_gdf, self.subzone_gdf, self.roads_gdf)
+
+        # postal code -> row: the persistent index when it has been built, else a binary
+        # search over the flood dataset's codes sorted once here
+        self.postal_index = PostalIndex(postal_index) if postal_index and Path(postal_index).exists() else None
+        self.postal_order = np.argsort(self.flood_gdf["Postal_Code"].to_numpy(), kind="stable")
+        self.postal_sorted = self.flood_gdf["Postal_Code"].to_numpy()[self.postal_order]
 
+    def reverse_lookup(self, postal_code=None, lat=None, lon=None):
         if lat is not None and lon is not None:
-            pt = Point(float(lon), float(lat))
+            lon_, lat_ = float(lon), float(lat)
         elif postal_code:
-            row = self.flood_gdf[self.flood_gdf["Postal_Code"] == str(postal_code).zfill(6)]
-            if row.empty:
-                return {"planning_area": None, "subzone": None, "street_name": None}
-            pt = row.iloc[0].geometry
+            code = normalize_postal(postal_code)
+            hit = self.postal_index.lookup(code) if self.postal_index and code else None
+            if hit:
+                return {k: hit[k] for k in EMPTY_RESULT}
+            i = np.searchsorted(self.postal_sorted, code) if code else len(self.postal_sorted)
+            if i >= len(self.postal_sorted) or self.postal_sorted[i] != code:
+                return dict(EMPTY_RESULT)
+            pt = self.flood_gdf.geometry.iloc[self.postal_order[i]]
+            lon_, lat_ = pt.x, pt.y
         else:
-            return {"planning_area": None, "subzone": None, "street_name": None}
-
-        # Planning area
-        planning_area = None
-        pa_match = self.planning_gdf[self.planning_gdf.contains(pt)]
-        if not pa_match.empty:
-            planning_area = pa_match.iloc[0].get("PLN_AREA_N")
-
-        # Subzone
-        subzone = None
-        sz_match = self.subzone_gdf[self.subzone_gdf.contains(pt)]
-        if not sz_match.empty:
-            subzone = sz_match.iloc[0].get("SUBZONE_N")
-
-        # Nearest road (EPSG:3414 for distance)
-        street_name = None
-        try:
-            roads_proj = self.roads_gdf.to_crs("EPSG:3414")
-            pt_proj = gpd.GeoSeries([pt], crs="EPSG:4326").to_crs("EPSG:3414").iloc[0]
-
-            nearest_idx = roads_proj.distance(pt_proj).idxmin()
-            street_name = roads_proj.loc[nearest_idx].get("RD_NAME")
-        except Exception as e:
-            print(f"Road lookup failed: {e}")
-
-        return {
-            "planning_area": planning_area,
-            "subzone": subzone,
-            "street_name": street_name
-        }
+            return dict(EMPTY_RESULT)
+
+        return self.reverse_lookup_batch([lat_], [lon_]).iloc[0].to_dict()
+
+    def reverse_lookup_batch(self, lats, lons) -> pd.DataFrame:
+        """Vectorised reverse lookup for many points at once"""
+        return self.index.lookup_lonlat(lons, lats)
 
 
 # --------- Run for all rows ---------
@@ -87,16 +166,15 @@ if __name__ == "__main__":
 
     print(f"Running reverse lookup for {len(flood_df)} rows...")
 
-    results = []
-    for _, row in flood_df.iterrows():
-        p = row["Postal_Code"]
-        lat, lon = row["latitude"], row["longitude"]
-        res = geo.reverse_lookup(postal_code=p, lat=lat, lon=lon)
-        results.append(res)
-
-    results_df = pd.DataFrame(results)
+    results_df = geo.reverse_lookup_batch(flood_df["latitude"].to_numpy(), flood_df["longitude"].to_numpy())
     enriched_df = pd.concat([flood_df, results_df], axis=1)
 
+    enriched_gdf = gpd.GeoDataFrame(
+        enriched_df,
+        geometry=gpd.points_from_xy(enriched_df["longitude"], enriched_df["latitude"]),
+        crs="EPSG:4326"
+    )
+    write_artifact(enriched_gdf, OUTPUT_PARQUET, keep_as_string=("Postal_Code",))
     enriched_df.to_csv(OUTPUT_CSV, index=False)
-    print(f"✓ Enriched dataset saved → {OUTPUT_CSV}")
+    print(f"✓ Enriched dataset saved → {OUTPUT_PARQUET} (+ {OUTPUT_CSV.name})")
     print("Columns added: planning_area, subzone, street_name")
@@ -0,0 +1,169 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from etl_paths import BASE, ONEMAP_LAYERS_DIR
+from onemap.amenity_store import AmenityStore, STORE_DIR
+from priority_mapping import load_category_table
+
+# --- File paths ---
+ROAD_NETWORK_GEOJSON = BASE / "road_network.geojson"
+CRITICALITY_DIR      = BASE / "road_criticality"
+MAX_SNAP_DISTANCE    = 200.0   # metres; amenities further than this from any road are not assigned
+TARGET_CRS           = "EPSG:3414"
+
+
+def load_segments(road_network_geojson=ROAD_NETWORK_GEOJSON) -> gpd.GeoDataFrame:
+    """One row per road segment (multi-part lines are exploded) in EPSG:3414"""
+    roads = gpd.read_file(road_network_geojson).to_crs(TARGET_CRS)
+    roads = roads.explode(index_parts=False).reset_index(drop=True)
+    roads["segment_id"] = np.arange(len(roads), dtype=np.int32)
+    if "RD_NAME" not in roads.columns:
+        roads["RD_NAME"] = None
+    return roads[["segment_id", "RD_NAME", "geometry"]]
+
+
+def assign_to_segments(segments: gpd.GeoDataFrame, x, y, max_distance=MAX_SNAP_DISTANCE) -> np.ndarray:
+    """Nearest segment id for every point (-1 when nothing is within max_distance)"""
+    out = np.full(len(x), -1, dtype=np.int32)
+    if len(x) == 0:
+        return out
+    pts = gpd.GeoSeries(gpd.points_from_xy(x, y), crs=segments.crs)
+    # query_nearest returns every tied nearest segment; keep the first per point
+    (pt_idx, seg_idx), _ = segments.sindex.nearest(pts, max_distance=max_distance, return_distance=True)
+    first = np.unique(pt_idx, return_index=True)[1]
+    out[pt_idx[first]] = segments["segment_id"].to_numpy()[seg_idx[first]]
+    return out
+
+
+class RoadCriticality:
+    """Per-segment importance, kept as a segments x layers matrix of contributions.
+
+    Because each layer's contribution is a separate column, replacing one layer only
+    subtracts/adds that column and re-sums the rows it touched.
+    """
+
+    def __init__(self, segments, layers, importance, counts, max_distance=MAX_SNAP_DISTANCE):
+        self.segments = segments
+        self.layers = list(layers)
+        self.importance = importance   # (n_segments, n_layers) float64
+        self.counts = counts           # (n_segments, n_layers) int32
+        self.max_distance = max_distance
+        self.scores = importance.sum(axis=1)
+        self.amenities = counts.sum(axis=1)
+
+    @classmethod
+    def build(cls, segments, store: AmenityStore, max_distance=MAX_SNAP_DISTANCE):
+        """Full batch join of every amenity in the store onto its nearest segment"""
+        seg = assign_to_segments(segments, np.asarray(store.x), np.asarray(store.y), max_distance)
+        layer = np.asarray(store.layer, dtype=np.int64)
+        weight = np.nan_to_num(np.asarray(store.importance, dtype=np.float64))
+
+        n_seg, n_layer = len(segments), len(store.layers)
+        ok = seg >= 0
+        key = seg[ok].astype(np.int64) * n_layer + layer[ok]
+        importance = np.bincount(key, weights=weight[ok], minlength=n_seg * n_layer).reshape(n_seg, n_layer)
+        counts = np.bincount(key, minlength=n_seg * n_layer).reshape(n_seg, n_layer).astype(np.int32)
+        print(f"Assigned {ok.sum()} / {len(seg)} amenities to {np.count_nonzero(counts.sum(axis=1))} segments")
+        return cls(segments, store.layers, importance, counts, max_distance)
+
+    def update_layer(self, layer_name, x, y, importance) -> np.ndarray:
+        """Replace one layer's amenities; returns the ids of the segments that changed"""
+        if layer_name not in self.layers:
+            self.layers.append(layer_name)
+            self.importance = np.hstack([self.importance, np.zeros((len(self.segments), 1))])
+            self.counts = np.hstack([self.counts, np.zeros((len(self.segments), 1), dtype=np.int32)])
+        col = self.layers.index(layer_name)
+
+        seg = assign_to_segments(self.segments, np.asarray(x), np.asarray(y), self.max_distance)
+        ok = seg >= 0
+        n_seg = len(self.segments)
+        new_imp = np.bincount(seg[ok], weights=np.nan_to_num(np.asarray(importance, dtype=np.float64))[ok],
+                              minlength=n_seg)
+        new_cnt = np.bincount(seg[ok], minlength=n_seg).astype(np.int32)
+
+        affected = np.flatnonzero((new_imp != self.importance[:, col]) | (new_cnt != self.counts[:, col]))
+        self.importance[affected, col] = new_imp[affected]
+        self.counts[affected, col] = new_cnt[affected]
+        self.scores[affected] = self.importance[affected].sum(axis=1)
+        self.amenities[affected] = self.counts[affected].sum(axis=1)
+        print(f"🔁 {layer_name}: {len(affected)} segments recomputed")
+        return affected
+
+    def update_layer_from_file(self, layer_geojson, config_path=None):
+        """Re-read one OneMap layer file and apply it"""
+        layer_geojson = Path(layer_geojson)
+        table = load_category_table(config_path) if config_path else load_category_table()
+        gdf = gpd.read_file(layer_geojson).to_crs(TARGET_CRS)
+        pts = gdf.geometry.where(gdf.geom_type == "Point", gdf.geometry.representative_point())
+        code = table.type_codes([layer_geojson.stem])[0]
+        weight = np.full(len(gdf), table.type_score[code])
+        return self.update_layer(layer_geojson.stem, pts.x.to_numpy(), pts.y.to_numpy(), weight)
+
+    # --- results ------------------------------------------------------------
+    def segment_scores(self) -> pd.DataFrame:
+        df = pd.DataFrame({
+            "segment_id": self.segments["segment_id"].to_numpy(),
+            "RD_NAME": self.segments["RD_NAME"].to_numpy(),
+            "importance_score": self.scores,
+            "amenities": self.amenities,
+        })
+        return df.sort_values("importance_score", ascending=False, kind="stable")
+
+    def road_scores(self) -> pd.DataFrame:
+        """Scores rolled up per RD_NAME"""
+        seg = self.segment_scores()
+        return (seg.groupby("RD_NAME", dropna=False)
+                   .agg(importance_score=("importance_score", "sum"),
+                        amenities=("amenities", "sum"),
+                        segments=("segment_id", "count"))
+                   .sort_values("importance_score", ascending=False)
+                   .reset_index())
+
+    # --- persistence --------------------------------------------------------
+    def save(self, out_dir=CRITICALITY_DIR):
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        self.segments.to_parquet(out_dir / "segments.parquet", index=False)
+        np.save(out_dir / "layer_importance.npy", self.importance)
+        np.save(out_dir / "layer_counts.npy", self.counts)
+        with open(out_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"layers": self.layers, "max_distance": self.max_distance}, f, indent=2)
+        self.segment_scores().to_csv(out_dir / "segment_criticality.csv", index=False)
+        self.road_scores().to_csv(out_dir / "road_criticality.csv", index=False)
+        print(f"✓ Road criticality saved → {out_dir}")
+
+    @classmethod
+    def load(cls, out_dir=CRITICALITY_DIR):
+        out_dir = Path(out_dir)
+        with open(out_dir / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(gpd.read_parquet(out_dir / "segments.parquet"), meta["layers"],
+                   np.load(out_dir / "layer_importance.npy"), np.load(out_dir / "layer_counts.npy"),
+                   meta["max_distance"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank road segments by the importance of the amenities they serve")
+    parser.add_argument("--roads", default=str(ROAD_NETWORK_GEOJSON))
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--out", default=str(CRITICALITY_DIR))
+    parser.add_argument("--update-layer", nargs="+", metavar="LAYER",
+                        help="layer names (from geojson_layers/) to re-apply to a saved result instead of rebuilding")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.update_layer:
+        crit = RoadCriticality.load(args.out)
+        for name in args.update_layer:
+            crit.update_layer_from_file(ONEMAP_LAYERS_DIR / f"{name}.geojson")
+    else:
+        crit = RoadCriticality.build(load_segments(args.roads), AmenityStore(args.store))
+    crit.save(args.out)
+    print(crit.road_scores().head(10))
+    print(f"Done in {time.perf_counter() - t0:.1f}s")
@@ -0,0 +1,130 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+import shapely
+
+TARGET_CRS = "EPSG:3414"
+
+
+class RoadSegmentIndex:
+    """Nearest-road lookups over individual two-point road segments (EPSG:3414).
+
+    Every LineString (multi-part roads are split into parts) is broken into its
+    straight segments, which go into one STRtree. A query finds the nearest segment
+    and projects the point onto it, so the result carries the snapped position and
+    its offset along both the segment and the whole road — usable as graph entry
+    points by the routing code.
+    """
+
+    def __init__(self, road_geoms, road_names=None):
+        road_geoms = np.asarray(road_geoms)
+        self.road_names = np.asarray(road_names if road_names is not None else [None] * len(road_geoms),
+                                     dtype=object)
+
+        parts, part_road = shapely.get_parts(road_geoms, return_index=True)
+        coords, coord_part = shapely.get_coordinates(parts, return_index=True)
+        # consecutive vertices of the same part form a segment
+        same = coord_part[:-1] == coord_part[1:]
+        start = np.flatnonzero(same)
+        self.ax, self.ay = coords[start, 0], coords[start, 1]
+        self.bx, self.by = coords[start + 1, 0], coords[start + 1, 1]
+        self.seg_part = coord_part[start]
+        self.seg_road = part_road[self.seg_part]
+        self.seg_length = np.hypot(self.bx - self.ax, self.by - self.ay)
+
+        # offset of each segment's start along its part (cumulative length per part)
+        cum = np.cumsum(self.seg_length)
+        part_first = np.searchsorted(self.seg_part, np.arange(len(parts)))
+        part_base = np.concatenate([[0.0], cum])[part_first]
+        self.seg_start_offset = cum - self.seg_length - part_base[self.seg_part]
+
+        self.tree = shapely.STRtree(shapely.linestrings(
+            np.stack([np.column_stack([self.ax, self.ay]), np.column_stack([self.bx, self.by])], axis=1)))
+
+    @classmethod
+    def from_frame(cls, roads_gdf, name_col="RD_NAME"):
+        r = roads_gdf.to_crs(TARGET_CRS)
+        return cls(r.geometry.values, r[name_col].to_numpy() if name_col in r.columns else None)
+
+    def __len__(self):
+        return len(self.ax)
+
+    def nearest_segments(self, x, y, max_distance=None) -> np.ndarray:
+        """Nearest segment per point (-1 for invalid points or none within max_distance)"""
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        out = np.full(len(x), -1, dtype=np.int64)
+        valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        if len(valid) and len(self):
+            pt_idx, seg_idx = self.tree.query_nearest(shapely.points(x[valid], y[valid]),
+                                                      max_distance=max_distance, all_matches=False)
+            out[valid[pt_idx]] = seg_idx
+        return out
+
+    def snap(self, x, y, max_distance=None) -> pd.DataFrame:
+        """Batched nearest-road snapping.
+
+        Columns: road_index, street_name, segment_id, distance_m, snap_x, snap_y,
+        segment_offset_m (from the segment start) and road_offset_m (from the start
+        of the road part). Rows with no match hold -1 / None / NaN.
+        """
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        seg = self.nearest_segments(x, y, max_distance)
+        ok = seg >= 0
+        s = seg[ok]
+
+        dx, dy = self.bx[s] - self.ax[s], self.by[s] - self.ay[s]
+        length2 = dx * dx + dy * dy
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(length2 > 0, ((x[ok] - self.ax[s]) * dx + (y[ok] - self.ay[s]) * dy) / length2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        sx, sy = self.ax[s] + t * dx, self.ay[s] + t * dy
+
+        n = len(x)
+        snap_x, snap_y = np.full(n, np.nan), np.full(n, np.nan)
+        dist, seg_off, road_off = np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+        road = np.full(n, -1, dtype=np.int64)
+        names = np.full(n, None, dtype=object)
+
+        snap_x[ok], snap_y[ok] = sx, sy
+        dist[ok] = np.hypot(x[ok] - sx, y[ok] - sy)
+        seg_off[ok] = t * self.seg_length[s]
+        road_off[ok] = self.seg_start_offset[s] + seg_off[ok]
+        road[ok] = self.seg_road[s]
+        names[ok] = self.road_names[road[ok]]
+
+        return pd.DataFrame({
+            "road_index": road,
+            "street_name": names,
+            "segment_id": seg,
+            "distance_m": dist,
+            "snap_x": snap_x,
+            "snap_y": snap_y,
+            "segment_offset_m": seg_off,
+            "road_offset_m": road_off,
+        })
+
+
+if __name__ == "__main__":
+    import geopandas as gpd
+    from pyproj import Transformer
+
+    from reverse_geolocate import ROAD_NETWORK_GEOJSON
+
+    parser = argparse.ArgumentParser(description="Snap lon/lat points in a CSV to the nearest road segment")
+    parser.add_argument("input_csv")
+    parser.add_argument("output_csv")
+    parser.add_argument("--roads", default=str(ROAD_NETWORK_GEOJSON))
+    parser.add_argument("--lon-col", default="longitude")
+    parser.add_argument("--lat-col", default="latitude")
+    parser.add_argument("--max-distance", type=float, default=None)
+    args = parser.parse_args()
+
+    index = RoadSegmentIndex.from_frame(gpd.read_file(args.roads))
+    df = pd.read_csv(args.input_csv)
+    x, y = Transformer.from_crs("EPSG:4326", TARGET_CRS, always_xy=True).transform(
+        df[args.lon_col].to_numpy(dtype=np.float64), df[args.lat_col].to_numpy(dtype=np.float64))
+    snapped = index.snap(x, y, args.max_distance)
+    pd.concat([df, snapped], axis=1).to_csv(args.output_csv, index=False)
+    print(f"✓ Snapped {int((snapped['segment_id'] >= 0).sum())} / {len(df)} points "
+          f"to {len(index)} road segments → {args.output_csv}")
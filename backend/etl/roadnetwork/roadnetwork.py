@@ -1,68 +1,91 @@
 import requests
 import xml.etree.ElementTree as ET
 import json
+from pathlib import Path
+
+# Road network dataset on data.gov.sg (KML)
+DATASET_ID = "d_717cd51c67db03f2d9c7c18c89c32df1"
+OUTPUT_GEOJSON = Path("road_network.geojson")
+
+KML_NS = {
+    "kml": "http://www.opengis.net/kml/2.2"
+}
+
 
 # Step 1: Get download URL from dataset
-dataset_id = "d_717cd51c67db03f2d9c7c18c89c32df1"
-url = f"https://api-open.data.gov.sg/v1/public/api/datasets/{dataset_id}/poll-download"
-response = requests.get(url)
-download_json = response.json()
+def get_download_url(dataset_id=DATASET_ID):
+    url = f"https://api-open.data.gov.sg/v1/public/api/datasets/{dataset_id}/poll-download"
+    response = requests.get(url)
+    download_json = response.json()
 
-if download_json['code'] != 0:
-    print(download_json['errMsg'])
-    exit(1)
+    if download_json['code'] != 0:
+        raise RuntimeError(download_json['errMsg'])
 
-download_url = download_json['data']['url']
-response = requests.get(download_url)
+    return download_json['data']['url']
 
-# Step 2: Parse KML content
-kml_text = response.text
-ns = {
-    "kml": "http://www.opengis.net/kml/2.2"
-}
-root = ET.fromstring(kml_text)
-
-# Step 3: Convert to GeoJSON
-features = []
-
-for placemark in root.findall(".//kml:Placemark", ns):
-    # Extract attributes
-    props = {}
-    for simple_data in placemark.findall(".//kml:SimpleData", ns):
-        name = simple_data.attrib['name']
-        props[name] = simple_data.text
-
-    # Extract coordinates (LineString only)
-    coords_elem = placemark.find(".//kml:LineString/kml:coordinates", ns)
-    if coords_elem is None:
-        continue
-
-    raw_coords = coords_elem.text.strip().split()
-    line_coords = []
-    for coord in raw_coords:
-        lon, lat, *_ = map(float, coord.split(','))
-        line_coords.append([lon, lat])
-
-    feature = {
-        "type": "Feature",
-        "geometry": {
-            "type": "LineString",
-            "coordinates": line_coords
-        },
-        "properties": props
+
+# Step 2/3: Parse KML content and convert to GeoJSON
+def kml_to_geojson(kml_text):
+    root = ET.fromstring(kml_text)
+    features = []
+
+    for placemark in root.findall(".//kml:Placemark", KML_NS):
+        # Extract attributes
+        props = {}
+        for simple_data in placemark.findall(".//kml:SimpleData", KML_NS):
+            name = simple_data.attrib['name']
+            props[name] = simple_data.text
+
+        # Extract coordinates (LineString only)
+        coords_elem = placemark.find(".//kml:LineString/kml:coordinates", KML_NS)
+        if coords_elem is None:
+            continue
+
+        raw_coords = coords_elem.text.strip().split()
+        line_coords = []
+        for coord in raw_coords:
+            lon, lat, *_ = map(float, coord.split(','))
+            line_coords.append([lon, lat])
+
+        feature = {
+            "type": "Feature",
+            "geometry": {
+                "type": "LineString",
+                "coordinates": line_coords
+            },
+            "properties": props
+        }
+        features.append(feature)
+
+    return {
+        "type": "FeatureCollection",
+        "features": features
     }
-    features.append(feature)
 
-geojson = {
-    "type": "FeatureCollection",
-    "features": features
-}
 
-#%%
-# Output GeoJSON
-print(json.dumps(geojson, indent=2))
+def fetch_road_network(out_path=OUTPUT_GEOJSON, dataset_id=DATASET_ID, progress=None):
+    """Download the road network KML and write it as GeoJSON; returns the GeoJSON dict"""
+    if progress:
+        progress(0.1, "requesting download url")
+    download_url = get_download_url(dataset_id)
+    response = requests.get(download_url)
+    if progress:
+        progress(0.6, "parsing KML")
+    geojson = kml_to_geojson(response.text)
+
+    with open(out_path, "w") as f:
+        json.dump(geojson, f, indent=2)
+    if progress:
+        progress(1.0, f"{len(geojson['features'])} road features")
+    return geojson
+
 
-with open("road_network.geojson", "w") as f:
-    json.dump(geojson, f, indent=2)
+if __name__ == "__main__":
+    try:
+        geojson = fetch_road_network()
+    except RuntimeError as e:
+        print(e)
+        exit(1)
 
-# %%
+    # Output GeoJSON
+    print(json.dumps(geojson, indent=2))
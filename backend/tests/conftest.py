@@ -0,0 +1,15 @@
+# Backend tests import the app package from backend/. The Supabase client is created
+# at import time, so it gets a dummy endpoint that is never called; the job queue gets
+# a throwaway SQLite file.
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:1")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+os.environ.setdefault("JOBS_DB", os.path.join(tempfile.mkdtemp(prefix="jobs-"), "jobs.sqlite3"))
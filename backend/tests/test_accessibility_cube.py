@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "etl" / "roadnetwork"))
+cube_module = pytest.importorskip("accessibility_cube")
+compute_cube, METRICS = cube_module.compute_cube, cube_module.METRICS
+
+
+def metric(cube, name):
+    return cube[METRICS.index(name)]
+
+
+def test_cube_shape_and_counts():
+    origins = np.array([[0.0, 0.0], [500.0, 0.0]])
+    facilities = np.array([[100.0, 0.0], [400.0, 0.0], [450.0, 0.0]])
+    cube, _ = compute_cube(origins, facilities, np.array([0, 1, 1]), np.ones(3), 2)
+    assert cube.shape == (len(METRICS), 3, 2)          # categories + "all"
+    assert cube.dtype == np.float32
+    np.testing.assert_array_equal(metric(cube, "count")[:, 0], [1, 2, 3])
+    np.testing.assert_allclose(metric(cube, "nearest_m")[:, 1], [400, 50, 50])
+
+
+def test_2sfca_facility_without_demand_contributes_nothing():
+    origins = np.array([[0.0, 0.0], [10_000.0, 0.0]])
+    # category 1 are homes (demand): only the first origin has one within the cutoff,
+    # so the clinic next to the second origin has no demand in its catchment
+    facilities = np.array([[10.0, 0.0], [100.0, 0.0], [10_050.0, 0.0]])
+    cube, demand = compute_cube(origins, facilities, np.array([1, 0, 0]), np.array([1.0, 2.0, 5.0]), 2,
+                                demand_category=1)
+    np.testing.assert_array_equal(demand, [1, 0])
+    sfca = metric(cube, "2sfca")
+    assert sfca[0, 0] == pytest.approx(2.0)
+    assert sfca[0, 1] == 0
+    assert np.isfinite(sfca).all()
@@ -0,0 +1,59 @@
+import numpy as np
+from pyproj import Transformer
+from scipy.spatial import cKDTree
+
+from app.services.accessibility import ACCESS_CUTOFF_M, DEMAND_PER_ORIGIN, AccessibilityModel
+
+
+def small_model(seed=0):
+    """Model over a 400 m origin grid and 150 random facilities, without the store / hex files"""
+    rng = np.random.default_rng(seed)
+    gx, gy = np.meshgrid(np.arange(20000, 32000, 400.0), np.arange(30000, 40000, 400.0))
+    model = AccessibilityModel(origin_size=250)
+    model.origin_xy = np.column_stack([gx.ravel(), gy.ravel()])
+    model.origin_tree = cKDTree(model.origin_xy)
+    model.origin_lon, model.origin_lat = Transformer.from_crs(
+        "EPSG:3414", "EPSG:4326", always_xy=True).transform(gx.ravel(), gy.ravel())
+    model.demand = np.full(len(model.origin_xy), DEMAND_PER_ORIGIN)
+    model.categories = ["clinics", "schools", "unmapped"]
+    n = 150
+    fac_xy = np.column_stack([rng.uniform(19000, 33000, n), rng.uniform(29000, 41000, n)])
+    model._build(fac_xy, rng.integers(0, 3, n).astype(np.int16), rng.uniform(0, 5, n))
+    model.loaded = True
+    return model, rng
+
+
+def recompute(model):
+    """Hansen and 2SFCA from scratch over the model's current facilities"""
+    d = np.hypot(model.origin_xy[:, None, 0] - model.fac_xy[None, :, 0],
+                 model.origin_xy[:, None, 1] - model.fac_xy[None, :, 1])
+    inside = d <= ACCESS_CUTOFF_M
+    effective = np.where(model.open, model.weight, 0.0)
+    catchment = (inside * model.demand[:, None]).sum(axis=0)
+    by_category = np.eye(len(model.categories))[model.category]          # facilities x categories
+    hansen = (inside * model._decay(d) * effective) @ by_category
+    sfca = (inside * np.divide(effective, catchment, out=np.zeros_like(effective), where=catchment > 0)) @ by_category
+    return hansen, sfca
+
+
+def test_incremental_updates_match_a_full_recompute():
+    model, rng = small_model()
+    to_lonlat = Transformer.from_crs("EPSG:3414", "EPSG:4326", always_xy=True)
+
+    for _ in range(8):
+        n_fac = len(model.weight)
+        lon, lat = to_lonlat.transform(rng.uniform(20000, 32000), rng.uniform(30000, 40000))
+        closed = np.flatnonzero(~model.open)
+        model.apply(close=rng.choice(n_fac, 10, replace=False).tolist(),
+                    reopen=rng.choice(closed, min(len(closed), 5), replace=False).tolist(),
+                    reweight={int(j): float(rng.uniform(0, 5)) for j in rng.choice(n_fac, 5, replace=False)},
+                    add=[{"lon": lon, "lat": lat, "category": "schools", "weight": float(rng.uniform(0, 3))}])
+        hansen, sfca = recompute(model)
+        np.testing.assert_allclose(model.hansen, hansen, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(model.sfca, sfca, rtol=1e-9, atol=1e-12)
+
+    assert len(model.extra) == 8 and (~model.open).any()
+    model.reset()
+    hansen, sfca = recompute(model)
+    np.testing.assert_allclose(model.hansen, hansen, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(model.sfca, sfca, rtol=1e-9, atol=1e-12)
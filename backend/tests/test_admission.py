@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+import pytest
+
+import app.core.admission as admission
+from app.core.admission import TokenBuckets, classify
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("POST", "/auth/login", "auth"),
+    ("POST", "/db/tables/orders/query", "bulk_read"),
+    ("POST", "/tables/orders/query", "bulk_read"),
+    ("GET", "/db/tables/orders", "bulk_read"),
+    ("POST", "/db/tables/orders", "write"),
+    ("PATCH", "/db/tables/orders/5", "write"),
+    ("DELETE", "/tables/orders/5", "write"),
+    ("POST", "/accessibility/closures", "write"),
+    ("POST", "/jobs", "write"),
+    ("GET", "/geo/hexgrid/500", "geo"),
+    ("GET", "/accessibility/cube", "geo"),
+    ("GET", "/healthz", None),
+    ("GET", "/jobs/abc", None),
+])
+def test_classify(method, path, expected):
+    assert classify(method, path) == expected
+
+
+def test_token_buckets_burst_then_refill(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    buckets = TokenBuckets(rate=2.0, burst=3)
+
+    assert [buckets.take("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.take("a") == pytest.approx(0.5)
+    assert buckets.take("b") == 0.0          # keys are independent
+
+    now[0] += 0.5                            # one token back at 2 / s
+    assert buckets.take("a") == 0.0
+    assert buckets.take("a") > 0
+
+
+def test_token_buckets_drop_idle_keys(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    buckets = TokenBuckets(rate=1.0, burst=1)
+    buckets.take("old")
+    now[0] += admission.BUCKET_IDLE_S + 1
+    buckets.take("new")
+    assert set(buckets.buckets) == {"new"}
+
+
+def test_cancelled_waiter_hands_back_a_slot_it_was_given():
+    async def scenario():
+        gate = admission.AdmissionClass("geo", concurrency=1, queue=4, max_wait_ms=5000, rate=1000.0, burst=1000)
+        deadline = time.monotonic() + 5
+        await gate.acquire("a", deadline)
+        waiting = asyncio.ensure_future(gate.acquire("b", deadline))
+        await asyncio.sleep(0)
+        waiting.cancel()                     # "b" goes away ...
+        gate.release(0.01)                   # ... and is handed the slot before it resumes
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert (gate.in_service, len(gate.waiters)) == (0, 0)
+        assert await gate.acquire("c", deadline) == 0.0
+
+    asyncio.run(scenario())
@@ -0,0 +1,15 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def test_app_imports_and_serves_healthz():
+    paths = set(app.openapi()["paths"])
+    assert {"/healthz", "/geo/hexgrid/{size_m}", "/accessibility/cube/{origin_set}", "/jobs"} <= paths
+    assert TestClient(app).get("/healthz").json() == {"ok": True}
+
+
+def test_generic_db_router_is_not_mounted_and_rebuild_needs_a_token():
+    paths = set(app.openapi()["paths"])
+    assert not any(path.startswith("/db") for path in paths)
+    assert TestClient(app).post("/summary/orders/rebuild").status_code == 401
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import app.core.security as security
+from app.core.security import create_access_token
+from app.main import app
+
+
+class FakeUsers:
+    """Enough of the supabase query builder for get_current_user's app_users lookup"""
+
+    def __init__(self, row):
+        self.row = row
+
+    def table(self, name):
+        return self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return SimpleNamespace(data=self.row)
+
+
+def test_auth_routes_are_mounted():
+    paths = set(app.openapi()["paths"])
+    assert {"/auth/register", "/auth/login", "/auth/me", "/auth/users"} <= paths
+
+
+def test_me_requires_a_token():
+    assert TestClient(app).get("/auth/me").status_code == 401
+
+
+def test_issued_admin_token_opens_the_admin_routes(monkeypatch):
+    row = {"id": "u1", "username": "ops", "display_name": "Ops", "role": "admin"}
+    monkeypatch.setattr(security, "get_service_client", lambda: FakeUsers(row))
+    token = create_access_token("u1", extra={"username": "ops", "role": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+    client = TestClient(app)
+    assert client.get("/auth/me", headers=headers).json()["role"] == "admin"
+    assert client.get("/profiles", headers=headers).status_code == 200
+    assert client.get("/profiles").status_code == 403
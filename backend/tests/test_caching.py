@@ -0,0 +1,58 @@
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+import app.routers.geo as geo
+import app.routers.map as map_router
+from app.core.caching import TableVersions
+from app.main import app
+from app.services.hex_grid import HexGridStore
+
+client = TestClient(app)
+
+
+def revalidate(url, etag):
+    return client.get(url, headers={"If-None-Match": f'"other", {etag}'})
+
+
+def test_map_layer_answers_304_until_the_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(map_router, "ETL_OUTPUT_DIR", str(tmp_path))
+    path = tmp_path / "road_network.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": []}))
+
+    first = client.get("/map/road_network.geojson")
+    assert first.status_code == 200 and first.headers["etag"].startswith('W/"')
+    cached = revalidate("/map/road_network.geojson", first.headers["etag"])
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["etag"] == first.headers["etag"]
+
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [], "name": "rebuilt"}))
+    changed = revalidate("/map/road_network.geojson", first.headers["etag"])
+    assert changed.status_code == 200 and changed.headers["etag"] != first.headers["etag"]
+
+
+def test_hexgrid_etag_follows_the_level_files(tmp_path, monkeypatch):
+    (tmp_path / "meta.json").write_text(json.dumps(
+        {"resolutions": [{"size_m": 500, "file": "res_500.npz"}], "categories": ["clinics"]}))
+    level = tmp_path / "res_500.npz"
+    level.write_bytes(b"v1")
+    monkeypatch.setattr(geo, "hex_grid_store", HexGridStore(str(tmp_path)))
+
+    first = client.get("/geo/hexgrid")
+    assert first.status_code == 200 and "public" in first.headers["cache-control"]
+    assert revalidate("/geo/hexgrid", first.headers["etag"]).status_code == 304
+
+    level.write_bytes(b"v2, same meta.json")
+    stat = level.stat()
+    os.utime(level, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert revalidate("/geo/hexgrid", first.headers["etag"]).status_code == 200
+
+
+def test_table_etag_changes_on_write():
+    versions = TableVersions(window=0)
+    before = versions.etag("orders", "limit=10")
+    assert versions.etag("orders", "limit=10") == before
+    versions.bump("orders", "insert", {"id": 1})
+    assert versions.etag("orders", "limit=10") != before
+    assert versions.etag("status_logs") == TableVersions(window=0).etag("status_logs")
@@ -0,0 +1,66 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app.routers.geo as geo
+from app.main import app
+from app.services.clusters import MAX_ZOOM, MIN_ZOOM, ClusterIndex
+
+
+def write_store(path, x, y, importance, layers=("a", "b"), codes=None):
+    """Just the amenity store files ClusterIndex reads, in EPSG:3414 metres"""
+    os.makedirs(path, exist_ok=True)
+    codes = np.zeros(len(x), dtype=np.int16) if codes is None else np.asarray(codes, dtype=np.int16)
+    np.save(os.path.join(path, "layer.npy"), codes)
+    np.save(os.path.join(path, "x.npy"), np.asarray(x, dtype=np.float64))
+    np.save(os.path.join(path, "y.npy"), np.asarray(y, dtype=np.float64))
+    np.save(os.path.join(path, "importance.npy"), np.asarray(importance, dtype=np.float64))
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"crs": "EPSG:3414", "layers": list(layers), "count": len(x)}, f)
+
+
+def random_points(n, seed):
+    rng = np.random.default_rng(seed)
+    return 20000 + rng.uniform(0, 20000, n), 30000 + rng.uniform(0, 15000, n), rng.uniform(0, 5, n)
+
+
+def test_store_rebuilt_outside_the_runner_changes_the_etag(tmp_path, monkeypatch):
+    store = str(tmp_path / "store")
+    write_store(store, *random_points(50, 1))
+    monkeypatch.setattr(geo, "cluster_index", ClusterIndex(store, layers=[]))
+    client = TestClient(app)
+
+    first = client.get("/geo/clusters/a", params={"zoom": 17, "format": "arrays"})
+    assert first.status_code == 200 and len(first.json()["lon"]) == 50
+
+    write_store(store, *random_points(80, 2))          # e.g. the CLI rebuilt the store
+    stat = os.stat(os.path.join(store, "meta.json"))
+    os.utime(os.path.join(store, "meta.json"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    second = client.get("/geo/clusters/a", params={"zoom": 17, "format": "arrays"},
+                        headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert len(second.json()["lon"]) == 80
+
+
+def test_counts_and_importance_are_conserved_at_every_zoom(tmp_path):
+    x, y, importance = random_points(300, 3)
+    write_store(str(tmp_path), x, y, importance, codes=np.arange(300) % 2)
+    clusters = ClusterIndex(str(tmp_path), layers=[]).layer("b")
+    points = clusters.levels[MAX_ZOOM + 1]
+    assert len(points["lon"]) == 150
+
+    previous = None
+    for zoom in range(MIN_ZOOM, MAX_ZOOM + 2):
+        level = clusters.query(zoom)
+        assert level["count"].sum() == 150
+        assert level["importance"].sum() == pytest.approx(importance[1::2].sum())
+        lone = level["count"] == 1
+        assert set(level["point"][lone]) <= set(points["point"]) and (level["point"][~lone] == -1).all()
+        if previous is not None:
+            assert len(level["lon"]) >= previous          # clusters only split as you zoom in
+        previous = len(level["lon"])
+    assert previous == 150
@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import pytest
+
+import app.db.database as database
+from app.db.database import QueryValidationError, apply_filters, parse_order_by
+from app.db.schema import SchemaRegistry
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """Column checks run against the repo's dump.sql, with no Supabase client"""
+    monkeypatch.setattr(database, "schema_registry", SchemaRegistry(dump_path=str(BACKEND / "dump.sql")))
+
+
+class RecordingQuery:
+    """Stands in for a postgrest builder: records every call, returns itself"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args):
+            self.calls.append((name, *args))
+            return self
+        return call
+
+    @property
+    def not_(self):
+        self.calls.append(("not_",))
+        return self
+
+
+def test_parse_order_by_forms():
+    assert parse_order_by("orders", "created_at,-status") == [("created_at", False), ("status", True)]
+    assert parse_order_by("orders", ["status:desc", "plate:asc"]) == [("status", True), ("plate", False)]
+    assert parse_order_by("orders", "timestamps->>dispatched") == [("timestamps->>dispatched", False)]
+    assert parse_order_by("orders", None) == []
+
+
+@pytest.mark.parametrize("order_by", ["nope", "status:sideways", "plate->>x", "created_at;drop"])
+def test_parse_order_by_rejects(order_by):
+    with pytest.raises(QueryValidationError):
+        parse_order_by("orders", order_by)
+
+
+def test_apply_filters_operators():
+    q = apply_filters(RecordingQuery(), "orders", {
+        "status": ["pending", "dispatched"],
+        "plate": "B 1234",
+        "created_at": {"range": ["2025-01-01", None]},
+        "workshop_id": {"is": None},
+        "location->>addr": {"ilike": "%sudirman%"},
+    })
+    assert q.calls == [
+        ("in_", "status", ["pending", "dispatched"]),
+        ("eq", "plate", "B 1234"),
+        ("gte", "created_at", "2025-01-01"),
+        ("is_", "workshop_id", "null"),
+        ("ilike", "location->>addr", "%sudirman%"),
+    ]
+
+
+def test_apply_filters_not_null():
+    q = apply_filters(RecordingQuery(), "orders", {"assigned_agent": {"not_null": True}})
+    assert q.calls == [("not_",), ("is_", "assigned_agent", "null")]
+
+
+@pytest.mark.parametrize("filters", [
+    {"status": {"between": [1, 2]}},
+    {"status": {"in": "pending"}},
+    {"status": {"is": "maybe"}},
+    {"created_at": {"range": ["2025-01-01"]}},
+    {"unknown_column": 1},
+])
+def test_apply_filters_rejects(filters):
+    with pytest.raises(QueryValidationError):
+        apply_filters(RecordingQuery(), "orders", filters)
@@ -0,0 +1,51 @@
+import os
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+import app.services.etl_tasks as etl_tasks
+from app.core.config import ETL_OUTPUT_DIR, ETL_ROOT, JWT_ALG, JWT_SECRET
+from app.main import app
+from app.services.etl_tasks import check_params
+
+
+def admin_headers(role="admin"):
+    return {"Authorization": "Bearer " + jwt.encode({"sub": "u1", "role": role}, JWT_SECRET, algorithm=JWT_ALG)}
+
+
+def test_check_params_resolves_paths_inside_the_etl_trees():
+    params = check_params("flood_exposure", {"output": "exposure.parquet", "store": os.path.join(ETL_ROOT, "x")})
+    assert params["output"] == os.path.join(os.path.realpath(ETL_OUTPUT_DIR), "exposure.parquet")
+    assert params["store"] == os.path.join(os.path.realpath(ETL_ROOT), "x")
+    assert check_params("build_postal_index", {"csv": ["a.csv"]})["csv"] == [
+        os.path.join(os.path.realpath(ETL_OUTPUT_DIR), "a.csv")]
+
+
+@pytest.mark.parametrize("params", [
+    {"out": "/etc/passwd"},
+    {"output": "../../../../../../tmp/x"},
+    {"csv": ["ok.csv", "/root/.ssh/authorized_keys"]},
+    {"source": 5},
+])
+def test_check_params_rejects_paths_outside(params):
+    with pytest.raises(ValueError):
+        check_params("fetch_road_network", params)
+
+
+def test_delta_sync_tables_are_allow_listed(monkeypatch):
+    monkeypatch.setattr(etl_tasks, "DELTA_SYNC_TABLES", ["postal_codes"])
+    assert check_params("delta_sync", {"table": "postal_codes"})["table"] == "postal_codes"
+    with pytest.raises(ValueError):
+        check_params("delta_sync", {"table": "app_users"})
+
+
+def test_jobs_require_admin():
+    client = TestClient(app)
+    body = {"task": "fetch_road_network", "params": {"out": "/tmp/anything"}}
+    assert client.post("/jobs", json=body).status_code == 403
+    assert client.post("/jobs", json=body, headers=admin_headers("agent")).status_code == 403
+    assert client.get("/jobs/tasks").status_code == 403
+    response = client.post("/jobs", json=body, headers=admin_headers())
+    assert response.status_code == 400
+    assert "ETL directories" in response.json()["detail"]
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+# the road network scripts import each other (and etl_paths) from their own directory
+ROADNETWORK = Path(__file__).resolve().parents[1] / "etl" / "roadnetwork"
+if str(ROADNETWORK) not in sys.path:
+    sys.path.insert(0, str(ROADNETWORK))
+
+import flood_reachability  # noqa: E402
+from flood_reachability import FloodReachability, RoadGraph  # noqa: E402
+from road_index import RoadSegmentIndex  # noqa: E402
+from scipy.sparse.csgraph import dijkstra  # noqa: E402
+
+
+def lattice(n=12, seed=0):
+    """n x n street grid with jittered junctions, one segment per block side"""
+    rng = np.random.default_rng(seed)
+    xy = np.stack(np.meshgrid(np.arange(n) * 100.0, np.arange(n) * 100.0), axis=-1) + rng.uniform(-20, 20, (n, n, 2))
+    lines = [shapely.linestrings([xy[i, j], xy[i, j + 1]]) for i in range(n) for j in range(n - 1)]
+    lines += [shapely.linestrings([xy[i, j], xy[i + 1, j]]) for i in range(n - 1) for j in range(n)]
+    return RoadGraph(RoadSegmentIndex(lines)), xy.reshape(-1, 2)
+
+
+def fresh_distances(model):
+    ok = model.source_node >= 0
+    return dijkstra(model.graph.matrix(), directed=False, indices=model.source_node[ok])
+
+
+@pytest.mark.parametrize("repair_fraction", [1.0, 0.0])   # always repair in Python / always re-run
+def test_close_and_reopen_match_a_fresh_dijkstra(monkeypatch, repair_fraction):
+    monkeypatch.setattr(flood_reachability, "REPAIR_FRACTION", repair_fraction)
+    graph, junctions = lattice()
+    rng = np.random.default_rng(1)
+    sources = junctions[rng.choice(len(junctions), 6, replace=False)]
+    targets = junctions[rng.choice(len(junctions), 20, replace=False)] + 3.0
+    model = FloodReachability(graph, sources, np.arange(6).astype(str), targets, pd.DataFrame(index=range(20)))
+
+    closed = np.array([], dtype=np.int64)
+    for _ in range(6):
+        batch = rng.choice(len(graph.edge_len), 25, replace=False)
+        model.close_edges(batch)
+        closed = np.union1d(closed, batch)
+        np.testing.assert_allclose(model.dist, fresh_distances(model))
+
+        reopen = rng.choice(closed, 10, replace=False)
+        model.reopen_edges(reopen)
+        closed = np.setdiff1d(closed, reopen)
+        np.testing.assert_allclose(model.dist, fresh_distances(model))
+
+    assert not graph.open[closed].any()
+    assert model.stats["repaired_nodes" if repair_fraction else "full_reruns"] > 0
+    assert np.isinf(model.dist).any()        # the floods did cut some junctions off
+    model.reopen_edges(closed)
+    np.testing.assert_allclose(model.target_distances(), model.base)
@@ -0,0 +1,87 @@
+import threading
+import time
+
+from app.services.jobs import FAILED, FINISHED, RUNNING, SKIPPED, SUCCEEDED, JobRunner, JobStore
+
+
+def wait_until_finished(runner, job_ids, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        statuses = runner.store.statuses(list(job_ids))
+        if all(s in FINISHED for s in statuses.values()):
+            return statuses
+        time.sleep(0.02)
+    raise AssertionError(f"jobs still running: {runner.store.statuses(list(job_ids))}")
+
+
+def recording_tasks(log, fail=()):
+    lock = threading.Lock()
+
+    def task(params, progress):
+        with lock:
+            log.append(("start", params["name"]))
+        time.sleep(0.05)
+        if params["name"] in fail:
+            raise RuntimeError(f"{params['name']} failed")
+        with lock:
+            log.append(("end", params["name"]))
+        return {"name": params["name"]}
+
+    return {"step": task}
+
+
+def stage(key, after=()):
+    return {"key": key, "task": "step", "params": {"name": key}, "after": list(after)}
+
+
+def test_pipeline_runs_in_dependency_order(tmp_path):
+    log = []
+    runner = JobRunner(JobStore(str(tmp_path / "jobs.sqlite3")), recording_tasks(log), workers=2)
+    runner.start()
+    try:
+        # listed out of order on purpose; d waits for both b and c, which may run side by side
+        jobs = runner.submit_pipeline([stage("d", ["b", "c"]), stage("b", ["a"]), stage("c", ["a"]), stage("a")])["jobs"]
+        statuses = wait_until_finished(runner, jobs.values())
+    finally:
+        runner.stop()
+
+    assert set(statuses.values()) == {SUCCEEDED}
+    at = {event: i for i, event in enumerate(log)}
+    assert at[("end", "a")] < min(at[("start", "b")], at[("start", "c")])
+    assert max(at[("end", "b")], at[("end", "c")]) < at[("start", "d")]
+
+
+def test_failed_stage_skips_its_dependents_only(tmp_path):
+    log = []
+    runner = JobRunner(JobStore(str(tmp_path / "jobs.sqlite3")), recording_tasks(log, fail={"a"}), workers=2)
+    runner.start()
+    try:
+        jobs = runner.submit_pipeline([stage("a"), stage("b", ["a"]), stage("c", ["b"]), stage("x")])["jobs"]
+        statuses = wait_until_finished(runner, jobs.values())
+    finally:
+        runner.stop()
+
+    assert {key: statuses[job_id] for key, job_id in jobs.items()} == {
+        "a": FAILED, "b": SKIPPED, "c": SKIPPED, "x": SUCCEEDED}
+    assert "a failed" in runner.store.get(jobs["a"])["error"]
+    assert ("start", "b") not in log and ("start", "c") not in log
+
+
+def test_jobs_left_running_are_requeued_on_start(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    crashed = JobStore(path)
+    job_id = crashed.insert("step", {"name": "a"}, [])
+    crashed.update(job_id, status=RUNNING)       # the process died mid-job
+
+    log = []
+    runner = JobRunner(None, recording_tasks(log), workers=1, store_path=path)
+    runner.start()
+    try:
+        statuses = wait_until_finished(runner, [job_id])
+    finally:
+        runner.stop()
+
+    assert statuses[job_id] == SUCCEEDED
+    job = runner.store.get(job_id)
+    assert job["message"] == "requeued after restart" and job["result"] == {"name": "a"}
+    assert log == [("start", "a"), ("end", "a")]
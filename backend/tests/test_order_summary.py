@@ -0,0 +1,40 @@
+import random
+
+from app.services.order_summary import OrderSummary
+
+STATUSES = ["pending", "dispatched", "onsite", "completed", "cancelled"]
+
+
+def comparable(summary):
+    snap = summary.snapshot()
+    snap.pop("built_at")
+    return snap
+
+
+def test_write_listener_updates_match_a_rebuild():
+    rng = random.Random(7)
+    orders, logs = {}, []
+    live = OrderSummary()
+    live.build_from_rows([], [])
+
+    for step in range(400):
+        roll = rng.random()
+        if roll < 0.35 or not orders:
+            row = {"id": rng.randint(1, 40), "status": rng.choice(STATUSES),
+                   "assigned_agent": rng.choice(["a1", "a2", None]), "workshop_id": rng.choice([1, 2, 3])}
+            orders[row["id"]] = row
+            live.apply_write("orders", "update" if roll < 0.2 else "insert", dict(row))
+        elif roll < 0.4:
+            order_id = rng.choice(sorted(orders))
+            live.apply_write("orders", "delete", orders.pop(order_id))
+        else:
+            order_id = rng.choice(sorted(orders))
+            log = {"order_id": order_id, "at": f"2024-01-01T00:{step // 60:02d}:{step % 60:02d}+00:00",
+                   "action": "status", "to": rng.choice(STATUSES)}
+            logs.append(log)
+            live.apply_write("status_logs", "insert", dict(log))
+
+    rebuilt = OrderSummary()
+    rebuilt.build_from_rows(list(orders.values()), logs)
+    assert comparable(live) == comparable(rebuilt)
+    assert comparable(live)["time_in_status"]
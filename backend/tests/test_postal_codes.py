@@ -0,0 +1,15 @@
+from app.services.postal_codes import PostalCodeService, PostalIndex
+
+
+def test_invalidate_leaves_in_flight_lookups_working(tmp_path):
+    path = tmp_path / "postal.sqlite3"
+    writer = PostalIndex(path, writable=True)
+    writer.upsert([("018956", 103.85, 1.28, "DOWNTOWN CORE", None, None)], "flood")
+    service = PostalCodeService(str(path))
+
+    in_flight = service.index                # a request that already picked up the index
+    service.invalidate()                     # e.g. the postal index job finished
+    assert in_flight.lookup("018956")["planning_area"] == "DOWNTOWN CORE"
+    assert service.index is not in_flight
+    assert service.lookup("018956")["lon"] == 103.85
+    writer.close()
@@ -0,0 +1,70 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+
+import app.core.responses as responses
+from app.core.responses import ARROW_TYPE, JSON_TYPE, MSGPACK_TYPE, dump_arrow, negotiate_encoding, negotiate_media_type
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0.5, br;q=0.4", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "br"),
+    ("*;q=0, gzip", "gzip"),
+    ("identity", None),
+    (None, None),
+])
+def test_negotiate_encoding(monkeypatch, header, expected):
+    monkeypatch.setattr(responses, "brotli", object())
+    assert negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    assert negotiate_encoding("br, gzip") == "gzip"
+    assert negotiate_encoding("br") is None
+
+
+def test_negotiate_encoding_restricted():
+    assert negotiate_encoding("br, gzip;q=0.1", supported=("gzip",)) == "gzip"
+
+
+def test_negotiate_media_type():
+    assert negotiate_media_type(None) == JSON_TYPE
+    assert negotiate_media_type("text/html") == JSON_TYPE
+    assert negotiate_media_type("application/msgpack;q=0, application/json") == JSON_TYPE
+    assert negotiate_media_type("application/json;q=0.5, application/vnd.apache.arrow.stream") == ARROW_TYPE
+    if responses.msgpack is not None:
+        assert negotiate_media_type("application/x-msgpack") == MSGPACK_TYPE
+
+
+def read_stream(body):
+    return pa.ipc.open_stream(body).read_all()
+
+
+def test_dump_arrow_rows():
+    table = read_stream(dump_arrow({"table": "orders", "data": [{"id": 1}, {"id": 2}], "count": 2}))
+    assert table.column("id").to_pylist() == [1, 2]
+    assert set(table.schema.metadata) == {b"table", b"count"}
+
+
+def test_dump_arrow_columns():
+    payload = {
+        "size_m": 500,
+        "lon": np.array([103.8, 103.9]),
+        "count": np.array([3, 4]),
+        "polygons": np.arange(24, dtype=np.float32).reshape(2, 6, 2),
+    }
+    table = read_stream(dump_arrow(payload))
+    assert table.num_rows == 2
+    assert table.column_names == ["lon", "count", "polygons"]
+    assert table.column("polygons").to_pylist()[1][0] == [12.0, 13.0]
+    assert table.schema.metadata == {b"size_m": b"500"}
+
+
+def test_dump_arrow_mixed_lengths_is_not_columnar():
+    table = read_stream(dump_arrow({"a": np.arange(2), "b": np.arange(3)}))
+    assert table.num_rows == 0
+    assert set(table.schema.metadata) == {b"a", b"b"}
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from app.db.schema import parse_dump
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+DUMP = """
+CREATE TABLE IF NOT EXISTS public."readings" (
+    "id" bigint NOT NULL,
+    value double precision,
+    code character varying(20) DEFAULT 'x'::character varying,
+    amount numeric(10,2) NOT NULL,
+    taken_at timestamp with time zone DEFAULT now() NOT NULL,
+    local_at timestamp(3) without time zone,
+    tags text[],
+    device uuid PRIMARY KEY,
+    payload jsonb,
+    sensor integer REFERENCES public.sensors(id),
+    CONSTRAINT readings_code_key UNIQUE (code)
+);
+"""
+
+
+def test_parse_dump_keeps_multi_word_types():
+    columns = parse_dump(DUMP)["readings"]["columns"]
+    assert columns == {
+        "id": "bigint",
+        "value": "double precision",
+        "code": "character varying",
+        "amount": "numeric",
+        "taken_at": "timestamp with time zone",
+        "local_at": "timestamp without time zone",
+        "tags": "text[]",
+        "device": "uuid",
+        "payload": "jsonb",
+        "sensor": "integer",
+    }
+
+
+def test_parse_dump_primary_key():
+    assert parse_dump(DUMP)["readings"]["primary_key"] == "device"
+
+
+def test_parse_dump_repo_schema():
+    tables = parse_dump((BACKEND / "dump.sql").read_text(encoding="utf-8"))
+    assert set(tables) == {"app_users", "workshops", "orders", "status_logs"}
+    orders = tables["orders"]
+    assert orders["primary_key"] == "id"
+    assert orders["columns"]["created_at"] == "timestamptz"
+    assert orders["columns"]["timestamps"] == "jsonb"
@@ -1,11 +1,94 @@
 import requests
 import json
 import pathlib
+import sys
 import time
 import re
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shapely
+from pyproj import CRS
+from shapely.geometry import shape
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from artifacts import GEOPARQUET_VERSION, ROW_GROUP_SIZE
+
 # Where to save the combined GeoJSON
-out_file = pathlib.Path("all_amenities.geojson")
+OUT_FILE = pathlib.Path("all_amenities.geojson")
+
+# The webmap ID from ArcGIS
+WEBMAP_ID = "4f6350005bce4b02835430ba7b64a0ac"
+
+# Streamed GeoParquet layout: layer_type, one typed column per attribute field of any
+# layer (the union of the layers' field lists), WKB geometry and a bbox covering column
+GEO_METADATA = {
+    "version": GEOPARQUET_VERSION,
+    "primary_column": "geometry",
+    "columns": {"geometry": {
+        "encoding": "WKB",
+        "geometry_types": [],
+        "crs": CRS.from_epsg(4326).to_json_dict(),
+        "covering": {"bbox": {k: ["bbox", k] for k in ("xmin", "ymin", "xmax", "ymax")}},
+    }},
+}
+ESRI_TYPES = {
+    "esriFieldTypeOID": pa.int64(),
+    "esriFieldTypeSmallInteger": pa.int64(),
+    "esriFieldTypeInteger": pa.int64(),
+    "esriFieldTypeBigInteger": pa.int64(),
+    "esriFieldTypeSingle": pa.float64(),
+    "esriFieldTypeDouble": pa.float64(),
+    "esriFieldTypeDate": pa.timestamp("ms", tz="UTC"),  # GeoJSON output carries epoch milliseconds
+}
+RESERVED_COLUMNS = ("layer_type", "geometry", "bbox")
+
+
+def parquet_schema(fields=()):
+    """Fixed schema over (name, esri type) pairs from every layer.
+
+    A field shared by layers with different types becomes float64 when both are
+    numeric and string otherwise; unknown esri types are stored as strings.
+    """
+    types = {}
+    for name, esri_type in fields:
+        if name in RESERVED_COLUMNS:
+            continue
+        t = ESRI_TYPES.get(esri_type, pa.string())
+        prev = types.get(name)
+        if prev is None or prev == t:
+            types[name] = t
+        elif all(pa.types.is_integer(x) or pa.types.is_floating(x) for x in (prev, t)):
+            types[name] = pa.float64()
+        else:
+            types[name] = pa.string()
+    return pa.schema([
+        ("layer_type", pa.string()),
+        *types.items(),
+        ("geometry", pa.binary()),
+        ("bbox", pa.struct([(k, pa.float64()) for k in ("xmin", "ymin", "xmax", "ymax")])),
+    ], metadata={b"geo": json.dumps(GEO_METADATA).encode("utf-8")})
+
+
+PARQUET_SCHEMA = parquet_schema()
+
+
+def to_column(values, type_):
+    """Arrow array of one attribute; values that do not fit the column type become null"""
+    if pa.types.is_string(type_):
+        values = [v if v is None or isinstance(v, str) else
+                  json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else str(v) for v in values]
+    try:
+        return pa.array(values, type_)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        def fits(v):
+            try:
+                pa.array([v], type_)
+                return True
+            except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+                return False
+        return pa.array([v if fits(v) else None for v in values], type_)
 
 # Clean title to be used in layer_type
 def safe_layer_name(name):
@@ -13,9 +96,6 @@ def safe_layer_name(name):
     name = re.sub(r"[^\w\-_]", "", name)
     return name
 
-# The webmap ID from ArcGIS
-webmap_id = "4f6350005bce4b02835430ba7b64a0ac"
-
 # Helper for GET requests
 def get(url, params=None):
     params = params or {}
@@ -24,25 +104,31 @@ def get(url, params=None):
     r.raise_for_status()
     return r.json()
 
-# Step 1: Load webmap data
-item_data_url = f"https://www.arcgis.com/sharing/rest/content/items/{webmap_id}/data"
-webmap = get(item_data_url)
-
-# Step 2: Extract all operational layer URLs
-layers = []
-for layer in webmap.get("operationalLayers", []):
-    if "url" in layer:
-        layers.append({
-            "title": safe_layer_name(layer.get("title", "layer")),
-            "url": layer["url"].rstrip("/")
-        })
+# Step 1/2: Load webmap data and extract all operational layer URLs
+def list_layers(webmap_id=WEBMAP_ID):
+    item_data_url = f"https://www.arcgis.com/sharing/rest/content/items/{webmap_id}/data"
+    webmap = get(item_data_url)
 
-print(f"✅ Found {len(layers)} layers")
+    layers = []
+    for layer in webmap.get("operationalLayers", []):
+        if "url" in layer:
+            layers.append({
+                "title": safe_layer_name(layer.get("title", "layer")),
+                "url": layer["url"].rstrip("/")
+            })
+    return layers
+
+# Helper: layer metadata needed for paging
+def get_layer_meta(layer_url):
+    meta = get(layer_url)
+    oid_field = meta.get("objectIdField") or next(
+        (f["name"] for f in meta.get("fields", []) if f.get("type") == "esriFieldTypeOID"), None)
+    return {"max_count": meta.get("maxRecordCount", 1000), "oid_field": oid_field,
+            "fields": [(f["name"], f.get("type")) for f in meta.get("fields") or []]}
 
 # Helper: get max record count per layer
 def get_max_record_count(layer_url):
-    meta = get(layer_url)
-    return meta.get("maxRecordCount", 1000)
+    return get_layer_meta(layer_url)["max_count"]
 
 # Helper: list sublayer indices
 def list_sublayers(service_url):
@@ -53,67 +139,195 @@ def list_sublayers(service_url):
         return [service_url.rstrip("/").split("/")[-1]]
     return []
 
-# Query and collect features with `layer_type` added
-def fetch_features(layer_url, layer_type):
+# Helper: one geojson query page
+def query_geojson(layer_url, params):
+    params = {"outFields": "*", "returnGeometry": "true", "outSR": 4326, **params, "f": "geojson"}
+    r = requests.get(layer_url + "/query", params=params, timeout=60)
+    r.raise_for_status()
+    return r.json().get("features", [])
+
+# Helper: every object id of a layer, sorted (not subject to maxRecordCount)
+def fetch_object_ids(layer_url):
+    try:
+        data = get(layer_url + "/query", {"where": "1=1", "returnIdsOnly": "true"})
+    except (requests.RequestException, ValueError):
+        return None, None
+    ids = data.get("objectIds")
+    if ids is None or "error" in data:
+        return None, None
+    return data.get("objectIdFieldName"), sorted(ids)
+
+# Query features in batches with `layer_type` added.
+#
+# Pages are object id ranges (OID >= lo AND OID <= hi over the sorted id list), which
+# the server answers from its primary key index, so page 500 costs the same as page 1;
+# resultOffset made the server skip everything before the offset on every request.
+# Layers that refuse returnIdsOnly fall back to keyset paging (OID > last, ordered by OID).
+def iter_features(layer_url, layer_type, meta=None):
     print(f"    → Fetching from: {layer_url}")
-    features = []
-    max_count = get_max_record_count(layer_url)
-
-    # Get total count
-    count = get(layer_url + "/query", {
-        "where": "1=1",
-        "returnCountOnly": "true"
-    }).get("count", 0)
-
-    offset = 0
-    while offset < count:
-        print(f"      🌀 {offset} / {count}")
-        params = {
-            "where": "1=1",
-            "outFields": "*",
-            "returnGeometry": "true",
-            "resultOffset": offset,
-            "resultRecordCount": max_count,
-            "f": "geojson"
-        }
-        r = requests.get(layer_url + "/query", params=params, timeout=60)
-        r.raise_for_status()
-        data = r.json()
-        feats = data.get("features", [])
-
-        # Inject layer_type into properties
+    meta = meta or get_layer_meta(layer_url)
+    max_count = meta["max_count"]
+    oid_field, ids = fetch_object_ids(layer_url)
+    oid_field = oid_field or meta["oid_field"]
+
+    def tag(feats):
         for feat in feats:
+            feat["properties"] = feat.get("properties") or {}
             feat["properties"]["layer_type"] = layer_type
+        return feats
 
-        features += feats
+    if ids is not None and oid_field:
+        for i in range(0, len(ids), max_count):
+            chunk = ids[i:i + max_count]
+            print(f"      🌀 {i} / {len(ids)}")
+            yield tag(query_geojson(layer_url, {
+                "where": f"{oid_field} >= {chunk[0]} AND {oid_field} <= {chunk[-1]}",
+                "resultRecordCount": max_count,
+            }))
+            time.sleep(0.2)
+        return
+
+    if not oid_field:
+        # no usable key: a single page is all we can get reliably
+        print("      ⚠️ no object id field, fetching one page")
+        yield tag(query_geojson(layer_url, {"where": "1=1", "resultRecordCount": max_count}))
+        return
+
+    last, fetched = None, 0
+    while True:
+        print(f"      🌀 {fetched} (keyset)")
+        feats = query_geojson(layer_url, {
+            "where": "1=1" if last is None else f"{oid_field} > {last}",
+            "orderByFields": f"{oid_field} ASC",
+            "resultRecordCount": max_count,
+        })
+        if not feats:
+            break
+        fetched += len(feats)
+        last = max(f.get("id", f["properties"].get(oid_field)) for f in feats)
+        yield tag(feats)
         if len(feats) < max_count:
             break
-        offset += max_count
         time.sleep(0.2)
 
-    return features
-
-# Step 3: Loop and combine features
-all_features = []
-
-for layer in layers:
-    print(f"\n🔍 {layer['title']}")
-    if layer["url"].endswith(("FeatureServer", "MapServer")):
-        sublayers = list_sublayers(layer["url"])
-        for sub_id in sublayers:
-            full_url = f"{layer['url']}/{sub_id}"
-            feats = fetch_features(full_url, layer["title"])
-            all_features.extend(feats)
-    else:
-        feats = fetch_features(layer["url"], layer["title"])
-        all_features.extend(feats)
-
-# Step 4: Write to one big GeoJSON file
-print(f"\n📦 Total features collected: {len(all_features)}")
-geojson = {
-    "type": "FeatureCollection",
-    "features": all_features
-}
-with open(out_file, "w", encoding="utf-8") as f:
-    json.dump(geojson, f, ensure_ascii=False)
-print(f"✅ Saved to {out_file.resolve()}")
+# Query and collect features with `layer_type` added (small layers / interactive use)
+def fetch_features(layer_url, layer_type):
+    return [feat for batch in iter_features(layer_url, layer_type) for feat in batch]
+
+
+class FeatureWriter:
+    """Streams feature batches to disk as they arrive.
+
+    The GeoJSON output (.geojson: one FeatureCollection, .ndjson/.geojsonl: one
+    feature per line) is written incrementally, and a GeoParquet copy is written
+    row group by row group (layer_type, typed attribute columns, WKB geometry, bbox),
+    so memory stays bounded by one row group no matter how many features come in.
+    Both files are written under a .part name and only renamed into place when the
+    writer closes without an exception, so a failed fetch never leaves a truncated
+    file where readers expect a complete one.
+    """
+
+    def __init__(self, out_file, fields=(), row_group_size=ROW_GROUP_SIZE):
+        self.out_file = pathlib.Path(out_file)
+        self.out_file.parent.mkdir(parents=True, exist_ok=True)
+        self.parquet_file = self.out_file.with_suffix(".parquet")
+        self.sequence = self.out_file.suffix in (".ndjson", ".geojsonl", ".jsonl")
+        self.row_group_size = row_group_size
+        self.schema = parquet_schema(fields)
+        self.text = open(self._part(self.out_file), "w", encoding="utf-8")
+        if not self.sequence:
+            self.text.write('{"type": "FeatureCollection", "features": [\n')
+        self.parquet = pq.ParquetWriter(self._part(self.parquet_file), self.schema, compression="zstd")
+        self.pending = []
+        self.count = 0
+
+    @staticmethod
+    def _part(path):
+        return path.with_name(path.name + ".part")
+
+    def write(self, feats):
+        for feat in feats:
+            line = json.dumps(feat, ensure_ascii=False)
+            if self.sequence:
+                self.text.write(line + "\n")
+            else:
+                self.text.write(("" if self.count == 0 else ",\n") + line)
+            self.count += 1
+        self.pending.extend(feats)
+        if len(self.pending) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        geoms = [shape(f["geometry"]) if f.get("geometry") else None for f in self.pending]
+        bounds = shapely.bounds(np.array(geoms, dtype=object))
+        missing = np.isnan(bounds[:, 0])
+        bbox = pa.StructArray.from_arrays(
+            [pa.array(bounds[:, k], mask=missing) for k in range(4)], names=["xmin", "ymin", "xmax", "ymax"])
+        columns = [to_column([f["properties"].get(field.name) for f in self.pending], field.type)
+                   for field in self.schema if field.name not in ("geometry", "bbox")]
+        batch = pa.record_batch([
+            *columns,
+            pa.array([shapely.to_wkb(g) if g is not None else None for g in geoms], pa.binary()),
+            bbox,
+        ], schema=self.schema)
+        self.parquet.write_batch(batch)
+        self.pending = []
+
+    def close(self, commit=True):
+        try:
+            if commit:
+                self._flush()
+                if not self.sequence:
+                    self.text.write("\n]}\n")
+        finally:
+            self.parquet.close()
+            self.text.close()
+        for path in (self.out_file, self.parquet_file):
+            if commit:
+                self._part(path).replace(path)
+            else:
+                self._part(path).unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+
+# Step 3/4: Loop over layers, streaming each batch to GeoJSON + GeoParquet
+def fetch_all_amenities(webmap_id=WEBMAP_ID, out_file=OUT_FILE, progress=None):
+    out_file = pathlib.Path(out_file)
+    layers = list_layers(webmap_id)
+    print(f"✅ Found {len(layers)} layers")
+
+    # every layer's field list first, so the parquet schema is fixed before the first row group
+    sources = []
+    for layer in layers:
+        if layer["url"].endswith(("FeatureServer", "MapServer")):
+            urls = [f"{layer['url']}/{sub_id}" for sub_id in list_sublayers(layer["url"])]
+        else:
+            urls = [layer["url"]]
+        sources.append((layer, [(url, get_layer_meta(url)) for url in urls]))
+    fields = [field for _, metas in sources for _, meta in metas for field in meta["fields"]]
+
+    with FeatureWriter(out_file, fields) as writer:
+        for i, (layer, metas) in enumerate(sources):
+            print(f"\n🔍 {layer['title']}")
+            if progress:
+                progress(i / max(len(layers), 1), layer["title"])
+            for url, meta in metas:
+                for batch in iter_features(url, layer["title"], meta):
+                    writer.write(batch)
+
+    print(f"\n📦 Total features collected: {writer.count}")
+    print(f"✅ Saved to {out_file.resolve()} (+ {out_file.with_suffix('.parquet').name})")
+    if progress:
+        progress(1.0, f"{writer.count} features")
+    return out_file
+
+
+if __name__ == "__main__":
+    fetch_all_amenities()
@@ -0,0 +1,218 @@
+# Shared ETL artifact writer / reader
+#
+# Artifacts are stored as GeoParquet (WKB geometry + bbox covering column, typed
+# columns, zstd, row-group statistics) or as uncompressed Arrow IPC files that can be
+# memory-mapped with zero copies. CSV / GeoJSON exporters are kept for interoperability.
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+try:
+    import geopandas as gpd
+except ImportError:  # plain tabular artifacts do not need geopandas
+    gpd = None
+
+PARQUET_SUFFIXES = {".parquet", ".geoparquet"}
+ARROW_SUFFIXES = {".arrow", ".feather", ".ipc"}
+
+ROW_GROUP_SIZE = 50_000
+# object columns with fewer distinct values than this fraction of rows become dictionary-encoded
+CATEGORICAL_RATIO = 0.05
+GEOPARQUET_VERSION = "1.1.0"
+# never stored as float32, whatever the caller asks for
+COORDINATE_COLUMNS = {"lat", "lon", "latitude", "longitude", "x", "y", "X", "Y"}
+
+
+def _is_geo(df):
+    return gpd is not None and isinstance(df, gpd.GeoDataFrame)
+
+
+def _typed_columns(df: pd.DataFrame, keep_as_string=(), float32=()):
+    """Downcast integers and dictionary-encode low-cardinality strings.
+
+    Integer downcasts are lossless; floats stay float64 so artifacts round-trip
+    exactly, unless a column is named in float32 (never a coordinate column).
+    """
+    out = df.copy()
+    n = max(len(out), 1)
+    for col in out.columns:
+        s = out[col]
+        if col in keep_as_string:
+            out[col] = s.astype("string")
+        elif pd.api.types.is_integer_dtype(s):
+            out[col] = pd.to_numeric(s, downcast="integer")
+        elif pd.api.types.is_float_dtype(s):
+            if col in float32 and col not in COORDINATE_COLUMNS:
+                out[col] = s.astype("float32")
+        elif (s.dtype == object or pd.api.types.is_string_dtype(s)) and s.nunique(dropna=True) / n <= CATEGORICAL_RATIO:
+            out[col] = s.astype("category")
+    return out
+
+
+def _geo_to_arrow(gdf, keep_as_string=(), float32=()):
+    """GeoDataFrame -> Arrow table with WKB geometry, bbox covering struct and 'geo' metadata"""
+    geom_col = gdf.geometry.name
+    attrs = _typed_columns(pd.DataFrame(gdf.drop(columns=geom_col)), keep_as_string, float32)
+    table = pa.Table.from_pandas(attrs, preserve_index=False)
+
+    geoms = gdf.geometry
+    bounds = geoms.bounds
+    bbox = pa.StructArray.from_arrays(
+        [pa.array(bounds[k].to_numpy(dtype="float64")) for k in ("minx", "miny", "maxx", "maxy")],
+        names=["xmin", "ymin", "xmax", "ymax"],
+    )
+    table = table.append_column("geometry", pa.array(geoms.to_wkb(), type=pa.binary()))
+    table = table.append_column("bbox", bbox)
+
+    total = geoms.total_bounds
+    geo_meta = {
+        "version": GEOPARQUET_VERSION,
+        "primary_column": "geometry",
+        "columns": {
+            "geometry": {
+                "encoding": "WKB",
+                "geometry_types": sorted(t for t in geoms.geom_type.dropna().unique()),
+                "crs": gdf.crs.to_json_dict() if gdf.crs is not None else None,
+                "bbox": [float(v) for v in total] if len(gdf) else [],
+                "covering": {"bbox": {k: ["bbox", k] for k in ("xmin", "ymin", "xmax", "ymax")}},
+            }
+        },
+    }
+    meta = dict(table.schema.metadata or {})
+    meta[b"geo"] = json.dumps(geo_meta).encode("utf-8")
+    return table.replace_schema_metadata(meta)
+
+
+def to_arrow(df, keep_as_string=(), float32=()) -> pa.Table:
+    if _is_geo(df):
+        return _geo_to_arrow(df, keep_as_string, float32)
+    return pa.Table.from_pandas(_typed_columns(df, keep_as_string, float32), preserve_index=False)
+
+
+def write_artifact(df, path, row_group_size=ROW_GROUP_SIZE, spatial_sort=True,
+                   keep_as_string=(), float32=(), csv=False, geojson=False):
+    """Write a (Geo)DataFrame as GeoParquet (.parquet) or Arrow IPC (.arrow / .feather).
+
+    Geometries are Hilbert-sorted first so each row group covers a compact area and
+    its bbox statistics can prune whole row groups on read. Float columns are kept as
+    float64 unless listed in float32. Pass csv=True / geojson=True to also write the
+    interoperable text exports next to the binary artifact.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if _is_geo(df) and spatial_sort and len(df) > 1:
+        df = df.iloc[np.argsort(df.geometry.hilbert_distance(), kind="stable")]
+
+    table = to_arrow(df, keep_as_string, float32)
+    if path.suffix in ARROW_SUFFIXES:
+        # uncompressed so readers can memory-map without decoding
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=row_group_size)
+    else:
+        pq.write_table(table, path, row_group_size=row_group_size, compression="zstd",
+                       write_statistics=True)
+
+    if csv:
+        export_csv(df, path.with_suffix(".csv"))
+    if geojson and _is_geo(df):
+        export_geojson(df, path.with_suffix(".geojson"))
+    print(f"✅ Wrote {len(df)} rows → {path}")
+    return path
+
+
+def export_csv(df, path):
+    """CSV export; geometry (if any) is written as WKT"""
+    out = pd.DataFrame(df)
+    if _is_geo(df):
+        out[df.geometry.name] = df.geometry.to_wkt()
+    out.to_csv(path, index=False)
+    return path
+
+
+def export_geojson(gdf, path):
+    gdf.to_crs("EPSG:4326").to_file(path, driver="GeoJSON")
+    return path
+
+
+def _bbox_filter(schema: pa.Schema, bbox):
+    if bbox is None or "bbox" not in schema.names:
+        return None
+    minx, miny, maxx, maxy = bbox
+    return ((pc.field("bbox", "xmin") <= maxx) & (pc.field("bbox", "xmax") >= minx)
+            & (pc.field("bbox", "ymin") <= maxy) & (pc.field("bbox", "ymax") >= miny))
+
+
+def read_table(path, columns=None, bbox=None, filters=None, memory_map=True) -> pa.Table:
+    """Read an artifact as an Arrow table, pushing down column and bbox filters.
+
+    Parquet: only the requested columns are decoded and row groups whose bbox
+    statistics fall outside `bbox` are skipped. Arrow IPC: the file is memory-mapped
+    and filtered without copying unreferenced buffers.
+    """
+    path = Path(path)
+    if path.suffix in ARROW_SUFFIXES:
+        source = pa.memory_map(str(path), "r") if memory_map else pa.OSFile(str(path), "rb")
+        table = pa.ipc.open_file(source).read_all()
+        schema = table.schema
+    else:
+        schema = pq.read_schema(path)
+        table = None
+
+    wanted = None
+    if columns is not None:
+        wanted = list(columns)
+        if bbox is not None and "bbox" in schema.names and "bbox" not in wanted:
+            wanted.append("bbox")
+
+    expr = _bbox_filter(schema, bbox)
+    if filters is not None:
+        expr = filters if expr is None else expr & filters
+
+    if table is None:
+        table = pq.read_table(path, columns=wanted, filters=expr, memory_map=memory_map)
+    else:
+        if wanted is not None:
+            table = table.select(wanted)
+        if expr is not None:
+            table = table.filter(expr)
+
+    if columns is not None and bbox is not None and "bbox" not in columns and "bbox" in table.schema.names:
+        table = table.drop_columns(["bbox"])
+    return table
+
+
+def _geo_meta(schema: pa.Schema) -> dict:
+    raw = (schema.metadata or {}).get(b"geo")
+    return json.loads(raw) if raw else {}
+
+
+def read_artifact(path, columns=None, bbox=None, filters=None, memory_map=True):
+    """Read an artifact back as a GeoDataFrame (if it has geometry) or DataFrame"""
+    table = read_table(path, columns=columns, bbox=bbox, filters=filters, memory_map=memory_map)
+    geo = _geo_meta(table.schema)
+    if "bbox" in table.schema.names:
+        table = table.drop_columns(["bbox"])
+    df = table.to_pandas()
+
+    primary = geo.get("primary_column")
+    if gpd is None or not primary or primary not in df.columns:
+        return df
+    crs = geo["columns"][primary].get("crs")
+    geometry = gpd.GeoSeries.from_wkb(df.pop(primary).to_numpy(), crs=crs)
+    return gpd.GeoDataFrame(df, geometry=geometry.values, crs=crs)
+
+
+def read_tabular(path, **kwargs):
+    """Read a binary artifact if it exists, otherwise fall back to the CSV next to it"""
+    path = Path(path)
+    for suffix in (".parquet", ".arrow"):
+        candidate = path.with_suffix(suffix)
+        if candidate.exists():
+            return read_artifact(candidate, **kwargs)
+    return pd.read_csv(path.with_suffix(".csv"), usecols=kwargs.get("columns"))
@@ -0,0 +1,172 @@
+# Content-hashed delta sync of ETL outputs into Supabase tables
+#
+# Every row gets a stable hash of its canonical JSON form. The (key -> hash) manifest
+# of what was last written sits next to the source artifact, so a refresh only sends
+# the rows whose hash changed (upserts) and the keys that disappeared (deletes).
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from artifacts import read_tabular, _is_geo
+
+BATCH_SIZE = 500
+PAGE_SIZE = 1000
+
+
+def manifest_path(source, table):
+    source = Path(source)
+    return source.with_name(f"{source.stem}.{table}.manifest.parquet")
+
+
+def to_records(df: pd.DataFrame) -> list:
+    """JSON-safe records (NaN -> null, numpy scalars -> Python, timestamps -> ISO, geometry -> WKT)"""
+    if _is_geo(df):
+        df = pd.DataFrame(df.assign(**{df.geometry.name: df.geometry.to_wkt()}))
+    return json.loads(df.to_json(orient="records", date_format="iso", double_precision=15))
+
+
+def row_hash(record: dict) -> str:
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def hash_records(records, key):
+    """{key: hash} for every record; keys are compared as strings"""
+    hashes = {}
+    for rec in records:
+        k = str(rec[key])
+        if k in hashes:
+            raise ValueError(f"duplicate key {key}={k!r} in source")
+        hashes[k] = row_hash(rec)
+    return hashes
+
+
+def load_manifest(path) -> dict:
+    path = Path(path)
+    if not path.exists():
+        return {}
+    t = pq.read_table(path)
+    return dict(zip(t.column("key").to_pylist(), t.column("hash").to_pylist()))
+
+
+def save_manifest(manifest: dict, path):
+    table = pa.table({"key": list(manifest.keys()), "hash": list(manifest.values())})
+    pq.write_table(table, path, compression="zstd")
+
+
+def manifest_from_table(client, table, key):
+    """Bootstrap manifest from the keys currently in the table (first sync / drift repair).
+
+    Rows read back through PostgREST serialize differently from the source records
+    (timestamps, numerics, int vs float, geometry), so their hashes could never match.
+    Only the keys are taken: every source row is sent once, keys missing from the
+    source are deleted, and the manifest written afterwards holds the source hashes.
+    """
+    keys, start = [], 0
+    while True:
+        batch = client.table(table).select(key).order(key).range(start, start + PAGE_SIZE - 1).execute().data or []
+        keys.extend(str(row[key]) for row in batch)
+        if len(batch) < PAGE_SIZE:
+            break
+        start += PAGE_SIZE
+    return dict.fromkeys(keys)
+
+
+def diff(new_hashes: dict, old_hashes: dict):
+    inserts = [k for k in new_hashes if k not in old_hashes]
+    updates = [k for k in new_hashes if k in old_hashes and old_hashes[k] != new_hashes[k]]
+    deletes = [k for k in old_hashes if k not in new_hashes]
+    return inserts, updates, deletes
+
+
+def delta_sync(client, source, table, key, columns=None, manifest=None, batch_size=BATCH_SIZE,
+               dry_run=False, from_table=False, progress=None):
+    """Sync one artifact (parquet/arrow/csv) into a Supabase table, sending only changed rows.
+
+    The manifest is updated after every successful batch, so an interrupted sync
+    resumes where it stopped instead of rewriting everything. from_table is for
+    bootstrapping only (see manifest_from_table): it rewrites every row once.
+    """
+    t0 = time.perf_counter()
+    df = read_tabular(source)
+    if columns:
+        df = df[list(columns)]
+    if key not in df.columns:
+        raise ValueError(f"key column {key!r} not in source")
+    records = to_records(df)
+    by_key = {str(r[key]): r for r in records}
+    new_hashes = hash_records(records, key)
+
+    manifest = Path(manifest) if manifest else manifest_path(source, table)
+    old_hashes = manifest_from_table(client, table, key) if from_table else load_manifest(manifest)
+    inserts, updates, deletes = diff(new_hashes, old_hashes)
+    report = {
+        "table": table,
+        "rows": len(records),
+        "skipped": len(records) - len(inserts) - len(updates),
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(deletes),
+        "batches": 0,
+        "dry_run": dry_run,
+    }
+    if dry_run:
+        report["seconds"] = round(time.perf_counter() - t0, 3)
+        return report
+
+    current = dict(old_hashes)
+    changed = inserts + updates
+    total_batches = -(-len(changed) // batch_size) + -(-len(deletes) // batch_size)
+    try:
+        for i in range(0, len(changed), batch_size):
+            keys = changed[i:i + batch_size]
+            client.table(table).upsert([by_key[k] for k in keys], on_conflict=key).execute()
+            current.update({k: new_hashes[k] for k in keys})
+            report["batches"] += 1
+            if progress:
+                progress(report["batches"] / total_batches, f"upserted {min(i + batch_size, len(changed))} rows")
+        for i in range(0, len(deletes), batch_size):
+            keys = deletes[i:i + batch_size]
+            client.table(table).delete().in_(key, keys).execute()
+            for k in keys:
+                current.pop(k, None)
+            report["batches"] += 1
+            if progress:
+                progress(report["batches"] / total_batches, f"deleted {min(i + batch_size, len(deletes))} rows")
+    finally:
+        save_manifest(current, manifest)
+
+    report["write_fraction"] = round((len(changed) + len(deletes)) / max(len(records), 1), 4)
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    print(f"✅ {table}: {report['inserted']} inserted, {report['updated']} updated, {report['deleted']} deleted, "
+          f"{report['skipped']} unchanged in {report['batches']} batches")
+    return report
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    parser = argparse.ArgumentParser(description="Delta-sync an ETL artifact into a Supabase table")
+    parser.add_argument("source", help="artifact path (.parquet / .arrow / .csv)")
+    parser.add_argument("table")
+    parser.add_argument("--key", required=True, help="primary key column used for upserts / deletes")
+    parser.add_argument("--columns", nargs="+", default=None)
+    parser.add_argument("--manifest", default=None)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--from-table", action="store_true", help="bootstrap: take the keys from the table, resend every row and write the manifest from the source")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = create_client(os.environ["SUPABASE_URL"],
+                           os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.environ["SUPABASE_ANON_KEY"])
+    print(delta_sync(client, args.source, args.table, args.key, args.columns, args.manifest,
+                     args.batch_size, args.dry_run, args.from_table))
@@ -0,0 +1,265 @@
+# Unified, compact amenity store built from the OneMap layers in geojson_layers/
+#
+# Layout of the store directory:
+#   meta.json           layer / category / amenity_type names, CRS, node size, bounds
+#   x.npy, y.npy        float64 coordinates in EPSG:3414 (Hilbert-sorted)
+#   layer.npy           int16 index into meta["layers"]
+#   amenity_type.npy    int16 code from priority_mapping's CategoryTable (-1 = unmapped)
+#   category.npy        int16 index into meta["categories"] (-1 = unmapped)
+#   importance.npy      float32 importance score (NaN = unmapped)
+#   rtree_boxes.npy     packed R-tree node boxes, all levels concatenated (leaves first)
+#   rtree_levels.npy    start offset of every level in rtree_boxes (+ total)
+#   attributes.parquet  name / postal code / raw properties, same row order, loaded lazily
+#
+# Arrays are plain .npy files so loading is an mmap, not a parse.
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from priority_mapping import load_category_table, CONFIG_PATH  # noqa: E402
+
+LAYERS_DIR = Path(__file__).resolve().parent / "geojson_layers"
+STORE_DIR = Path(__file__).resolve().parent / "amenity_store"
+TARGET_CRS = "EPSG:3414"
+NODE_SIZE = 16
+
+# first matching column is used as the display name / postal code of a feature
+NAME_COLUMNS = ["TRADE_NAME", "NAME", "Name", "CENTRE_NAM", "SCHOOL", "STATION_NA", "STADIUM_NA", "BUS_STOP_N"]
+POSTAL_COLUMNS = ["POSTAL_CD", "POSTAL_COD", "POSTALCODE", "ADDRESSPOS", "ADDRESSPOSTALCODE"]
+ARRAYS = ["x", "y", "layer", "amenity_type", "category", "importance"]
+
+
+def hilbert_key(x, y, bounds, order=16):
+    """Vectorised Hilbert curve index on a 2^order grid"""
+    minx, miny, maxx, maxy = bounds
+    n = 1 << order
+    xi = ((x - minx) / max(maxx - minx, 1e-9) * (n - 1)).astype(np.int64)
+    yi = ((y - miny) / max(maxy - miny, 1e-9) * (n - 1)).astype(np.int64)
+    d = np.zeros(len(x), dtype=np.int64)
+    s = n >> 1
+    while s > 0:
+        rx = (xi & s) > 0
+        ry = (yi & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # rotate the quadrant
+        flip = ~ry
+        swap_x = np.where(flip & rx, s - 1 - xi, xi)
+        swap_y = np.where(flip & rx, s - 1 - yi, yi)
+        xi = np.where(flip, swap_y, swap_x)
+        yi = np.where(flip, swap_x, swap_y)
+        s >>= 1
+    return d
+
+
+class PackedRTree:
+    """Static R-tree over points that are already spatially sorted.
+
+    Leaf node i covers rows [i*B, (i+1)*B); inner node i on level L covers nodes
+    [i*B, (i+1)*B) on level L-1, so no child pointers are stored.
+    """
+
+    def __init__(self, boxes, levels, node_size=NODE_SIZE):
+        self.boxes = boxes
+        self.levels = levels
+        self.node_size = node_size
+
+    @classmethod
+    def build(cls, x, y, node_size=NODE_SIZE):
+        def group(minx, miny, maxx, maxy):
+            starts = np.arange(0, len(minx), node_size)
+            return np.column_stack([
+                np.minimum.reduceat(minx, starts), np.minimum.reduceat(miny, starts),
+                np.maximum.reduceat(maxx, starts), np.maximum.reduceat(maxy, starts),
+            ])
+
+        level = group(x, y, x, y) if len(x) else np.zeros((0, 4))
+        all_levels = [level]
+        while len(level) > 1:
+            level = group(level[:, 0], level[:, 1], level[:, 2], level[:, 3])
+            all_levels.append(level)
+        offsets = np.cumsum([0] + [len(l) for l in all_levels]).astype(np.int64)
+        return cls(np.vstack(all_levels), offsets, node_size)
+
+    def query(self, x, y, minx, miny, maxx, maxy) -> np.ndarray:
+        """Row indices of points inside the box"""
+        n_levels = len(self.levels) - 1
+        if n_levels == 0 or len(x) == 0:
+            return np.zeros(0, dtype=np.int64)
+        B = self.node_size
+        top = self.boxes[self.levels[n_levels - 1]:self.levels[n_levels]]
+        nodes = np.arange(len(top))
+        for lvl in range(n_levels - 1, -1, -1):
+            boxes = self.boxes[self.levels[lvl]:self.levels[lvl + 1]][nodes]
+            hit = (boxes[:, 0] <= maxx) & (boxes[:, 2] >= minx) & (boxes[:, 1] <= maxy) & (boxes[:, 3] >= miny)
+            nodes = nodes[hit]
+            size = len(x) if lvl == 0 else self.levels[lvl] - self.levels[lvl - 1]
+            nodes = (nodes[:, None] * B + np.arange(B)).ravel()
+            nodes = nodes[nodes < size]
+        inside = (x[nodes] >= minx) & (x[nodes] <= maxx) & (y[nodes] >= miny) & (y[nodes] <= maxy)
+        return nodes[inside]
+
+
+def _first_column(gdf, candidates):
+    for col in candidates:
+        if col in gdf.columns:
+            return gdf[col].astype("string")
+    return pd.Series(pd.NA, index=gdf.index, dtype="string")
+
+
+def build_amenity_store(layers_dir=LAYERS_DIR, out_dir=STORE_DIR, config_path=CONFIG_PATH, node_size=NODE_SIZE):
+    """Merge every layer in `layers_dir` into one columnar store in `out_dir`"""
+    import geopandas as gpd
+
+    t0 = time.perf_counter()
+    table = load_category_table(config_path)
+    layers_dir, out_dir = Path(layers_dir), Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    layer_names, frames = [], []
+    for path in sorted(layers_dir.glob("*.geojson")):
+        gdf = gpd.read_file(path).to_crs(TARGET_CRS)
+        if gdf.empty:
+            continue
+        layer_code = len(layer_names)
+        layer_names.append(path.stem)
+        # polygons (e.g. stadiums) are reduced to a point guaranteed to lie inside them
+        pts = gdf.geometry.where(gdf.geom_type == "Point", gdf.geometry.representative_point())
+        props = gdf.drop(columns=gdf.geometry.name)
+        frames.append(pd.DataFrame({
+            "x": pts.x.to_numpy(),
+            "y": pts.y.to_numpy(),
+            "layer": np.int16(layer_code),
+            "name": _first_column(gdf, NAME_COLUMNS),
+            "postal_code": _first_column(gdf, POSTAL_COLUMNS),
+            "properties": [json.dumps(r, default=str) for r in props.to_dict(orient="records")],
+        }))
+        print(f"  ✅ {path.stem}: {len(gdf)} features")
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df[np.isfinite(df["x"]) & np.isfinite(df["y"])]
+    x, y = df["x"].to_numpy(), df["y"].to_numpy()
+    bounds = (float(x.min()), float(y.min()), float(x.max()), float(y.max()))
+
+    order = np.argsort(hilbert_key(x, y, bounds), kind="stable")
+    df = df.iloc[order].reset_index(drop=True)
+
+    layer = df["layer"].to_numpy(dtype=np.int16)
+    type_code_per_layer = table.type_codes(layer_names)
+    type_code = type_code_per_layer[layer]
+    arrays = {
+        "x": df["x"].to_numpy(dtype=np.float64),
+        "y": df["y"].to_numpy(dtype=np.float64),
+        "layer": layer,
+        "amenity_type": type_code.astype(np.int16),
+        "category": table.type_category[type_code].astype(np.int16),
+        "importance": table.type_score[type_code].astype(np.float32),
+    }
+    for name, arr in arrays.items():
+        np.save(out_dir / f"{name}.npy", arr)
+
+    tree = PackedRTree.build(arrays["x"], arrays["y"], node_size)
+    np.save(out_dir / "rtree_boxes.npy", tree.boxes)
+    np.save(out_dir / "rtree_levels.npy", tree.levels)
+
+    df["layer"] = pd.Categorical.from_codes(layer, categories=layer_names)
+    df[["layer", "name", "postal_code", "properties"]].to_parquet(out_dir / "attributes.parquet", index=False)
+
+    meta = {
+        "crs": TARGET_CRS,
+        "count": int(len(df)),
+        "bounds": bounds,
+        "node_size": node_size,
+        "layers": layer_names,
+        "categories": table.categories,
+        "amenity_types": table.amenity_types,
+        "unmapped_layers": [l for l, c in zip(layer_names, type_code_per_layer) if c < 0],
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(out_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"✅ Amenity store: {len(df)} amenities from {len(layer_names)} layers → {out_dir} "
+          f"({time.perf_counter() - t0:.1f}s)")
+    return out_dir
+
+
+class AmenityStore:
+    """Read side of the store: arrays are memory-mapped, attributes load on demand"""
+
+    def __init__(self, path=STORE_DIR, mmap=True):
+        self.path = Path(path)
+        with open(self.path / "meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        mode = "r" if mmap else None
+        for name in ARRAYS:
+            setattr(self, name, np.load(self.path / f"{name}.npy", mmap_mode=mode))
+        self.tree = PackedRTree(np.load(self.path / "rtree_boxes.npy", mmap_mode=mode),
+                                np.load(self.path / "rtree_levels.npy"), self.meta["node_size"])
+        self._attributes = None
+
+    def __len__(self):
+        return self.meta["count"]
+
+    @property
+    def layers(self):
+        return self.meta["layers"]
+
+    @property
+    def categories(self):
+        return self.meta["categories"]
+
+    def layer_code(self, name: str) -> int:
+        return self.layers.index(name)
+
+    def category_code(self, name: str) -> int:
+        return self.categories.index(name)
+
+    def query_bbox(self, minx, miny, maxx, maxy) -> np.ndarray:
+        """Row indices of amenities inside an EPSG:3414 box (packed R-tree)"""
+        return self.tree.query(self.x, self.y, minx, miny, maxx, maxy)
+
+    def mask(self, layers=None, categories=None) -> np.ndarray:
+        keep = np.ones(len(self), dtype=bool)
+        if layers is not None:
+            keep &= np.isin(self.layer, [self.layer_code(l) for l in layers])
+        if categories is not None:
+            keep &= np.isin(self.category, [self.category_code(c) for c in categories])
+        return keep
+
+    def attributes(self, rows=None, columns=None) -> pd.DataFrame:
+        """Attribute table (cached after the first call); optionally only some rows/columns"""
+        if self._attributes is None:
+            self._attributes = pd.read_parquet(self.path / "attributes.parquet")
+        attrs = self._attributes if columns is None else self._attributes[columns]
+        return attrs if rows is None else attrs.iloc[rows]
+
+    def to_frame(self, rows=None) -> pd.DataFrame:
+        """Core columns decoded to names (no attributes)"""
+        idx = slice(None) if rows is None else rows
+        cats = np.array(self.categories + [None], dtype=object)
+        return pd.DataFrame({
+            "x": self.x[idx],
+            "y": self.y[idx],
+            "layer": np.array(self.layers, dtype=object)[self.layer[idx]],
+            "category": cats[self.category[idx]],
+            "importance": self.importance[idx],
+        })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the unified amenity store from the OneMap layers")
+    parser.add_argument("--layers", default=str(LAYERS_DIR))
+    parser.add_argument("--out", default=str(STORE_DIR))
+    parser.add_argument("--config", default=str(CONFIG_PATH))
+    args = parser.parse_args()
+
+    build_amenity_store(args.layers, args.out, args.config)
+    t = time.perf_counter()
+    store = AmenityStore(args.out)
+    print(f"Loaded {len(store)} amenities in {(time.perf_counter() - t) * 1000:.1f} ms")
@@ -3,65 +3,86 @@ import os
 from dotenv import load_dotenv
 import pandas as pd
 import time
+from pathlib import Path
 
 # Load environment variables
 load_dotenv()
 
+AUTH_URL = "https://www.onemap.gov.sg/api/auth/post/getToken"
+THEMES_URL = "https://www.onemap.gov.sg/api/public/themesvc/getAllThemesInfo?moreInfo=Y"
+OUTPUT_CSV = Path(__file__).resolve().parent / "onemap_themes.csv"
+
+
 # Step 1: Authenticate and get access token
-auth_url = "https://www.onemap.gov.sg/api/auth/post/getToken"
-payload = {
-    "email": os.environ["ONE_MAP_USER"],
-    "password": os.environ["ONE_MAP_PASS"]
-}
-auth_resp = requests.post(auth_url, json=payload)
-auth_resp.raise_for_status()
-token = auth_resp.json().get("access_token")
-print("✅ Access token obtained:", token[:30] + "...")
-
-# Step 2: Get all themes
-themes_url = "https://www.onemap.gov.sg/api/public/themesvc/getAllThemesInfo?moreInfo=Y"
-headers = {"Authorization": token}
-themes_resp = requests.get(themes_url, headers=headers)
-themes_resp.raise_for_status()
-themes = themes_resp.json().get("Theme_Names", [])
-print(f"📌 Found {len(themes)} themes.")
-
-# Step 3: Loop through each theme and get records
-all_records = []
-for theme in themes:
-    themename = theme.get("THEMENAME")
-    queryname = theme.get("QUERYNAME")
-    print(f"🔍 Fetching data for: {themename} ({queryname})")
-
-    # Build endpoint
-    theme_data_url = f"https://www.onemap.gov.sg/api/public/themesvc/retrieveTheme?queryName={queryname}"
-    
-    try:
-        data_resp = requests.get(theme_data_url, headers=headers)
-        data_resp.raise_for_status()
-        data_items = data_resp.json().get("SrchResults", [])
-
-        # Append theme metadata to each record
-        for item in data_items:
-            item["Theme Name"] = themename
-            item["Query Name"] = queryname
-            all_records.append(item)
-
-    except Exception as e:
-        print(f"⚠️ Failed to fetch {queryname}: {e}")
-
-    # Be nice to API
-    time.sleep(0.2)
-
-# Step 4: Create final DataFrame
-df = pd.DataFrame(all_records)
-
-# Clean column names for consistency
-df.columns = [col.strip().replace(" ", "_").lower() for col in df.columns]
-
-#%%
-print("\n📌 Column Names in df:")
-print(df.columns.tolist())
-df.head(3).T  # Transposed view: rows as columns for easier preview
+def get_token():
+    payload = {
+        "email": os.environ["ONE_MAP_USER"],
+        "password": os.environ["ONE_MAP_PASS"]
+    }
+    auth_resp = requests.post(AUTH_URL, json=payload)
+    auth_resp.raise_for_status()
+    token = auth_resp.json().get("access_token")
+    print("✅ Access token obtained:", token[:30] + "...")
+    return token
+
+
+# Step 2-4: Get all themes, fetch each theme's records, build one DataFrame
+def fetch_all_themes(token=None, progress=None):
+    token = token or get_token()
+    headers = {"Authorization": token}
+    themes_resp = requests.get(THEMES_URL, headers=headers)
+    themes_resp.raise_for_status()
+    themes = themes_resp.json().get("Theme_Names", [])
+    print(f"📌 Found {len(themes)} themes.")
+
+    all_records = []
+    for i, theme in enumerate(themes):
+        themename = theme.get("THEMENAME")
+        queryname = theme.get("QUERYNAME")
+        print(f"🔍 Fetching data for: {themename} ({queryname})")
+        if progress:
+            progress(i / max(len(themes), 1), queryname)
+
+        # Build endpoint
+        theme_data_url = f"https://www.onemap.gov.sg/api/public/themesvc/retrieveTheme?queryName={queryname}"
+
+        try:
+            data_resp = requests.get(theme_data_url, headers=headers)
+            data_resp.raise_for_status()
+            data_items = data_resp.json().get("SrchResults", [])
+
+            # Append theme metadata to each record
+            for item in data_items:
+                item["Theme Name"] = themename
+                item["Query Name"] = queryname
+                all_records.append(item)
+
+        except Exception as e:
+            print(f"⚠️ Failed to fetch {queryname}: {e}")
+
+        # Be nice to API
+        time.sleep(0.2)
+
+    df = pd.DataFrame(all_records)
+
+    # Clean column names for consistency
+    df.columns = [col.strip().replace(" ", "_").lower() for col in df.columns]
+    return df
+
+
+def export_themes(out_path=OUTPUT_CSV, progress=None):
+    df = fetch_all_themes(progress=progress)
+    df.to_csv(out_path, index=False)
+    print(f"✅ {len(df)} theme records → {out_path}")
+    return out_path
+
+
+if __name__ == "__main__":
+    df = fetch_all_themes()
+
+    #%%
+    print("\n📌 Column Names in df:")
+    print(df.columns.tolist())
+    print(df.head(3).T)  # Transposed view: rows as columns for easier preview
 
 # %%
@@ -0,0 +1,215 @@
+# Persistent postal code -> location index shared by the ETL scripts and the API
+#
+# One SQLite file; postal_codes is a WITHOUT ROWID table clustered on the 6-digit
+# code, so a lookup is a single B-tree descent (O(log n)) and a batch is one
+# IN (...) query per LOOKUP_CHUNK codes. Codes OneMap could not resolve go into
+# postal_misses so later fills do not ask again. Lookups are standard library only;
+# backend/etl/roadnetwork/postal_codes.py builds the file.
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import requests
+except ImportError:  # lookups work without it; only OneMap fills need it
+    requests = None
+
+INDEX_PATH = Path(__file__).resolve().parents[1] / "backend" / "etl" / "roadnetwork" / "postal_index.sqlite3"
+ONEMAP_SEARCH_URL = "https://www.onemap.gov.sg/api/common/elastic/search"
+ONEMAP_RATE = 4.0          # requests per second (OneMap allows 250 per minute)
+ONEMAP_WORKERS = 4
+LOOKUP_CHUNK = 500         # codes per IN (...) query, well under SQLite's parameter limit
+FIELDS = ("postal_code", "lon", "lat", "planning_area", "subzone", "street_name", "source", "updated_at")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS postal_codes (
+    postal_code   TEXT PRIMARY KEY,
+    lon           REAL NOT NULL,
+    lat           REAL NOT NULL,
+    planning_area TEXT,
+    subzone       TEXT,
+    street_name   TEXT,
+    source        TEXT NOT NULL,
+    updated_at    TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postal_misses (
+    postal_code TEXT PRIMARY KEY,
+    checked_at  TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def normalize_postal(code):
+    """'018956', 18956, '18956.0' -> '018956'; None when it is not a 6-digit code"""
+    if code is None:
+        return None
+    s = str(code).strip()
+    if s.endswith(".0"):
+        s = s[:-2]
+    if not s:
+        return None
+    s = s.zfill(6)
+    return s if len(s) == 6 and s.isdigit() else None
+
+
+class PostalIndex:
+    """Postal code lookups over the SQLite index (read-only unless writable=True)"""
+
+    def __init__(self, path=INDEX_PATH, writable=False):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        if writable:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+        else:
+            if not self.path.exists():
+                raise FileNotFoundError(self.path)
+            self.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM postal_codes").fetchone()[0]
+
+    # --- lookups ------------------------------------------------------------------------
+    def lookup(self, code):
+        """Record for one postal code, or None"""
+        code = normalize_postal(code)
+        if code is None:
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM postal_codes WHERE postal_code = ?", (code,)).fetchone()
+        return dict(row) if row else None
+
+    def lookup_many(self, codes):
+        """{normalized code: record} for the codes that are in the index"""
+        wanted = sorted({c for c in map(normalize_postal, codes) if c})
+        out = {}
+        with self.lock:
+            for i in range(0, len(wanted), LOOKUP_CHUNK):
+                chunk = wanted[i:i + LOOKUP_CHUNK]
+                rows = self.conn.execute(
+                    f"SELECT * FROM postal_codes WHERE postal_code IN ({','.join('?' * len(chunk))})", chunk)
+                out.update((row["postal_code"], dict(row)) for row in rows)
+        return out
+
+    def missing(self, codes, include_checked=False):
+        """Codes absent from the index (minus ones OneMap already failed on, by default)"""
+        wanted = sorted({c for c in map(normalize_postal, codes) if c})
+        known = set(self.lookup_many(wanted))
+        if not include_checked:
+            with self.lock:
+                for i in range(0, len(wanted), LOOKUP_CHUNK):
+                    chunk = wanted[i:i + LOOKUP_CHUNK]
+                    known.update(r[0] for r in self.conn.execute(
+                        f"SELECT postal_code FROM postal_misses WHERE postal_code IN ({','.join('?' * len(chunk))})",
+                        chunk))
+        return [c for c in wanted if c not in known]
+
+    def stats(self):
+        with self.lock:
+            by_source = dict(self.conn.execute("SELECT source, COUNT(*) FROM postal_codes GROUP BY source").fetchall())
+            misses = self.conn.execute("SELECT COUNT(*) FROM postal_misses").fetchone()[0]
+        return {"codes": sum(by_source.values()), "by_source": by_source, "misses": misses}
+
+    # --- writes -------------------------------------------------------------------------
+    def upsert(self, records, source, overwrite=True):
+        """Insert (postal_code, lon, lat, planning_area, subzone, street_name) tuples in one transaction.
+
+        overwrite=False keeps rows already present (a lower-priority source).
+        """
+        stamp = now()
+        conflict = ("DO UPDATE SET lon = excluded.lon, lat = excluded.lat, planning_area = excluded.planning_area, "
+                    "subzone = excluded.subzone, street_name = excluded.street_name, source = excluded.source, "
+                    "updated_at = excluded.updated_at") if overwrite else "DO NOTHING"
+        rows = [(code, float(lon), float(lat), pa, sz, st, source, stamp)
+                for code, lon, lat, pa, sz, st in records if normalize_postal(code) == code]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO postal_codes ({', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                f"ON CONFLICT (postal_code) {conflict}", rows)
+            self.conn.executemany("DELETE FROM postal_misses WHERE postal_code = ?", [(r[0],) for r in rows])
+        return len(rows)
+
+    def record_misses(self, codes):
+        stamp = now()
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO postal_misses (postal_code, checked_at) VALUES (?, ?)",
+                                  [(c, stamp) for c in codes])
+
+
+# --- OneMap ---------------------------------------------------------------------------
+class RateLimiter:
+    """Spaces calls at least 1 / rate seconds apart across threads"""
+
+    def __init__(self, rate=ONEMAP_RATE):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            t = time.monotonic()
+            slot = max(t, self.next_at)
+            self.next_at = slot + self.interval
+        if slot > t:
+            time.sleep(slot - t)
+
+
+def onemap_search(code, session=None, limiter=None, token=None, retries=3):
+    """(lon, lat, road name) for a postal code from OneMap search, or None when not found"""
+    http = session or requests
+    headers = {"Authorization": token} if token else {}
+    params = {"searchVal": code, "returnGeom": "Y", "getAddrDetails": "Y", "pageNum": 1}
+    for attempt in range(retries):
+        if limiter:
+            limiter.wait()
+        resp = http.get(ONEMAP_SEARCH_URL, params=params, headers=headers, timeout=30)
+        if resp.status_code == 429 or resp.status_code >= 500:
+            time.sleep(2 ** attempt)
+            continue
+        resp.raise_for_status()
+        for hit in resp.json().get("results", []):
+            if hit.get("POSTAL") == code:
+                road = hit.get("ROAD_NAME")
+                return float(hit["LONGITUDE"]), float(hit["LATITUDE"]), None if road in (None, "NIL") else road
+        return None
+    raise RuntimeError(f"OneMap search kept failing for {code}")
+
+
+def fetch_onemap(codes, batch_size=200, workers=ONEMAP_WORKERS, rate=ONEMAP_RATE, token=None):
+    """Yield (found [(code, lon, lat, road)], not_found [code]) per batch of codes.
+
+    Requests within a batch run on a small thread pool under one shared rate limit;
+    callers write each batch before the next is fetched, so an interrupted fill
+    keeps everything resolved so far.
+    """
+    if requests is None:
+        raise RuntimeError("requests is required to query OneMap")
+    token = token or os.getenv("ONEMAP_TOKEN")
+    limiter = RateLimiter(rate)
+    with requests.Session() as session, ThreadPoolExecutor(workers) as pool:
+        for i in range(0, len(codes), batch_size):
+            batch = codes[i:i + batch_size]
+            results = pool.map(lambda c: onemap_search(c, session, limiter, token), batch)
+            found, not_found = [], []
+            for code, hit in zip(batch, results):
+                if hit is None:
+                    not_found.append(code)
+                else:
+                    found.append((code, *hit))
+            yield found, not_found
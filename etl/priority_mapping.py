@@ -1,51 +1,25 @@
 
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from profiling import Profiler, add_profile_argument, profiler_from_args
+
+BASE = Path(__file__).resolve().parent
+CONFIG_PATH = BASE / "amenity_categories.json"
+INPUT_CSV = BASE / "arcgis" / "amenities.csv"
+OUTPUT_PARQUET = BASE / "arcgis" / "amenities_with_importance_score.parquet"
+OUTPUT_CSV = OUTPUT_PARQUET.with_suffix(".csv")
+CHUNK_SIZE = 50_000
+
+SCORE_COLUMNS = ["amenity_category", "amenity_priority", "amenity_weight", "importance_score", "importance_label"]
 
-##load data
-df = pd.read_csv('arcgis/amenities.csv')
-df.shape
-df.head()
-
-#check unique amenity types, these will be amenity subcategories
-unique_amenity_types = df['amenity_type'].unique()
-print(unique_amenity_types)
-print(len(unique_amenity_types))
-print(df['source_file'].count())
-print(df.shape)
-
-# map amenity_type as subcategories to categories
-subcat_to_cat_mapping = {
-    "emergency_services": ['fire_services'],
-    "healthcare_facilities": [],
-    "essential_services": [ 'childcare_clean', 'post_offices' , 'police' ],
-    "residential": ['hdb_buildings'],
-    "education_institutions": ['preschools', 'special_education' ,'moe_schools', 'higher_education', 'kindergartens' ],
-    "transport_services": ['bus_depots','bus_interchanges_terminals','bus_stops', 'mrt_station_exits' ] ,
-    "tourism": ['tourist_attractions', 'hotels', 'historic_sites' ],
-    "community_spaces":['synagogues', 'sports_centres', 'stadiums' ,'swimming_complex' , 'churches', 'community_clubs', 'concert_halls', 'mosques', 'libraries', 'chinese_temples' , 'sikh_temples', 'indian_temples' , 'parkfacilities'],
-    "government_services": ['courts'],
-    "retail_services": ['hdb_points_shp'],
-    "others": ['other_institutions']}
-
-# decide on categories and (priority, weight)
-# PRIORITY: lower number, more important --> based on importance to community 
-## decided based on scale of 1 to 5, with 1 being critical to community and 5 being low impact on community if no access
-# WEIGHT: higher number, more weight --> based on assumptinos made on usage/footfall 
-## decided based on scale of 1 to 5, with 1 being low usage/footfall (used by avg person <1x a week) and 5 being high footfall (used by avg person 5-7x a week) with some manual override execptions (e.g. emergency services should always be available)
-category_priority_weight = {
-    "emergency_services": [1, 5],
-    "healthcare_facilities": [1, 5],
-    "essential_services": [1, 4],
-    "residential": [1, 5],
-    "education_institutions": [2, 4],
-    "transport_services": [2, 4],
-    "tourism": [5, 1],
-    "community_spaces": [4, 2],
-    "government_services": [3, 3],
-    "financial_services": [3, 2],
-    "retail_services": [4, 2],
-    "recreation": [5, 2]
-}
 
 # given df with priority and weight, calculate importance score and add label
 def amenity_importance(df, score_col="importance_score", score_label="importance_label", bins=[1, 2, 3, 5,8, 25], labels=["Negligible", "Low", "Moderate", "High", "Critical"]):
@@ -56,28 +30,188 @@ def amenity_importance(df, score_col="importance_score", score_label="importance
 
     return df
 
-# create categoryDB
-category_data = [(category, values[0], values[1]) for category, values in category_priority_weight.items()]
-categoryDB = pd.DataFrame(category_data, columns=["amenity_category", "amenity_priority", "amenity_weight"])
-print(categoryDB.head())
 
-# create subcat_to_catDB
-subcat_to_catDB = pd.DataFrame([(subcat, cat) for cat, subcats in subcat_to_cat_mapping.items() for subcat in subcats], columns=["amenity_type", "amenity_category"])
-print(subcat_to_catDB.head())
+class CategoryTable:
+    """Category table loaded from amenity_categories.json, flattened into lookup arrays.
+
+    Every amenity_type gets an integer code; the per-type arrays (category code,
+    priority, weight, score, label code) are indexed by that code. Index -1 is a
+    sentinel slot for unmapped types, so `array[codes]` works without masking.
+    """
+
+    def __init__(self, config):
+        cats = config["categories"]
+        self.categories = list(cats)
+        self.bins = config.get("importance_bins", [1, 2, 3, 5, 8, 25])
+        self.labels = config.get("importance_labels", ["Negligible", "Low", "Moderate", "High", "Critical"])
+        # source layer names that differ from the amenity_type used in the table
+        self.aliases = config.get("layer_aliases", {})
+
+        self.amenity_types = []
+        type_category = []
+        for cat_code, cat in enumerate(self.categories):
+            for amenity_type in cats[cat].get("amenity_types", []):
+                if amenity_type not in self.amenity_types:
+                    self.amenity_types.append(amenity_type)
+                    type_category.append(cat_code)
+
+        def nan_if_none(v):
+            return np.nan if v is None else float(v)
+
+        self.category_priority = np.array([nan_if_none(cats[c].get("priority")) for c in self.categories])
+        self.category_weight = np.array([nan_if_none(cats[c].get("weight")) for c in self.categories])
+        self.type_index = pd.Index(self.amenity_types)
+
+        # per-type lookups with a trailing sentinel for code -1
+        self.type_category = np.array(type_category + [-1], dtype=np.int16)
+        self.type_priority = np.append(self.category_priority[type_category], np.nan)
+        self.type_weight = np.append(self.category_weight[type_category], np.nan)
+        self.build_scores()
+
+    def build_scores(self):
+        self.type_score = self.type_weight ** 2 / self.type_priority
+        self.type_label = pd.cut(self.type_score, bins=self.bins, labels=self.labels).codes.astype(np.int8)
+
+    # backwards-compatible views of the old hard-coded dicts
+    @property
+    def subcat_to_cat_mapping(self):
+        return {c: [t for t, code in zip(self.amenity_types, self.type_category) if code == i]
+                for i, c in enumerate(self.categories)}
+
+    @property
+    def category_priority_weight(self):
+        return {c: [p, w] for c, p, w in zip(self.categories, self.category_priority, self.category_weight)
+                if not (np.isnan(p) or np.isnan(w))}
+
+    def type_codes(self, amenity_types) -> np.ndarray:
+        """Map amenity_type (or layer) values to int16 codes (-1 = not in the table)"""
+        values = pd.Series(amenity_types).astype("string")
+        if self.aliases:
+            values = values.replace(self.aliases)
+        return self.type_index.get_indexer(values).astype(np.int16)
+
+    def lookup(self, codes: np.ndarray) -> pd.DataFrame:
+        """Score columns for an array of type codes, by array indexing only (no merges)"""
+        return pd.DataFrame({
+            "amenity_category": pd.Categorical.from_codes(self.type_category[codes], categories=self.categories),
+            "amenity_priority": self.type_priority[codes],
+            "amenity_weight": self.type_weight[codes],
+            "importance_score": self.type_score[codes],
+            "importance_label": pd.Categorical.from_codes(self.type_label[codes], categories=self.labels),
+        })
+
+
+def load_category_table(config_path=CONFIG_PATH) -> CategoryTable:
+    with open(config_path, encoding="utf-8") as f:
+        return CategoryTable(json.load(f))
+
+
+def score_frame(df, table: CategoryTable, type_col="amenity_type") -> pd.DataFrame:
+    """Attach category / priority / weight / importance columns to an in-memory frame"""
+    scores = table.lookup(table.type_codes(df[type_col]))
+    scores.index = df.index
+    return pd.concat([df.drop(columns=[c for c in SCORE_COLUMNS if c in df.columns]), scores], axis=1)
+
+
+def _stable_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    # keep the schema identical across chunks: text columns are strings and
+    # integer columns become floats (a later chunk may contain NaN)
+    for col in chunk.columns:
+        s = chunk[col]
+        if s.dtype == object or pd.api.types.is_string_dtype(s):
+            chunk[col] = s.astype("string")
+        elif pd.api.types.is_integer_dtype(s) or pd.api.types.is_bool_dtype(s):
+            chunk[col] = s.astype("float64")
+    return chunk
+
+
+def score_amenities(input_csv=INPUT_CSV, output_path=OUTPUT_PARQUET, config_path=CONFIG_PATH,
+                    chunksize=CHUNK_SIZE, csv_path=OUTPUT_CSV, type_col="amenity_type", progress=None,
+                    profiler=None):
+    """Score an amenities CSV in fixed-size chunks.
+
+    Memory is bounded by `chunksize`: each chunk is scored by array lookups and
+    written straight out as one Parquet row group (and appended to the CSV export).
+    """
+    prof = profiler or Profiler("score_amenities", enabled=False)
+    with prof.stage("load_config"):
+        table = load_category_table(config_path)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    writer = None
+    rows = unmapped = 0
+    try:
+        chunks = prof.iterate("read_csv", pd.read_csv(input_csv, chunksize=chunksize, low_memory=False))
+        for i, chunk in enumerate(chunks):
+            with prof.stage("score"):
+                chunk = score_frame(_stable_chunk(chunk), table, type_col)
+                unmapped += int(chunk["amenity_category"].isna().sum())
+
+            with prof.stage("write_parquet"):
+                batch = pa.Table.from_pandas(chunk, preserve_index=False,
+                                             schema=writer.schema if writer else None)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, batch.schema, compression="zstd")
+                writer.write_table(batch)
+
+            if csv_path:
+                with prof.stage("write_csv"):
+                    chunk.to_csv(csv_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            rows += len(chunk)
+            print(f"  🌀 scored {rows} rows")
+            if progress:
+                progress(None, f"scored {rows} rows")
+    finally:
+        if writer is not None:
+            writer.close()
+
+    print(f"✅ Exported {rows} amenities with importance scores to {output_path}"
+          + (f" ({unmapped} with no category)" if unmapped else ""))
+    return output_path
+
+
+def rescore(scored_path=OUTPUT_PARQUET, config_path=CONFIG_PATH, output_path=None, type_col="amenity_type"):
+    """Recompute the score columns after a priority/weight change.
+
+    Only the dictionary-encoded amenity_type column is read (memory-mapped), so
+    geometry and the other attributes are never touched: the new values come from
+    mapping the few distinct types through the lookup arrays.
+    """
+    table = load_category_table(config_path)
+    col = pq.read_table(scored_path, columns=[type_col], read_dictionary=[type_col],
+                        memory_map=True).column(type_col).combine_chunks()
 
+    # one extra slot for null amenity_type values
+    dict_codes = np.append(table.type_codes(col.dictionary.to_pylist()), np.int16(-1))
+    indices = pc.fill_null(col.indices, len(dict_codes) - 1).to_numpy()
+    codes = dict_codes[indices]
+    scores = table.lookup(codes)
 
-# label ARCGIS data with category information
-df = df.merge(subcat_to_catDB, on="amenity_type", how="left")
+    if output_path:
+        pq.write_table(pa.Table.from_pandas(scores, preserve_index=False), output_path, compression="zstd")
+        print(f"✅ Re-scored {len(scores)} amenities → {output_path}")
+    return scores
 
-## add priority labels
-df = df.merge(categoryDB, on="amenity_category", how="left")
-print(df.head())
 
-## calculate importance score and add label
-df = amenity_importance(df)
-print(df.head())
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Attach category, priority, weight and importance score to amenities")
+    parser.add_argument("--input", default=str(INPUT_CSV))
+    parser.add_argument("--output", default=str(OUTPUT_PARQUET))
+    parser.add_argument("--config", default=str(CONFIG_PATH))
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--no-csv", action="store_true", help="skip the CSV export")
+    parser.add_argument("--rescore", metavar="SCORES_OUT",
+                        help="only recompute scores from an existing --output file into SCORES_OUT")
+    add_profile_argument(parser)
+    args = parser.parse_args()
 
-# Option 1: Export to NEW file (recommended, preserves original CSV)
-output_path = "arcgis/amenities_with_importance_score.csv"
-df.to_csv(output_path, index=False)
-print(f"✅ Exported dataset with importance scores to {output_path}")
\ No newline at end of file
+    profiler = profiler_from_args("priority_mapping", args).start()
+    if args.rescore:
+        with profiler.stage("rescore"):
+            rescore(args.output, args.config, args.rescore)
+    else:
+        score_amenities(args.input, args.output, args.config, args.chunksize,
+                        csv_path=None if args.no_csv else Path(args.output).with_suffix(".csv"),
+                        profiler=profiler)
+    profiler.stop()
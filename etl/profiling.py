@@ -0,0 +1,189 @@
+# Opt-in profiling for ETL entry points (and the API's ?profile=1 requests)
+#
+# Stages record wall time, CPU time and peak resident memory; a background sampler
+# collects call stacks in the folded "frame;frame;frame count" format that
+# flamegraph.pl, speedscope and inferno read directly, and reads RSS on each tick
+# (tracemalloc would slow allocation-heavy stages like to_csv several times over).
+# Standard library only.
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_DIR = Path("profiles")
+SAMPLE_INTERVAL = 0.005   # seconds between stack samples
+MAX_DEPTH = 128
+
+
+def current_rss() -> int:
+    """Resident set size in bytes (Linux /proc; elsewhere the lifetime peak)"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+
+
+class StackSampler:
+    """Samples the stacks of `thread_ids` (default: every other thread) every `interval` seconds"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.stacks = Counter()
+        self.samples = 0
+        self.rss_peak = 0       # highest RSS seen since the last reset_rss()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for tid, frame in sys._current_frames().items():
+            if tid == own or (self.thread_ids is not None and tid not in self.thread_ids):
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(tid, f"thread-{tid}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+        self.rss_peak = max(self.rss_peak, current_rss())
+
+    def reset_rss(self) -> int:
+        self.rss_peak = current_rss()
+        return self.rss_peak
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+class Profiler:
+    """Per-stage wall / CPU / peak-RSS accounting plus a whole-run stack sample.
+
+    Stages with the same name accumulate (calls, totals, max peak), so a stage
+    entered once per chunk reports the loop as a whole. A disabled profiler makes
+    every call a no-op, so entry points can take `profiler=None` and always use it.
+    """
+
+    def __init__(self, name, out_dir=PROFILE_DIR, enabled=True, interval=SAMPLE_INTERVAL):
+        self.name = name
+        self.out_dir = Path(out_dir)
+        self.enabled = enabled
+        self.stages = {}
+        self.sampler = StackSampler(interval) if enabled else None
+        self.t0 = self.cpu0 = None
+        self.rss_peak = 0
+
+    def start(self):
+        if self.enabled:
+            self.t0, self.cpu0 = time.perf_counter(), time.process_time()
+            self.sampler.reset_rss()
+            self.sampler.start()
+        return self
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        # stages are not meant to nest: entering one restarts the RSS high-water mark
+        self.rss_peak = max(self.rss_peak, self.sampler.rss_peak)
+        base = self.sampler.reset_rss()
+        t0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+            peak = max(self.sampler.rss_peak, current_rss())
+            s = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                              "peak_rss_mb": 0.0, "rss_growth_mb": 0.0})
+            s["calls"] += 1
+            s["wall_s"] += wall
+            s["cpu_s"] += cpu
+            s["peak_rss_mb"] = max(s["peak_rss_mb"], peak / 1e6)
+            s["rss_growth_mb"] = max(s["rss_growth_mb"], (peak - base) / 1e6)
+
+    def iterate(self, name, iterable):
+        """Yield from `iterable`, charging the time spent producing each item to stage `name`"""
+        it = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def report(self):
+        total_wall = time.perf_counter() - self.t0
+        return {
+            "name": self.name,
+            "wall_s": round(total_wall, 4),
+            "cpu_s": round(time.process_time() - self.cpu0, 4),
+            "peak_rss_mb": round(max(self.rss_peak, self.sampler.rss_peak) / 1e6, 1),
+            "samples": self.sampler.samples,
+            "stages": {k: {**v, "wall_s": round(v["wall_s"], 4), "cpu_s": round(v["cpu_s"], 4),
+                           "peak_rss_mb": round(v["peak_rss_mb"], 1), "rss_growth_mb": round(v["rss_growth_mb"], 1),
+                           "wall_pct": round(100 * v["wall_s"] / total_wall, 1)}
+                       for k, v in self.stages.items()},
+        }
+
+    def stop(self):
+        """Stop sampling and write <name>.profile.json + <name>.folded; returns the report"""
+        if not self.enabled:
+            return None
+        self.sampler.stop()
+        report = self.report()
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}"
+        (self.out_dir / f"{stem}.folded").write_text(self.sampler.folded(), encoding="utf-8")
+        with open(self.out_dir / f"{stem}.profile.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+        print(f"\n⏱️  {self.name}: {report['wall_s']:.2f}s wall, {report['cpu_s']:.2f}s CPU, "
+              f"peak {report['peak_rss_mb']:.0f} MB RSS")
+        print(f"  {'stage':<24}{'calls':>7}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}{'+MB':>8}{'% wall':>8}")
+        for k, v in report["stages"].items():
+            print(f"  {k:<24}{v['calls']:>7}{v['wall_s']:>10.3f}{v['cpu_s']:>10.3f}{v['peak_rss_mb']:>10.1f}"
+                  f"{v['rss_growth_mb']:>8.1f}{v['wall_pct']:>8.1f}")
+        print(f"  stacks → {self.out_dir / (stem + '.folded')} (flamegraph.pl / speedscope)")
+        return report
+
+
+def profiler_from_args(name, args) -> Profiler:
+    """Profiler for an argparse namespace that went through add_profile_argument"""
+    out = getattr(args, "profile", None)
+    return Profiler(name, out or PROFILE_DIR, enabled=out is not None)
+
+
+def add_profile_argument(parser):
+    parser.add_argument("--profile", nargs="?", const=str(PROFILE_DIR), default=None, metavar="DIR",
+                        help="record per-stage wall/CPU/peak RSS and a folded stack dump into DIR")
+    return parser
@@ -0,0 +1,8 @@
+# ETL tests import the shared modules (artifacts, delta_sync, postal_index, onemap/...)
+# the same way the scripts do: with etl/ on sys.path.
+import sys
+from pathlib import Path
+
+ETL_ROOT = Path(__file__).resolve().parents[1]
+if str(ETL_ROOT) not in sys.path:
+    sys.path.insert(0, str(ETL_ROOT))
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from onemap.amenity_store import PackedRTree, hilbert_key
+
+
+def test_hilbert_key_is_a_permutation_of_the_grid():
+    order = 3
+    n = 1 << order
+    xs, ys = np.meshgrid(np.arange(n, dtype=float), np.arange(n, dtype=float))
+    keys = hilbert_key(xs.ravel(), ys.ravel(), (0, 0, n - 1, n - 1), order=order)
+    assert sorted(keys.tolist()) == list(range(n * n))
+
+
+def test_hilbert_key_neighbours_are_adjacent_cells():
+    order = 4
+    n = 1 << order
+    xs, ys = np.meshgrid(np.arange(n, dtype=float), np.arange(n, dtype=float))
+    x, y = xs.ravel(), ys.ravel()
+    walk = np.argsort(hilbert_key(x, y, (0, 0, n - 1, n - 1), order=order))
+    steps = np.abs(np.diff(x[walk])) + np.abs(np.diff(y[walk]))
+    assert (steps == 1).all()
+
+
+@pytest.mark.parametrize("n, node_size", [(0, 16), (1, 16), (15, 4), (1000, 16), (4097, 8)])
+def test_packed_rtree_matches_brute_force(n, node_size):
+    rng = np.random.default_rng(n)
+    x, y = rng.uniform(0, 1000, n), rng.uniform(0, 1000, n)
+    if n:
+        order = np.argsort(hilbert_key(x, y, (0, 0, 1000, 1000)), kind="stable")
+        x, y = x[order], y[order]
+    tree = PackedRTree.build(x, y, node_size)
+    for box in [(0, 0, 1000, 1000), (100, 200, 300, 260), (-5, -5, -1, -1), (500, 500, 500, 500)]:
+        minx, miny, maxx, maxy = box
+        expected = np.flatnonzero((x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy))
+        np.testing.assert_array_equal(np.sort(tree.query(x, y, *box)), expected)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from artifacts import read_artifact, read_tabular, write_artifact
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "Postal_Code": ["018956", "530123", "018956"],
+        "latitude": [1.2812345678901234, 1.3712345678901234, 1.29],
+        "longitude": [103.8512345678901, 103.8912345678901, 103.8],
+        "score": [0.1, 0.2, 1 / 3],
+        "n": [1, 2, 3],
+    })
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_floats_round_trip_exactly(tmp_path, frame, suffix):
+    path = write_artifact(frame, tmp_path / f"out{suffix}", keep_as_string=("Postal_Code",))
+    back = read_artifact(path)
+    for col in ("latitude", "longitude", "score"):
+        assert back[col].dtype == np.float64
+        np.testing.assert_array_equal(back[col].to_numpy(), frame[col].to_numpy())
+    assert back["Postal_Code"].tolist() == frame["Postal_Code"].tolist()
+    assert back["n"].tolist() == [1, 2, 3]
+
+
+def test_float32_is_opt_in_and_never_for_coordinates(tmp_path, frame):
+    back = read_artifact(write_artifact(frame, tmp_path / "out.parquet", float32=("score", "latitude")))
+    assert back["score"].dtype == np.float32
+    assert back["latitude"].dtype == np.float64
+
+
+def test_read_tabular_prefers_the_binary_artifact(tmp_path, frame):
+    write_artifact(frame, tmp_path / "out.parquet", csv=True)
+    assert (tmp_path / "out.csv").exists()
+    back = read_tabular(tmp_path / "out.csv", columns=["n"])
+    assert list(back.columns) == ["n"]
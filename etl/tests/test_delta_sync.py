@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from delta_sync import diff, hash_records, load_manifest, row_hash, save_manifest, to_records
+
+
+def test_row_hash_ignores_key_order():
+    assert row_hash({"a": 1, "b": "x"}) == row_hash({"b": "x", "a": 1})
+    assert row_hash({"a": 1}) != row_hash({"a": 1.5})
+
+
+def test_hash_records_keys_are_strings():
+    hashes = hash_records([{"id": 1, "v": 2}, {"id": 2, "v": 3}], "id")
+    assert set(hashes) == {"1", "2"}
+
+
+def test_hash_records_rejects_duplicate_keys():
+    with pytest.raises(ValueError, match="duplicate key"):
+        hash_records([{"id": 1}, {"id": 1}], "id")
+
+
+def test_to_records_is_json_safe():
+    df = pd.DataFrame({"id": [1, 2], "v": [0.5, float("nan")], "t": pd.to_datetime(["2025-01-01", "2025-01-02"])})
+    records = to_records(df)
+    assert records[1]["v"] is None
+    assert records[0]["t"].startswith("2025-01-01T00:00:00")
+    assert hash_records(records, "id") == hash_records(to_records(df.copy()), "id")
+
+
+def test_diff():
+    inserts, updates, deletes = diff({"1": "a", "2": "b2", "3": "c"}, {"1": "a", "2": "b", "4": "d"})
+    assert (inserts, updates, deletes) == (["3"], ["2"], ["4"])
+    # a bootstrap manifest (keys only, no hashes) resends every row it shares with the source
+    assert diff({"1": "a"}, {"1": None, "9": None}) == ([], ["1"], ["9"])
+
+
+def test_manifest_round_trip(tmp_path):
+    path = tmp_path / "src.table.manifest.parquet"
+    assert load_manifest(path) == {}
+    save_manifest({"1": "a", "2": "b"}, path)
+    assert load_manifest(path) == {"1": "a", "2": "b"}
@@ -0,0 +1,64 @@
+import pytest
+
+from postal_index import PostalIndex, RateLimiter, normalize_postal
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("018956", "018956"), (18956, "018956"), ("18956.0", "018956"), (" 530123 ", "530123"),
+    ("1234567", None), ("S12345", None), (None, None), ("", None),
+])
+def test_normalize_postal(raw, expected):
+    assert normalize_postal(raw) == expected
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = PostalIndex(tmp_path / "postal.sqlite3", writable=True)
+    idx.upsert([("018956", 103.85, 1.28, "DOWNTOWN CORE", "BAYFRONT SUBZONE", "BAYFRONT AVENUE"),
+                ("530123", 103.89, 1.37, "HOUGANG", None, None),
+                ("bad", 0.0, 0.0, None, None, None)], "flood")
+    yield idx
+    idx.close()
+
+
+def test_lookup(index):
+    assert len(index) == 2
+    rec = index.lookup(18956)
+    assert (rec["lon"], rec["planning_area"], rec["source"]) == (103.85, "DOWNTOWN CORE", "flood")
+    assert index.lookup("999999") is None
+    assert index.lookup("nope") is None
+
+
+def test_lookup_many_and_missing(index):
+    assert set(index.lookup_many(["018956", "530123.0", "999999", "x"])) == {"018956", "530123"}
+    assert index.missing(["018956", "999999", "888888"]) == ["888888", "999999"]
+    index.record_misses(["999999"])
+    assert index.missing(["999999", "888888"]) == ["888888"]
+    assert index.missing(["999999"], include_checked=True) == ["999999"]
+
+
+def test_upsert_priority_and_misses(index):
+    index.upsert([("530123", 1.0, 1.0, "X", None, None)], "store", overwrite=False)
+    assert index.lookup("530123")["source"] == "flood"
+    index.record_misses(["777777"])
+    index.upsert([("530123", 103.9, 1.38, "HOUGANG", "X", None), ("777777", 103.7, 1.3, None, None, None)], "onemap")
+    assert index.lookup("530123")["lon"] == 103.9
+    assert index.stats() == {"codes": 3, "by_source": {"flood": 1, "onemap": 2}, "misses": 0}
+
+
+def test_read_only_requires_the_file(tmp_path, index):
+    with pytest.raises(FileNotFoundError):
+        PostalIndex(tmp_path / "missing.sqlite3")
+    reader = PostalIndex(index.path)
+    assert reader.lookup("018956")["subzone"] == "BAYFRONT SUBZONE"
+    reader.close()
+
+
+def test_rate_limiter_spaces_calls(monkeypatch):
+    clock, slept = [100.0], []
+    monkeypatch.setattr("postal_index.time.monotonic", lambda: clock[0])
+    monkeypatch.setattr("postal_index.time.sleep", slept.append)
+    limiter = RateLimiter(rate=4.0)
+    for _ in range(3):
+        limiter.wait()
+    assert slept == [0.25, 0.5]